@@ -0,0 +1,120 @@
+from typing import List
+import csv
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import faceswap.globals
+from faceswap import core, wording
+from faceswap.face_reference import clear_face_reference
+from faceswap.metrics import clear_metrics
+from faceswap.processors.frame.core import get_frame_processors_modules
+from faceswap.typing import BatchJob, BatchJobReport
+from faceswap.utilities import is_file, is_image, is_video
+
+BATCH_JOB_OPTIONS =\
+{
+	'source': '--source',
+	'target': '--target',
+	'output': '--output'
+}
+
+
+def read_batch_jobs(manifest_path : str) -> List[BatchJob]:
+	with open(manifest_path, newline = '') as manifest_file:
+		if manifest_path.lower().endswith('.csv'):
+			return [ { key: value for key, value in row.items() if value } for row in csv.DictReader(manifest_file) ]
+		return [ json.loads(line) for line in manifest_file if line.strip() ]
+
+
+def glob_batch_jobs(source_pattern : str, target_pattern : str) -> List[BatchJob]:
+	source_paths = sorted(glob.glob(source_pattern)) if source_pattern else [ faceswap.globals.source_path ]
+	target_paths = sorted(glob.glob(target_pattern))
+	return [ { 'source': source_path, 'target': target_path } for source_path, target_path in itertools.product(source_paths, target_paths) ]
+
+
+def create_batch_job_args(batch_job : BatchJob) -> List[str]:
+	args = []
+	for key, value in batch_job.items():
+		option = BATCH_JOB_OPTIONS.get(key, '--' + key.replace('_', '-'))
+		if value is True or value == 'true':
+			args.append(option)
+		elif value is False or value == 'false' or value is None:
+			continue
+		elif isinstance(value, list):
+			args.extend([ option ] + [ str(item) for item in value ])
+		else:
+			args.extend([ option, str(value) ])
+	return args
+
+
+def run_batch_job(base_args : List[str], batch_job : BatchJob, index : int) -> BatchJobReport:
+	start_time = time.perf_counter()
+	start_timestamp = time.time()
+	error = None
+	try:
+		program = core.create_program()
+		args = program.parse_args(base_args + create_batch_job_args(batch_job))
+		core.validate_args(program, args)
+		core.apply_args(args)
+		clear_face_reference()
+		# reject unusable targets before any model is touched
+		if not is_image(faceswap.globals.target_path) and not is_video(faceswap.globals.target_path):
+			raise ValueError(wording.get('select_image_or_video_target'))
+		for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
+			if not frame_processor_module.pre_check():
+				raise RuntimeError(wording.get('frame_processor_not_loaded').format(frame_processor = frame_processor_module.NAME))
+		core.conditional_process()
+		if not is_file(faceswap.globals.output_path) or os.path.getmtime(faceswap.globals.output_path) < start_timestamp:
+			error = wording.get('processing_image_failed') if is_image(faceswap.globals.target_path) else wording.get('processing_video_failed')
+	except (Exception, SystemExit) as exception:
+		error = str(exception)
+	return\
+	{
+		'index': index,
+		'source_path': faceswap.globals.source_path,
+		'target_path': faceswap.globals.target_path,
+		'output_path': faceswap.globals.output_path,
+		'status': 'failed' if error else 'completed',
+		'error': error,
+		'process_time': round(time.perf_counter() - start_time, 2)
+	}
+
+
+def run() -> None:
+	if faceswap.globals.batch_manifest_path:
+		batch_jobs = read_batch_jobs(faceswap.globals.batch_manifest_path)
+	else:
+		batch_jobs = glob_batch_jobs(faceswap.globals.batch_source_pattern, faceswap.globals.batch_target_pattern)
+	base_args = sys.argv[1:]
+	batch_job_reports = []
+	clear_metrics()
+	if faceswap.globals.batch_parallelism > 1:
+		# every worker process keeps its models resident across the jobs it receives
+		with ProcessPoolExecutor(max_workers = faceswap.globals.batch_parallelism) as executor:
+			futures = [ executor.submit(run_batch_job, base_args, batch_job, index) for index, batch_job in enumerate(batch_jobs, start = 1) ]
+			for future in as_completed(futures):
+				batch_job_reports.append(report_batch_job(future.result(), len(batch_jobs)))
+	else:
+		for index, batch_job in enumerate(batch_jobs, start = 1):
+			batch_job_reports.append(report_batch_job(run_batch_job(base_args, batch_job, index), len(batch_jobs)))
+	if faceswap.globals.batch_report_path:
+		with open(faceswap.globals.batch_report_path, 'w') as report_file:
+			for batch_job_report in sorted(batch_job_reports, key = lambda batch_job_report: batch_job_report['index']):
+				report_file.write(json.dumps(batch_job_report) + '\n')
+	completed_total = len([ batch_job_report for batch_job_report in batch_job_reports if batch_job_report['status'] == 'completed' ])
+	core.update_status(wording.get('batch_completed').format(completed = completed_total, failed = len(batch_job_reports) - completed_total))
+	# parallel jobs measure inside their worker processes and leave nothing to report here
+	core.report_metrics()
+
+
+def report_batch_job(batch_job_report : BatchJobReport, total : int) -> BatchJobReport:
+	if batch_job_report['status'] == 'completed':
+		core.update_status(wording.get('batch_job_completed').format(index = batch_job_report['index'], total = total, process_time = batch_job_report['process_time']))
+	else:
+		core.update_status(wording.get('batch_job_failed').format(index = batch_job_report['index'], total = total, error = batch_job_report['error']))
+	return batch_job_report
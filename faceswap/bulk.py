@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import glob
+import os
+import threading
+import time
+from tqdm import tqdm
+
+import faceswap.globals
+from faceswap import wording
+from faceswap.face_analyser import get_one_face
+from faceswap.processors.frame.core import get_frame_processors_modules, has_frame_processor_capability
+from faceswap.typing import Face, Frame, ImagePipelineStatistics
+from faceswap.utilities import is_file, is_image, normalize_output_path
+from faceswap.vision import read_image, write_image
+
+IMAGE_QUEUE_SIZE = 32
+THREAD_LOCK = threading.Lock()
+
+
+def process_image_directory(source_path : str, target_directory_path : str, output_directory_path : str) -> ImagePipelineStatistics:
+	image_paths = [ image_path for image_path in sorted(glob.glob(os.path.join(glob.escape(target_directory_path), '*'))) if is_image(image_path) ]
+	image_jobs = [ (image_path, normalize_output_path(source_path, image_path, output_directory_path) or os.path.join(output_directory_path, os.path.basename(image_path))) for image_path in image_paths ]
+	pending_image_jobs = [ (image_path, output_path) for image_path, output_path in image_jobs if not is_output_up_to_date(source_path, image_path, output_path) ]
+	# source face analysis happens once for the whole set
+	source_face = get_one_face(read_image(source_path)) if has_frame_processor_capability(faceswap.globals.frame_processors, 'needs_source_face') else None
+	stage_thread_counts =\
+	{
+		'reader': suggest_io_thread_count(),
+		'inference': faceswap.globals.execution_thread_count or 1,
+		'writer': suggest_io_thread_count()
+	}
+	statistics : Dict[str, Any] =\
+	{
+		'processed': 0,
+		'failed': 0,
+		'busy_times': { stage_name: 0.0 for stage_name in stage_thread_counts }
+	}
+	path_queue : Queue[Any] = Queue()
+	frame_queue : Queue[Any] = Queue(maxsize = IMAGE_QUEUE_SIZE)
+	write_queue : Queue[Any] = Queue(maxsize = IMAGE_QUEUE_SIZE)
+	for image_job in pending_image_jobs:
+		path_queue.put(image_job)
+	start_time = time.perf_counter()
+	with tqdm(total = len(pending_image_jobs), desc = wording.get('processing'), unit = 'image', dynamic_ncols = True) as progress:
+		stages : List[Tuple[str, Callable[[Any], Any], Queue[Any], Optional[Queue[Any]]]] =\
+		[
+			('reader', read_image_job, path_queue, frame_queue),
+			('inference', lambda image_job: process_image_job(source_face, image_job), frame_queue, write_queue),
+			('writer', lambda image_job: write_image_job(image_job, progress), write_queue, None)
+		]
+		with ThreadPoolExecutor(max_workers = sum(stage_thread_counts.values())) as executor:
+			stage_futures = [ [ executor.submit(run_stage, stage_name, process, input_queue, output_queue, statistics) for _ in range(stage_thread_counts[stage_name]) ] for stage_name, process, input_queue, output_queue in stages ]
+			# every stage drains before the next one is told to stop
+			for (_, _, input_queue, _), futures in zip(stages, stage_futures):
+				for _ in futures:
+					input_queue.put(None)
+				wait(futures)
+	process_time = time.perf_counter() - start_time
+	return\
+	{
+		'processed': statistics['processed'],
+		'skipped': len(image_jobs) - len(pending_image_jobs),
+		'failed': statistics['failed'],
+		'process_time': round(process_time, 2),
+		'images_per_second': round(statistics['processed'] / process_time, 2) if process_time else 0.0,
+		'utilization': { stage_name: round(statistics['busy_times'][stage_name] / (process_time * stage_thread_counts[stage_name]) * 100, 2) if process_time else 0.0 for stage_name in stage_thread_counts }
+	}
+
+
+def run_stage(stage_name : str, process : Callable[[Any], Any], input_queue : Queue[Any], output_queue : Optional[Queue[Any]], statistics : Dict[str, Any]) -> None:
+	while True:
+		image_job = input_queue.get()
+		if image_job is None:
+			break
+		start_time = time.perf_counter()
+		# a broken image fails alone and never stalls the queues behind it
+		try:
+			image_job = process(image_job)
+		except Exception:
+			image_job = None
+		with THREAD_LOCK:
+			statistics['busy_times'][stage_name] += time.perf_counter() - start_time
+			if image_job is None:
+				statistics['failed'] += 1
+			elif output_queue is None:
+				statistics['processed'] += 1
+		if image_job is not None and output_queue is not None:
+			output_queue.put(image_job)
+
+
+def read_image_job(image_job : Tuple[str, str]) -> Optional[Tuple[str, Frame]]:
+	image_path, output_path = image_job
+	frame = read_image(image_path)
+	if frame is None:
+		return None
+	return output_path, frame
+
+
+def process_image_job(source_face : Optional[Face], image_job : Tuple[str, Frame]) -> Tuple[str, Frame]:
+	output_path, frame = image_job
+	reference_face = None
+	if 'reference' in faceswap.globals.face_recognition and has_frame_processor_capability(faceswap.globals.frame_processors, 'needs_faces'):
+		reference_face = get_one_face(frame, faceswap.globals.reference_face_position)
+	for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
+		frame = frame_processor_module.process_frame(source_face, reference_face, frame)
+	return output_path, frame
+
+
+def write_image_job(image_job : Tuple[str, Frame], progress : Any) -> Optional[str]:
+	output_path, frame = image_job
+	if not write_image(output_path, frame, faceswap.globals.output_image_quality):
+		return None
+	progress.update(1)
+	return output_path
+
+
+def is_output_up_to_date(source_path : str, image_path : str, output_path : str) -> bool:
+	if is_file(output_path):
+		input_time = max(os.path.getmtime(image_path), os.path.getmtime(source_path) if is_file(source_path) else 0)
+		return os.path.getmtime(output_path) >= input_time
+	return False
+
+
+def suggest_io_thread_count() -> int:
+	return max((os.cpu_count() or 1) // 4, 2)
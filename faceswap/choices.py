@@ -1,6 +1,6 @@
 from typing import List
 
-from faceswap.typing import FaceRecognition, FaceAnalyserDirection, FaceAnalyserAge, FaceAnalyserGender, TempFrameFormat, OutputVideoEncoder
+from faceswap.typing import FaceRecognition, FaceAnalyserDirection, FaceAnalyserAge, FaceAnalyserGender, TempFrameFormat, OutputVideoEncoder, FrameEnhancerModel
 
 face_recognition : List[FaceRecognition] = [ 'reference', 'many' ]
 face_analyser_direction : List[FaceAnalyserDirection] = [ 'left-right', 'right-left', 'top-bottom', 'bottom-top', 'small-large', 'large-small' ]
@@ -9,3 +9,5 @@ face_analyser_gender : List[FaceAnalyserGender] = [ 'male', 'female' ]
 temp_frame_format : List[TempFrameFormat] = [ 'jpg', 'png' ]
 output_video_encoder : List[OutputVideoEncoder] = [ 'libx264', 'libx265', 'libvpx-vp9', 'h264_nvenc', 'hevc_nvenc' ]
 
+frame_enhancer_model : List[FrameEnhancerModel] = [ 'real_esrgan_x2plus', 'real_esrgan_x4plus' ]
+frame_enhancer_tile_size : List[int] = [ 128, 192, 256, 384, 512 ]
@@ -3,35 +3,52 @@
 import os
 # single thread doubles cuda performance
 os.environ['OMP_NUM_THREADS'] = '1'
-# reduce tensorflow log level
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 import sys
 import warnings
-from typing import List
+from typing import Callable, List, Optional
 import platform
 import signal
+import threading
 import shutil
 import argparse
-import onnxruntime
-import tensorflow
+from concurrent.futures import ThreadPoolExecutor
+import numpy
 
 import faceswap.choices
 import faceswap.globals
 from faceswap import wording, metadata
-from faceswap.processors.frame.core import get_frame_processors_modules
-from faceswap.utilities import is_image, is_video, detect_fps, compress_image, merge_video, extract_frames, get_temp_frame_paths, restore_audio, create_temp, move_temp, clear_temp, normalize_output_path, list_module_names, decode_execution_providers, encode_execution_providers
+from faceswap.face_analyser import get_face_analyser
+from faceswap.processors.frame.core import get_frame_processors_modules, has_frame_processor_capability, pre_check_frame_processors
+from faceswap.metrics import clear_metrics, get_metrics_summary, write_trace
+from faceswap.vision import read_image, write_image
+from faceswap.bulk import process_image_directory
+from faceswap.utilities import is_image, is_video, is_directory, detect_fps, merge_video, extract_frames, extract_audio, get_temp_frame_paths, get_temp_frame_statistics, restore_audio, create_job_id, create_temp, move_temp, clear_temp, normalize_output_path, list_module_names, decode_execution_providers, encode_execution_providers
 
 warnings.filterwarnings('ignore', category = FutureWarning, module = 'insightface')
 warnings.filterwarnings('ignore', category = UserWarning, module = 'torchvision')
 
+WARM_UP_THREAD : Optional[threading.Thread] = None
+STATUS_LISTENERS : List[Callable[[str, str], None]] = []
+JOB_LOCK = threading.Lock()
+
 
 def parse_args() -> None:
 	signal.signal(signal.SIGINT, lambda signal_number, frame: destroy())
+	program = create_program()
+	args = program.parse_args()
+	validate_args(program, args)
+	apply_args(args)
+
+
+def create_program() -> argparse.ArgumentParser:
 	program = argparse.ArgumentParser(formatter_class = lambda prog: argparse.HelpFormatter(prog, max_help_position = 120))
 	program.add_argument('-s', '--source', help = wording.get('source_help'), dest = 'source_path')
 	program.add_argument('-t', '--target', help = wording.get('target_help'), dest = 'target_path')
 	program.add_argument('-o', '--output', help = wording.get('output_help'), dest = 'output_path')
 	program.add_argument('--frame-processors', help = wording.get('frame_processors_help').format(choices = ', '.join(list_module_names('faceswap/processors/frame/modules'))), dest = 'frame_processors', default = ['face_swapper'], nargs = '+')
+	program.add_argument('--frame-enhancer-model', help = wording.get('frame_enhancer_model_help'), dest = 'frame_enhancer_model', default = 'real_esrgan_x4plus', choices = faceswap.choices.frame_enhancer_model)
+	program.add_argument('--frame-enhancer-tile-size', help = wording.get('frame_enhancer_tile_size_help'), dest = 'frame_enhancer_tile_size', type = int, choices = faceswap.choices.frame_enhancer_tile_size)
+	program.add_argument('--frame-enhancer-tile-batch-size', help = wording.get('frame_enhancer_tile_batch_size_help'), dest = 'frame_enhancer_tile_batch_size', type = int, default = 4)
 	program.add_argument('--ui-layouts', help = wording.get('ui_layouts_help').format(choices = ', '.join(list_module_names('faceswap/uis/layouts'))), dest = 'ui_layouts', default = ['default'], nargs = '+')
 	program.add_argument('--keep-fps', help = wording.get('keep_fps_help'), dest = 'keep_fps', action = 'store_true')
 	program.add_argument('--keep-temp', help = wording.get('keep_temp_help'), dest = 'keep_temp', action = 'store_true')
@@ -47,22 +64,41 @@ def parse_args() -> None:
 	program.add_argument('--trim-frame-end', help = wording.get('trim_frame_end_help'), dest = 'trim_frame_end', type = int)
 	program.add_argument('--temp-frame-format', help = wording.get('temp_frame_format_help'), dest = 'temp_frame_format', default = 'jpg', choices = faceswap.choices.temp_frame_format)
 	program.add_argument('--temp-frame-quality', help = wording.get('temp_frame_quality_help'), dest = 'temp_frame_quality', type = int, default = 100, choices = range(101), metavar = '[0-100]')
+	program.add_argument('--temp-frame-memory-limit', help = wording.get('temp_frame_memory_limit_help'), dest = 'temp_frame_memory_limit', type = int)
 	program.add_argument('--output-image-quality', help=wording.get('output_image_quality_help'), dest = 'output_image_quality', type = int, default = 90, choices = range(101), metavar = '[0-100]')
 	program.add_argument('--output-video-encoder', help = wording.get('output_video_encoder_help'), dest = 'output_video_encoder', default = 'libx264', choices = faceswap.choices.output_video_encoder)
 	program.add_argument('--output-video-quality', help = wording.get('output_video_quality_help'), dest = 'output_video_quality', type = int, default = 90, choices = range(101), metavar = '[0-100]')
 	program.add_argument('--max-memory', help = wording.get('max_memory_help'), dest = 'max_memory', type = int)
-	program.add_argument('--execution-providers', help = wording.get('execution_providers_help').format(choices = 'cpu'), dest = 'execution_providers', default = ['cpu'], choices = suggest_execution_providers_choices(), nargs = '+')
-	program.add_argument('--execution-thread-count', help = wording.get('execution_thread_count_help'), dest = 'execution_thread_count', type = int, default = suggest_execution_thread_count_default())
+	program.add_argument('--model-memory-limit', help = wording.get('model_memory_limit_help'), dest = 'model_memory_limit', type = int)
+	program.add_argument('--stream-latency-target', help = wording.get('stream_latency_target_help'), dest = 'stream_latency_target', type = int, default = 150)
+	program.add_argument('--stream-frame-budget', help = wording.get('stream_frame_budget_help'), dest = 'stream_frame_budget', type = int, default = 40)
+	program.add_argument('--stream-concurrency', help = wording.get('stream_concurrency_help'), dest = 'stream_concurrency', type = int, default = 4)
+	program.add_argument('--stream-fake-camera', help = wording.get('stream_fake_camera_help'), dest = 'stream_fake_camera_path')
+	program.add_argument('--trace-path', help = wording.get('trace_path_help'), dest = 'trace_path')
+	program.add_argument('--execution-providers', help = wording.get('execution_providers_help').format(choices = 'cpu'), dest = 'execution_providers', default = ['cpu'], nargs = '+')
+	program.add_argument('--execution-thread-count', help = wording.get('execution_thread_count_help'), dest = 'execution_thread_count', type = int)
 	program.add_argument('--execution-queue-count', help = wording.get('execution_queue_count_help'), dest = 'execution_queue_count', type = int, default = 1)
 	program.add_argument('--headless', help = wording.get('headless_help'), dest = 'headless', action = 'store_true')
+	program.add_argument('--batch-manifest', help = wording.get('batch_manifest_help'), dest = 'batch_manifest_path')
+	program.add_argument('--batch-sources', help = wording.get('batch_sources_help'), dest = 'batch_source_pattern')
+	program.add_argument('--batch-targets', help = wording.get('batch_targets_help'), dest = 'batch_target_pattern')
+	program.add_argument('--batch-parallelism', help = wording.get('batch_parallelism_help'), dest = 'batch_parallelism', type = int, default = 1)
+	program.add_argument('--batch-report', help = wording.get('batch_report_help'), dest = 'batch_report_path')
+	program.add_argument('--server', help = wording.get('server_help'), dest = 'server', action = 'store_true')
+	program.add_argument('--server-port', help = wording.get('server_port_help'), dest = 'server_port', type = int, default = 7870)
+	program.add_argument('--server-concurrency', help = wording.get('server_concurrency_help'), dest = 'server_concurrency', type = int, default = 1)
 	program.add_argument('-v', '--version', version = metadata.get('name') + ' ' + metadata.get('version'), action = 'version')
+	return program
 
-	args = program.parse_args()
 
+def apply_args(args : argparse.Namespace) -> None:
 	faceswap.globals.source_path = args.source_path
 	faceswap.globals.target_path = args.target_path
 	faceswap.globals.output_path = normalize_output_path(faceswap.globals.source_path, faceswap.globals.target_path, args.output_path)
 	faceswap.globals.frame_processors = args.frame_processors
+	faceswap.globals.frame_enhancer_model = args.frame_enhancer_model
+	faceswap.globals.frame_enhancer_tile_size = args.frame_enhancer_tile_size
+	faceswap.globals.frame_enhancer_tile_batch_size = args.frame_enhancer_tile_batch_size
 	faceswap.globals.ui_layouts = args.ui_layouts
 	faceswap.globals.keep_fps = args.keep_fps
 	faceswap.globals.keep_temp = args.keep_temp
@@ -78,33 +114,54 @@ def parse_args() -> None:
 	faceswap.globals.trim_frame_end = args.trim_frame_end
 	faceswap.globals.temp_frame_format = args.temp_frame_format
 	faceswap.globals.temp_frame_quality = args.temp_frame_quality
+	faceswap.globals.temp_frame_memory_limit = args.temp_frame_memory_limit
 	faceswap.globals.output_image_quality = args.output_image_quality
 	faceswap.globals.output_video_encoder = args.output_video_encoder
 	faceswap.globals.output_video_quality = args.output_video_quality
 	faceswap.globals.max_memory = args.max_memory
+	faceswap.globals.model_memory_limit = args.model_memory_limit
+	faceswap.globals.stream_latency_target = args.stream_latency_target
+	faceswap.globals.stream_frame_budget = args.stream_frame_budget
+	faceswap.globals.stream_concurrency = args.stream_concurrency
+	faceswap.globals.stream_fake_camera_path = args.stream_fake_camera_path
+	faceswap.globals.trace_path = args.trace_path
 	faceswap.globals.execution_providers = decode_execution_providers(args.execution_providers)
-	faceswap.globals.execution_thread_count = args.execution_thread_count
+	faceswap.globals.execution_thread_count = args.execution_thread_count or suggest_execution_thread_count_default()
 	faceswap.globals.execution_queue_count = args.execution_queue_count
 	faceswap.globals.headless = args.headless
+	faceswap.globals.batch_manifest_path = args.batch_manifest_path
+	faceswap.globals.batch_source_pattern = args.batch_source_pattern
+	faceswap.globals.batch_target_pattern = args.batch_target_pattern
+	faceswap.globals.batch_parallelism = args.batch_parallelism
+	faceswap.globals.batch_report_path = args.batch_report_path
+	faceswap.globals.server = args.server
+	faceswap.globals.server_port = args.server_port
+	faceswap.globals.server_concurrency = args.server_concurrency
+
+
+def validate_args(program : argparse.ArgumentParser, args : argparse.Namespace) -> None:
+	# providers are validated after parsing so onnxruntime stays out of the version and help paths
+	execution_providers_choices = suggest_execution_providers_choices()
+	for execution_provider in args.execution_providers:
+		if execution_provider not in execution_providers_choices:
+			program.error(wording.get('execution_provider_not_supported').format(execution_provider = execution_provider, choices = ', '.join(execution_providers_choices)))
 
 
 def suggest_execution_providers_choices() -> List[str]:
+	import onnxruntime
+
 	return encode_execution_providers(onnxruntime.get_available_providers())
 
 
 def suggest_execution_thread_count_default() -> int:
+	import onnxruntime
+
 	if 'CUDAExecutionProvider' in onnxruntime.get_available_providers():
 		return 8
 	return 1
 
 
 def limit_resources() -> None:
-	# prevent tensorflow memory leak
-	gpus = tensorflow.config.experimental.list_physical_devices('GPU')
-	for gpu in gpus:
-		tensorflow.config.experimental.set_virtual_device_configuration(gpu, [
-			tensorflow.config.experimental.VirtualDeviceConfiguration(memory_limit = 1024)
-		])
 	# limit memory usage
 	if faceswap.globals.max_memory:
 		memory = faceswap.globals.max_memory * 1024 ** 3
@@ -119,8 +176,40 @@ def limit_resources() -> None:
 			resource.setrlimit(resource.RLIMIT_DATA, (memory, memory))
 
 
+def warm_up(pre_load_method : Callable[[], None]) -> None:
+	global WARM_UP_THREAD
+
+	WARM_UP_THREAD = threading.Thread(target = run_pre_load, args = (pre_load_method,), daemon = True)
+	WARM_UP_THREAD.start()
+
+
+def run_pre_load(pre_load_method : Callable[[], None]) -> None:
+	try:
+		pre_load_method()
+	except Exception as exception:
+		update_status(wording.get('pre_load_failed').format(error = exception))
+
+
+def is_warming_up() -> bool:
+	return WARM_UP_THREAD is not None and WARM_UP_THREAD.is_alive()
+
+
+def pre_load() -> None:
+	# models load once and stay resident, consumers block only while a load is in flight
+	if has_frame_processor_capability(faceswap.globals.frame_processors, 'needs_faces'):
+		pre_load_face_analyser()
+	for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
+		frame_processor_module.get_frame_processor()
+
+
+def pre_load_face_analyser() -> None:
+	get_face_analyser().get(numpy.zeros((256, 256, 3), dtype = numpy.uint8))
+
+
 def update_status(message : str, scope : str = 'FACESWAP.CORE') -> None:
 	print('[' + scope + '] ' + message)
+	for status_listener in STATUS_LISTENERS:
+		status_listener(message, scope)
 
 
 def pre_check() -> bool:
@@ -134,18 +223,18 @@ def pre_check() -> bool:
 
 
 def process_image() -> None:
-	shutil.copy2(faceswap.globals.target_path, faceswap.globals.output_path)
-	# process frame
+	# decode once and hand the frame from processor to processor
+	target_frame = read_image(faceswap.globals.target_path)
 	for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
 		update_status(wording.get('processing'), frame_processor_module.NAME)
-		frame_processor_module.process_image(faceswap.globals.source_path, faceswap.globals.output_path, faceswap.globals.output_path)
+		target_frame = frame_processor_module.process_image(faceswap.globals.source_path, target_frame)
 		frame_processor_module.post_process()
-	# compress image
-	update_status(wording.get('compressing_image'))
-	if not compress_image(faceswap.globals.output_path):
-		update_status(wording.get('compressing_image_failed'))
+	# write image
+	update_status(wording.get('writing_image'))
+	if not write_image(faceswap.globals.output_path, target_frame, faceswap.globals.output_image_quality):
+		update_status(wording.get('writing_image_failed'))
 	# validate image
-	if is_image(faceswap.globals.target_path):
+	if is_image(faceswap.globals.output_path):
 		update_status(wording.get('processing_image_succeed'))
 	else:
 		update_status(wording.get('processing_image_failed'))
@@ -155,6 +244,10 @@ def process_video() -> None:
 	fps = detect_fps(faceswap.globals.target_path) if faceswap.globals.keep_fps else 25.0
 	update_status(wording.get('creating_temp'))
 	create_temp(faceswap.globals.target_path)
+	# extract audio alongside frame extraction and processing
+	executor = ThreadPoolExecutor(max_workers = 1)
+	extract_audio_future = executor.submit(extract_audio, faceswap.globals.target_path) if not faceswap.globals.skip_audio else None
+	executor.shutdown(wait = False)
 	# extract frames
 	update_status(wording.get('extracting_frames_fps').format(fps = fps))
 	extract_frames(faceswap.globals.target_path, fps)
@@ -179,10 +272,17 @@ def process_video() -> None:
 		move_temp(faceswap.globals.target_path, faceswap.globals.output_path)
 	else:
 		update_status(wording.get('restoring_audio'))
-		if not restore_audio(faceswap.globals.target_path, faceswap.globals.output_path):
+		if not extract_audio_future.result() or not restore_audio(faceswap.globals.target_path, faceswap.globals.output_path):
 			update_status(wording.get('restoring_audio_failed'))
 			move_temp(faceswap.globals.target_path, faceswap.globals.output_path)
 	# clear temp
+	temp_frame_statistics = get_temp_frame_statistics()
+	update_status(wording.get('temp_frame_statistics').format(
+		memory_written = temp_frame_statistics['memory']['written'] // 1024 ** 2,
+		memory_read = temp_frame_statistics['memory']['read'] // 1024 ** 2,
+		disk_written = temp_frame_statistics['disk']['written'] // 1024 ** 2,
+		disk_read = temp_frame_statistics['disk']['read'] // 1024 ** 2
+	))
 	update_status(wording.get('clearing_temp'))
 	clear_temp(faceswap.globals.target_path)
 	# validate video
@@ -192,14 +292,50 @@ def process_video() -> None:
 		update_status(wording.get('processing_video_failed'))
 
 
+def process_images() -> None:
+	update_status(wording.get('processing'))
+	image_pipeline_statistics = process_image_directory(faceswap.globals.source_path, faceswap.globals.target_path, faceswap.globals.output_path)
+	update_status(wording.get('image_pipeline_statistics').format(
+		images_per_second = image_pipeline_statistics['images_per_second'],
+		reader = image_pipeline_statistics['utilization']['reader'],
+		inference = image_pipeline_statistics['utilization']['inference'],
+		writer = image_pipeline_statistics['utilization']['writer']
+	))
+	update_status(wording.get('processing_images_succeed').format(
+		processed = image_pipeline_statistics['processed'],
+		skipped = image_pipeline_statistics['skipped'],
+		failed = image_pipeline_statistics['failed']
+	))
+
+
 def conditional_process() -> None:
-	for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
-		if not frame_processor_module.pre_process('output'):
-			return
-	if is_image(faceswap.globals.target_path):
-		process_image()
-	if is_video(faceswap.globals.target_path):
-		process_video()
+	# the job id behind the temp paths is process wide, a second job has to run in its own process
+	if not JOB_LOCK.acquire(blocking = False):
+		update_status(wording.get('job_already_running'))
+		return
+	try:
+		faceswap.globals.job_id = create_job_id()
+		for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
+			if not frame_processor_module.pre_process('output'):
+				return
+		if is_image(faceswap.globals.target_path):
+			process_image()
+		if is_video(faceswap.globals.target_path):
+			process_video()
+		if is_directory(faceswap.globals.target_path):
+			process_images()
+	finally:
+		JOB_LOCK.release()
+
+
+def report_metrics() -> None:
+	for stage_name, metric_count, p50, p95, p99 in get_metrics_summary():
+		update_status(wording.get('metrics_summary').format(stage = stage_name, count = metric_count, p50 = p50, p95 = p95, p99 = p99))
+	if faceswap.globals.trace_path:
+		if write_trace(faceswap.globals.trace_path):
+			update_status(wording.get('writing_trace_succeed').format(trace_path = faceswap.globals.trace_path))
+		else:
+			update_status(wording.get('writing_trace_failed').format(trace_path = faceswap.globals.trace_path))
 
 
 def run() -> None:
@@ -208,12 +344,26 @@ def run() -> None:
 	# pre check
 	if not pre_check():
 		return
-	for frame_processor in get_frame_processors_modules(faceswap.globals.frame_processors):
-		if not frame_processor.pre_check():
-			return
-	# headless or ui
+	if not pre_check_frame_processors(faceswap.globals.frame_processors):
+		return
+	# server, batch, headless or ui
+	if faceswap.globals.server:
+		import faceswap.server as server
+
+		server.run()
+		return
+	if faceswap.globals.batch_manifest_path or faceswap.globals.batch_target_pattern:
+		import faceswap.batch as batch
+
+		batch.run()
+		return
+	# the default layout loads its models in the engine process, the ui process stays free of them
+	if faceswap.globals.headless or faceswap.globals.ui_layouts != [ 'default' ]:
+		warm_up(pre_load)
 	if faceswap.globals.headless:
+		clear_metrics()
 		conditional_process()
+		report_metrics()
 	else:
 		import faceswap.uis.core as ui
 
@@ -1,29 +1,37 @@
+import math
+import os
 import threading
-from typing import Any, Optional, List
-import insightface
+from typing import Any, Optional, List, Tuple
+import cv2
 import numpy
 
 import faceswap.globals
+from faceswap import model_manager
+from faceswap.metrics import measure
 from faceswap.typing import Frame, Face, FaceAnalyserDirection, FaceAnalyserAge, FaceAnalyserGender
 
-FACE_ANALYSER = None
-THREAD_LOCK = threading.Lock()
+NAME = 'FACESWAP.FACE_ANALYSER'
+REUSED_FACES = threading.local()
+FACE_BATCH_SIZE = 640
+FACE_BATCH_LIMIT = 4
+FACE_BATCH_FACE_SIZE = 32
 
 
 def get_face_analyser() -> Any:
-	global FACE_ANALYSER
+	model_path = os.path.expanduser('~/.insightface/models/buffalo_l')
+	return model_manager.get_model(NAME, model_path, load_face_analyser)
 
-	with THREAD_LOCK:
-		if FACE_ANALYSER is None:
-			FACE_ANALYSER = insightface.app.FaceAnalysis(name = 'buffalo_l', providers = faceswap.globals.execution_providers)
-			FACE_ANALYSER.prepare(ctx_id = 0)
-	return FACE_ANALYSER
 
+def load_face_analyser() -> Any:
+	import insightface
+
+	face_analyser = insightface.app.FaceAnalysis(name = 'buffalo_l', providers = faceswap.globals.execution_providers)
+	face_analyser.prepare(ctx_id = 0)
+	return face_analyser
 
-def clear_face_analyser() -> Any:
-	global FACE_ANALYSER
 
-	FACE_ANALYSER = None
+def clear_face_analyser() -> Any:
+	model_manager.clear_model(NAME)
 
 
 def get_one_face(frame : Frame, position : int = 0) -> Optional[Face]:
@@ -36,20 +44,110 @@ def get_one_face(frame : Frame, position : int = 0) -> Optional[Face]:
 	return None
 
 
-def get_many_faces(frame : Frame) -> List[Face]:
+def get_many_faces(frame : Frame, detector_size : Optional[int] = None) -> List[Face]:
+	# stream mode may hand the faces of an earlier detection to this thread
+	reused_faces = getattr(REUSED_FACES, 'many_faces', None)
+	if reused_faces is not None:
+		return reused_faces
 	try:
-		faces = get_face_analyser().get(frame)
-		if faceswap.globals.face_analyser_direction:
-			faces = sort_by_direction(faces, faceswap.globals.face_analyser_direction)
-		if faceswap.globals.face_analyser_age:
-			faces = filter_by_age(faces, faceswap.globals.face_analyser_age)
-		if faceswap.globals.face_analyser_gender:
-			faces = filter_by_gender(faces, faceswap.globals.face_analyser_gender)
-		return faces
+		return filter_faces(analyse_faces(frame, detector_size))
 	except (AttributeError, ValueError):
 		return []
 
 
+def get_batch_faces(frames : List[Frame], previous_faces : List[Optional[List[Face]]]) -> List[List[Face]]:
+	batch_faces : List[List[Face]] = [ [] for _ in frames ]
+	# frames whose faces would shrink below the detectable size in the mosaic are detected on their own
+	mosaic_indices = [ index for index, frame in enumerate(frames) if is_mosaic_frame(frame, previous_faces[index]) ]
+	batch_indices = [ mosaic_indices[index:index + FACE_BATCH_LIMIT] for index in range(0, len(mosaic_indices), FACE_BATCH_LIMIT) ]
+	batch_indices.extend([ index ] for index in range(len(frames)) if index not in mosaic_indices)
+	for frame_indices in batch_indices:
+		try:
+			for index, faces in zip(frame_indices, analyse_batch_faces([ frames[index] for index in frame_indices ])):
+				batch_faces[index] = faces
+		except (AttributeError, ValueError):
+			pass
+	return [ filter_faces(faces) for faces in batch_faces ]
+
+
+def is_mosaic_frame(frame : Frame, faces : Optional[List[Face]]) -> bool:
+	if not faces:
+		return False
+	cell_size = FACE_BATCH_SIZE // math.ceil(math.sqrt(FACE_BATCH_LIMIT))
+	scale = cell_size / max(frame.shape[:2])
+	return min(face['bbox'][3] - face['bbox'][1] for face in faces) * scale >= FACE_BATCH_FACE_SIZE
+
+
+def filter_faces(faces : List[Face]) -> List[Face]:
+	if faceswap.globals.face_analyser_direction:
+		faces = sort_by_direction(faces, faceswap.globals.face_analyser_direction)
+	if faceswap.globals.face_analyser_age:
+		faces = filter_by_age(faces, faceswap.globals.face_analyser_age)
+	if faceswap.globals.face_analyser_gender:
+		faces = filter_by_gender(faces, faceswap.globals.face_analyser_gender)
+	return faces
+
+
+def analyse_faces(frame : Frame, detector_size : Optional[int] = None) -> List[Face]:
+	# detection and the per face models run apart to be measured apart
+	bboxes, kpss = detect_faces(frame, detector_size)
+	return create_faces(frame, bboxes, kpss)
+
+
+def analyse_batch_faces(frames : List[Frame]) -> List[List[Face]]:
+	if len(frames) == 1:
+		return [ analyse_faces(frames[0]) ]
+	# the frames are tiled into one mosaic that takes a single detection, the per face models run on the original frames
+	grid_size = math.ceil(math.sqrt(len(frames)))
+	cell_size = FACE_BATCH_SIZE // grid_size
+	mosaic_frame = numpy.zeros((FACE_BATCH_SIZE, FACE_BATCH_SIZE, 3), dtype = numpy.uint8)
+	cell_transforms = []
+	for index, frame in enumerate(frames):
+		cell_y, cell_x = divmod(index, grid_size)
+		height, width = frame.shape[:2]
+		scale = cell_size / max(height, width)
+		cell_frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation = cv2.INTER_AREA)
+		mosaic_frame[cell_y * cell_size:cell_y * cell_size + cell_frame.shape[0], cell_x * cell_size:cell_x * cell_size + cell_frame.shape[1]] = cell_frame
+		cell_transforms.append((cell_x * cell_size, cell_y * cell_size, scale))
+	bboxes, kpss = detect_faces(mosaic_frame, FACE_BATCH_SIZE)
+	batch_bboxes : List[List[Any]] = [ [] for _ in frames ]
+	batch_kpss : List[List[Any]] = [ [] for _ in frames ]
+	for index, bbox in enumerate(bboxes):
+		# a face belongs to the cell that holds its center
+		cell_index = int((bbox[1] + bbox[3]) / 2 // cell_size) * grid_size + min(int((bbox[0] + bbox[2]) / 2 // cell_size), grid_size - 1)
+		if cell_index < len(frames):
+			offset_x, offset_y, scale = cell_transforms[cell_index]
+			batch_bboxes[cell_index].append(numpy.concatenate([ (bbox[0:4] - [ offset_x, offset_y, offset_x, offset_y ]) / scale, bbox[4:5] ]))
+			if kpss is not None:
+				batch_kpss[cell_index].append((kpss[index] - [ offset_x, offset_y ]) / scale)
+	return [ create_faces(frame, batch_bboxes[index], batch_kpss[index] if kpss is not None else None) for index, frame in enumerate(frames) ]
+
+
+def create_faces(frame : Frame, bboxes : Any, kpss : Any) -> List[Face]:
+	from insightface.app.common import Face as AnalysedFace
+
+	face_analyser = get_face_analyser()
+	faces = []
+	with measure('recognition'):
+		for index, bbox in enumerate(bboxes):
+			face = AnalysedFace(bbox = bbox[0:4], kps = kpss[index] if kpss is not None else None, det_score = bbox[4])
+			for task_name, model in face_analyser.models.items():
+				if task_name != 'detection':
+					model.get(frame, face)
+			faces.append(face)
+	return faces
+
+
+def detect_faces(frame : Frame, detector_size : Optional[int] = None) -> Tuple[Any, Any]:
+	input_size = (detector_size, detector_size) if detector_size else None
+	with measure('detection'):
+		return get_face_analyser().det_model.detect(frame, input_size = input_size, max_num = 0, metric = 'default')
+
+
+def set_reused_faces(many_faces : Optional[List[Face]]) -> None:
+	REUSED_FACES.many_faces = many_faces
+
+
 def find_similar_faces(frame : Frame, reference_face : Face, face_distance : float) -> List[Face]:
 	many_faces = get_many_faces(frame)
 	similar_faces = []
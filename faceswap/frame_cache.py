@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import bisect
+import subprocess
+import threading
+import cv2
+
+from faceswap.metrics import measure
+from faceswap.typing import Frame, VideoDecoder
+from faceswap.vision import resize_frame_dimension
+
+VIDEO_DECODERS : Dict[str, VideoDecoder] = {}
+VIDEO_DECODER_LIMIT = 2
+FRAME_CACHE : 'OrderedDict[Tuple[str, int, int], Frame]' = OrderedDict()
+FRAME_CACHE_MEMORY = 512 * 1024 * 1024
+# without a keyframe index reading on beats seeking within this distance
+SEEK_FORWARD_LIMIT = 32
+THREAD_LOCK = threading.Lock()
+
+
+def get_cached_video_frame(video_path : str, frame_number : int = 0, max_height : int = 0) -> Optional[Frame]:
+	frame = get_cached_frame((video_path, frame_number, max_height))
+	if frame is None and max_height:
+		frame = get_cached_frame((video_path, frame_number, 0))
+		if frame is not None:
+			frame = resize_frame_dimension(frame, max_height)
+			put_cached_frame((video_path, frame_number, max_height), frame)
+	if frame is None:
+		video_decoder = get_video_decoder(video_path)
+		if video_decoder:
+			frame = read_video_decoder(video_decoder, frame_number)
+		if frame is None:
+			return None
+		if max_height:
+			frame = resize_frame_dimension(frame, max_height)
+		put_cached_frame((video_path, frame_number, max_height), frame)
+	# processors draw onto their frame, the cached one stays untouched
+	return frame.copy()
+
+
+def get_cached_frame(frame_cache_key : Tuple[str, int, int]) -> Optional[Frame]:
+	with THREAD_LOCK:
+		if frame_cache_key in FRAME_CACHE:
+			FRAME_CACHE.move_to_end(frame_cache_key)
+			return FRAME_CACHE[frame_cache_key]
+	return None
+
+
+def put_cached_frame(frame_cache_key : Tuple[str, int, int], frame : Frame) -> None:
+	with THREAD_LOCK:
+		FRAME_CACHE[frame_cache_key] = frame
+		while sum(cached_frame.nbytes for cached_frame in FRAME_CACHE.values()) > FRAME_CACHE_MEMORY and len(FRAME_CACHE) > 1:
+			FRAME_CACHE.popitem(last = False)
+
+
+def get_video_decoder(video_path : str) -> Optional[VideoDecoder]:
+	with THREAD_LOCK:
+		if video_path not in VIDEO_DECODERS:
+			capture = cv2.VideoCapture(video_path)
+			if not capture.isOpened():
+				return None
+			VIDEO_DECODERS[video_path] =\
+			{
+				'capture': capture,
+				'position': 0,
+				'frame_total': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+				'fps': capture.get(cv2.CAP_PROP_FPS),
+				'keyframes': None,
+				'lock': threading.Lock()
+			}
+			threading.Thread(target = index_keyframes, args = (video_path, VIDEO_DECODERS[video_path]), daemon = True).start()
+			while len(VIDEO_DECODERS) > VIDEO_DECODER_LIMIT:
+				close_video_decoder(VIDEO_DECODERS.pop(next(iter(VIDEO_DECODERS))))
+		return VIDEO_DECODERS[video_path]
+
+
+def read_video_decoder(video_decoder : VideoDecoder, frame_number : int) -> Optional[Frame]:
+	frame_index = max(min(video_decoder['frame_total'] - 1, frame_number - 1), 0)
+	with video_decoder['lock']:
+		capture = video_decoder['capture']
+		if not capture.isOpened():
+			return None
+		if not can_read_forward(video_decoder, frame_index):
+			capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+			video_decoder['position'] = frame_index
+		with measure('decode'):
+			while video_decoder['position'] < frame_index and capture.grab():
+				video_decoder['position'] += 1
+			has_frame, frame = capture.read()
+		# an unknown position forces the next read to seek
+		video_decoder['position'] = frame_index + 1 if has_frame else video_decoder['frame_total'] + 1
+	if has_frame:
+		return frame
+	return None
+
+
+def can_read_forward(video_decoder : VideoDecoder, frame_index : int) -> bool:
+	position = video_decoder['position']
+	keyframes = video_decoder['keyframes']
+	if frame_index < position:
+		return False
+	# a seek decodes from the keyframe before the frame, reading on costs less unless that keyframe lies ahead
+	if keyframes:
+		keyframe_index = bisect.bisect_right(keyframes, frame_index) - 1
+		return keyframe_index < 0 or keyframes[keyframe_index] <= position
+	return frame_index - position <= SEEK_FORWARD_LIMIT
+
+
+def index_keyframes(video_path : str, video_decoder : VideoDecoder) -> None:
+	commands = [ 'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags', '-of', 'csv=print_section=0', video_path ]
+	try:
+		output = subprocess.run(commands, stdout = subprocess.PIPE, stderr = subprocess.PIPE, check = True).stdout.decode()
+	except (OSError, subprocess.CalledProcessError):
+		return
+	packet_times = []
+	keyframe_times = []
+	for line in output.splitlines():
+		pts_time, _, flags = line.partition(',')
+		try:
+			packet_time = float(pts_time)
+		except ValueError:
+			continue
+		packet_times.append(packet_time)
+		if 'K' in flags:
+			keyframe_times.append(packet_time)
+	if keyframe_times and video_decoder['fps']:
+		start_time = min(packet_times)
+		video_decoder['keyframes'] = sorted({ round((keyframe_time - start_time) * video_decoder['fps']) for keyframe_time in keyframe_times })
+
+
+def close_video_decoder(video_decoder : VideoDecoder) -> None:
+	with video_decoder['lock']:
+		video_decoder['capture'].release()
+
+
+def clear_frame_cache() -> None:
+	with THREAD_LOCK:
+		for video_decoder in VIDEO_DECODERS.values():
+			close_video_decoder(video_decoder)
+		VIDEO_DECODERS.clear()
+		FRAME_CACHE.clear()
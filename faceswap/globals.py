@@ -1,12 +1,16 @@
 from typing import List, Optional
 
-from faceswap.typing import FaceRecognition, FaceAnalyserDirection, FaceAnalyserAge, FaceAnalyserGender, TempFrameFormat, OutputVideoEncoder
+from faceswap.typing import FaceRecognition, FaceAnalyserDirection, FaceAnalyserAge, FaceAnalyserGender, TempFrameFormat, OutputVideoEncoder, FrameEnhancerModel
 
 source_path : Optional[str] = None
 target_path : Optional[str] = None
 output_path : Optional[str] = None
 headless : Optional[bool] = None
+job_id : Optional[str] = None
 frame_processors : List[str] = []
+frame_enhancer_model : Optional[FrameEnhancerModel] = None
+frame_enhancer_tile_size : Optional[int] = None
+frame_enhancer_tile_batch_size : Optional[int] = None
 ui_layouts : List[str] = []
 keep_fps : Optional[bool] = None
 keep_temp : Optional[bool] = None
@@ -22,10 +26,25 @@ trim_frame_start : Optional[int] = None
 trim_frame_end : Optional[int] = None
 temp_frame_format : Optional[TempFrameFormat] = None
 temp_frame_quality : Optional[int] = None
+temp_frame_memory_limit : Optional[int] = None
 output_image_quality : Optional[int] = None
 output_video_encoder : Optional[OutputVideoEncoder] = None
 output_video_quality : Optional[int] = None
 max_memory : Optional[int] = None
+model_memory_limit : Optional[int] = None
+stream_latency_target : Optional[int] = None
+stream_frame_budget : Optional[int] = None
+stream_concurrency : Optional[int] = None
+stream_fake_camera_path : Optional[str] = None
 execution_providers : List[str] = []
 execution_thread_count : Optional[int] = None
 execution_queue_count : Optional[int] = None
+trace_path : Optional[str] = None
+batch_manifest_path : Optional[str] = None
+batch_source_pattern : Optional[str] = None
+batch_target_pattern : Optional[str] = None
+batch_parallelism : Optional[int] = None
+batch_report_path : Optional[str] = None
+server : Optional[bool] = None
+server_port : Optional[int] = None
+server_concurrency : Optional[int] = None
@@ -0,0 +1,113 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List
+import json
+import math
+import os
+import threading
+import time
+
+import faceswap.globals
+from faceswap.typing import MetricPercentiles
+
+METRIC_STAGES =\
+[
+	'capture',
+	'decode',
+	'batch',
+	'detection',
+	'recognition',
+	'swap',
+	'enhance',
+	'paste_back',
+	'encode',
+	'io'
+]
+# log scaled buckets keep a relative error of one percent at any magnitude
+METRIC_PRECISION = 0.01
+METRIC_LOG_BASE = math.log(1 + METRIC_PRECISION)
+METRIC_HISTOGRAMS : Dict[str, Dict[int, int]] = {}
+# long runs keep the newest events only
+TRACE_EVENT_LIMIT = 100000
+TRACE_EVENTS : Deque[Dict[str, Any]] = deque(maxlen = TRACE_EVENT_LIMIT)
+THREAD_LOCK = threading.Lock()
+
+
+@contextmanager
+def measure(stage_name : str) -> Iterator[None]:
+	start_time = time.perf_counter_ns()
+	try:
+		yield
+	finally:
+		end_time = time.perf_counter_ns()
+		record_metric(stage_name, (end_time - start_time) / 1000)
+		if faceswap.globals.trace_path:
+			record_trace_event(stage_name, start_time / 1000, (end_time - start_time) / 1000)
+
+
+def record_metric(stage_name : str, duration : float) -> None:
+	bucket_index = int(math.log(max(duration, 1)) / METRIC_LOG_BASE)
+	with THREAD_LOCK:
+		metric_histogram = METRIC_HISTOGRAMS.setdefault(stage_name, {})
+		metric_histogram[bucket_index] = metric_histogram.get(bucket_index, 0) + 1
+
+
+def record_trace_event(stage_name : str, start_time : float, duration : float) -> None:
+	with THREAD_LOCK:
+		TRACE_EVENTS.append(
+		{
+			'name': stage_name,
+			'ph': 'X',
+			'ts': start_time,
+			'dur': duration,
+			'pid': os.getpid(),
+			'tid': threading.get_ident()
+		})
+
+
+def get_metric_percentiles(stage_name : str) -> MetricPercentiles:
+	with THREAD_LOCK:
+		metric_histogram = dict(METRIC_HISTOGRAMS.get(stage_name, {}))
+	metric_total = sum(metric_histogram.values())
+	metric_percentiles : MetricPercentiles =\
+	{
+		'count': metric_total,
+		'p50': 0.0,
+		'p95': 0.0,
+		'p99': 0.0
+	}
+	for percentile_name, percentile in [ ('p50', 0.5), ('p95', 0.95), ('p99', 0.99) ]:
+		metric_count = 0
+		for bucket_index in sorted(metric_histogram):
+			metric_count += metric_histogram[bucket_index]
+			if metric_count >= metric_total * percentile:
+				# report the bucket upper bound in milliseconds
+				metric_percentiles[percentile_name] = round(math.exp((bucket_index + 1) * METRIC_LOG_BASE) / 1000, 2) # type: ignore[literal-required]
+				break
+	return metric_percentiles
+
+
+def get_metrics_summary() -> List[List[Any]]:
+	metrics_summary = []
+	for stage_name in METRIC_STAGES:
+		metric_percentiles = get_metric_percentiles(stage_name)
+		if metric_percentiles['count']:
+			metrics_summary.append([ stage_name, metric_percentiles['count'], metric_percentiles['p50'], metric_percentiles['p95'], metric_percentiles['p99'] ])
+	return metrics_summary
+
+
+def clear_metrics() -> None:
+	with THREAD_LOCK:
+		METRIC_HISTOGRAMS.clear()
+		TRACE_EVENTS.clear()
+
+
+def write_trace(trace_path : str) -> bool:
+	with THREAD_LOCK:
+		trace_events = list(TRACE_EVENTS)
+	try:
+		with open(trace_path, 'w') as trace_file:
+			json.dump({ 'traceEvents': trace_events, 'displayTimeUnit': 'ms' }, trace_file)
+		return True
+	except OSError:
+		return False
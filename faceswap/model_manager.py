@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+import os
+import threading
+
+import faceswap.globals
+
+MODELS : 'OrderedDict[str, Any]' = OrderedDict()
+MODEL_SIZES : Dict[str, int] = {}
+MODEL_STATISTICS : Dict[str, int] =\
+{
+	'loads': 0,
+	'hits': 0,
+	'evictions': 0
+}
+LOAD_LOCK = threading.Lock()
+THREAD_LOCK = threading.Lock()
+
+
+def get_model(model_name : str, model_path : str, load_model : Callable[[], Any]) -> Any:
+	with THREAD_LOCK:
+		if model_name in MODELS:
+			return hit_model(model_name)
+	# load outside the registry lock so resident models stay available meanwhile, evicting and loading stay one step
+	with LOAD_LOCK:
+		with THREAD_LOCK:
+			if model_name in MODELS:
+				return hit_model(model_name)
+		model_size = get_model_size(model_path)
+		evict_models(model_size)
+		model = load_model()
+		with THREAD_LOCK:
+			MODELS[model_name] = model
+			MODEL_SIZES[model_name] = model_size
+			MODEL_STATISTICS['loads'] += 1
+	return model
+
+
+def hit_model(model_name : str) -> Any:
+	MODELS.move_to_end(model_name)
+	MODEL_STATISTICS['hits'] += 1
+	return MODELS[model_name]
+
+
+def has_model(model_name : str) -> bool:
+	return model_name in MODELS
+
+
+def evict_models(model_size : int) -> None:
+	memory_limit = get_memory_limit()
+	if memory_limit:
+		with THREAD_LOCK:
+			while MODELS and sum(MODEL_SIZES.values()) + model_size > memory_limit:
+				model_name, _ = MODELS.popitem(last = False)
+				MODEL_SIZES.pop(model_name, None)
+				MODEL_STATISTICS['evictions'] += 1
+
+
+def clear_model(model_name : str) -> None:
+	with THREAD_LOCK:
+		MODELS.pop(model_name, None)
+		MODEL_SIZES.pop(model_name, None)
+
+
+def clear_models() -> None:
+	with THREAD_LOCK:
+		MODELS.clear()
+		MODEL_SIZES.clear()
+
+
+def get_memory_limit() -> int:
+	if faceswap.globals.model_memory_limit:
+		return faceswap.globals.model_memory_limit * 1024 ** 3
+	return 0
+
+
+def get_memory_usage() -> int:
+	return sum(MODEL_SIZES.values())
+
+
+def get_model_size(model_path : str) -> int:
+	if os.path.isdir(model_path):
+		return sum(os.path.getsize(os.path.join(directory_path, file_name)) for directory_path, _, file_names in os.walk(model_path) for file_name in file_names)
+	if os.path.isfile(model_path):
+		return os.path.getsize(model_path)
+	return 0
+
+
+def get_model_statistics() -> Dict[str, int]:
+	with THREAD_LOCK:
+		return\
+		{
+			**MODEL_STATISTICS,
+			'resident': len(MODELS),
+			'memory_usage': get_memory_usage()
+		}
@@ -0,0 +1,236 @@
+from collections import deque
+from types import ModuleType
+from typing import Any, List, Optional, Tuple
+import threading
+import time
+import uuid
+import cv2
+import numpy
+
+import faceswap.globals
+from faceswap import wording
+from faceswap.core import update_status
+from faceswap.face_analyser import get_batch_faces
+from faceswap.metrics import measure
+from faceswap.stream import create_frame_slot, put_frame_slot, get_frame_slot, close_frame_slot, run_capture, stop_stream_pipeline, create_quality_controller, scale_quality_frame, is_quality_detection_frame, finish_quality_frame
+from faceswap.typing import Face, Frame, MultiStream, MultiStreamStep, StreamSession
+
+MULTISTREAM : Optional[MultiStream] = None
+MULTISTREAM_BATCH_WINDOW = 0.005
+MULTISTREAM_DEADLINE = 1000
+MULTISTREAM_OPTIONAL_HEADROOM = 0.5
+MULTISTREAM_LATENCY_SIZE = 10000
+MULTISTREAM_STEP_TIME = 1
+THREAD_LOCK = threading.Lock()
+
+
+def get_multistream() -> MultiStream:
+	global MULTISTREAM
+
+	with THREAD_LOCK:
+		if MULTISTREAM is None or MULTISTREAM['closed']:
+			MULTISTREAM = start_multistream()
+		return MULTISTREAM
+
+
+def start_multistream() -> MultiStream:
+	multistream : MultiStream =\
+	{
+		'sessions': {},
+		'condition': threading.Condition(),
+		'closed': False,
+		'rotation': 0,
+		'step': create_multistream_step(0),
+		'steps': []
+	}
+	multistream['thread'] = threading.Thread(target = run_scheduler, args = (multistream,), daemon = True)
+	multistream['thread'].start()
+	return multistream
+
+
+def stop_multistream(multistream : MultiStream) -> None:
+	for stream_session in list(multistream['sessions'].values()):
+		remove_stream(multistream, stream_session)
+	with multistream['condition']:
+		multistream['closed'] = True
+		multistream['condition'].notify_all()
+	multistream['thread'].join()
+
+
+def add_stream(multistream : MultiStream, capture : Any, frame_processors_modules : List[ModuleType], source_face : Optional[Face]) -> StreamSession:
+	capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+	stream_session : StreamSession =\
+	{
+		'stream_id': uuid.uuid4().hex[:8],
+		'capture': capture,
+		'capture_slot': create_frame_slot(),
+		'output_slot': create_frame_slot(),
+		'frame_processors_modules': frame_processors_modules,
+		'source_face': source_face,
+		'quality_controller': create_quality_controller(),
+		'frame_number': 0,
+		'deficit': 0.0,
+		'statistics':
+		{
+			'captured': 0,
+			'processed': 0,
+			'dropped': 0,
+			'displayed': 0,
+			'late': 0,
+			'latency': 0.0
+		}
+	}
+	# every capture wakes the one scheduler that serves all streams
+	stream_session['capture_slot']['condition'] = multistream['condition']
+	stream_session['threads'] = [ threading.Thread(target = run_capture, args = (stream_session,), daemon = True) ]
+	with multistream['condition']:
+		finish_multistream_step(multistream, len(multistream['sessions']) + 1)
+		multistream['sessions'][stream_session['stream_id']] = stream_session
+	for thread in stream_session['threads']:
+		thread.start()
+	return stream_session
+
+
+def remove_stream(multistream : MultiStream, stream_session : StreamSession) -> None:
+	stop_stream_pipeline(stream_session)
+	with multistream['condition']:
+		if multistream['sessions'].pop(stream_session['stream_id'], None):
+			finish_multistream_step(multistream, len(multistream['sessions']))
+
+
+def get_multistream_deadline() -> float:
+	return (faceswap.globals.stream_latency_target or MULTISTREAM_DEADLINE) / 1000
+
+
+def run_scheduler(multistream : MultiStream) -> None:
+	while True:
+		with multistream['condition']:
+			multistream['condition'].wait_for(lambda: multistream['closed'] or any(is_session_ready(stream_session) or is_session_finished(stream_session) for stream_session in multistream['sessions'].values()))
+			if multistream['closed']:
+				break
+			# frames of the other streams that arrive within the window join the batch
+			multistream['condition'].wait_for(lambda: multistream['closed'] or all(is_session_ready(stream_session) or stream_session['capture_slot']['closed'] for stream_session in multistream['sessions'].values()), MULTISTREAM_BATCH_WINDOW)
+			close_finished_sessions(multistream)
+			stream_batch = []
+			for stream_session in select_sessions(multistream):
+				frame_slot_value = get_frame_slot(stream_session['capture_slot'], stream_session['frame_number'], 0)
+				if frame_slot_value:
+					next_frame_number, capture_time, temp_frame = frame_slot_value
+					stream_session['statistics']['dropped'] += next_frame_number - stream_session['frame_number'] - 1
+					stream_session['frame_number'] = next_frame_number
+					stream_batch.append((stream_session, capture_time, temp_frame))
+		process_stream_batch(multistream, stream_batch)
+
+
+def is_session_ready(stream_session : StreamSession) -> bool:
+	return stream_session['capture_slot']['frame_number'] > stream_session['frame_number']
+
+
+def is_session_finished(stream_session : StreamSession) -> bool:
+	return stream_session['capture_slot']['closed'] and not stream_session['output_slot']['closed'] and not is_session_ready(stream_session)
+
+
+def close_finished_sessions(multistream : MultiStream) -> None:
+	# readers of a stream that ran out of frames stop once everything captured is processed
+	for stream_session in multistream['sessions'].values():
+		if is_session_finished(stream_session):
+			close_frame_slot(stream_session['output_slot'])
+
+
+def select_sessions(multistream : MultiStream) -> List[StreamSession]:
+	stream_sessions = [ stream_session for stream_session in multistream['sessions'].values() if is_session_ready(stream_session) ]
+	selected_sessions : List[StreamSession] = []
+	if stream_sessions:
+		# the first stream served changes every round
+		rotation = multistream['rotation'] % len(stream_sessions)
+		stream_sessions = stream_sessions[rotation:] + stream_sessions[:rotation]
+		multistream['rotation'] += 1
+		# deficit round robin over the inference time, a heavy stream waits out its share instead of starving the others
+		quantum = get_multistream_deadline() * 1000 / len(stream_sessions)
+		while not selected_sessions:
+			for stream_session in stream_sessions:
+				stream_session['deficit'] = min(stream_session['deficit'] + quantum, quantum)
+				if stream_session['deficit'] > 0:
+					selected_sessions.append(stream_session)
+	return selected_sessions
+
+
+def process_stream_batch(multistream : MultiStream, stream_batch : List[Tuple[StreamSession, float, Frame]]) -> None:
+	deadline = get_multistream_deadline()
+	stream_entries = []
+	for stream_session, capture_time, temp_frame in stream_batch:
+		# a frame that already missed its deadline is dropped before it takes inference time
+		if time.perf_counter() - capture_time > deadline:
+			stream_session['statistics']['dropped'] += 1
+			multistream['step']['expired'] += 1
+			continue
+		stream_entries.append((stream_session, capture_time, temp_frame, scale_quality_frame(stream_session['quality_controller'], temp_frame)))
+	detection_entries = [ stream_entry for stream_entry in stream_entries if is_quality_detection_frame(stream_entry[0]['quality_controller'], stream_entry[0]['frame_processors_modules']) ]
+	detection_time = 0.0
+	if detection_entries:
+		start_time = time.perf_counter()
+		with measure('batch'):
+			batch_faces = get_batch_faces([ process_frame for _, _, _, process_frame in detection_entries ], [ stream_session['quality_controller']['many_faces'] for stream_session, _, _, _ in detection_entries ])
+		for (stream_session, _, _, _), many_faces in zip(detection_entries, batch_faces):
+			stream_session['quality_controller']['many_faces'] = many_faces
+		detection_time = (time.perf_counter() - start_time) / len(detection_entries)
+	for stream_session, capture_time, temp_frame, process_frame in stream_entries:
+		start_time = time.perf_counter()
+		# the shared detection counts towards the frame time of every stream in it
+		if any(stream_session is stream_entry[0] for stream_entry in detection_entries):
+			start_time -= detection_time
+		skip_optional = time.perf_counter() - capture_time > deadline * MULTISTREAM_OPTIONAL_HEADROOM
+		process_frame = finish_quality_frame(stream_session['quality_controller'], stream_session['frame_processors_modules'], stream_session['source_face'], temp_frame, process_frame, start_time, skip_optional)
+		put_frame_slot(stream_session['output_slot'], process_frame, capture_time)
+		stream_session['statistics']['processed'] += 1
+		stream_session['deficit'] -= (time.perf_counter() - start_time) * 1000
+		with multistream['condition']:
+			multistream['step']['processed'] += 1
+			multistream['step']['latencies'].append((time.perf_counter() - capture_time) * 1000)
+
+
+def create_multistream_step(stream_total : int) -> Any:
+	return\
+	{
+		'stream_total': stream_total,
+		'start_time': time.perf_counter(),
+		'processed': 0,
+		'expired': 0,
+		'latencies': deque(maxlen = MULTISTREAM_LATENCY_SIZE)
+	}
+
+
+def finish_multistream_step(multistream : MultiStream, stream_total : int) -> None:
+	multistream_step = get_multistream_step(multistream)
+	# throughput and latency are kept per number of streams, every added or removed stream starts a new step
+	if multistream_step['stream_total'] and multistream_step['processed'] and time.perf_counter() - multistream['step']['start_time'] >= MULTISTREAM_STEP_TIME:
+		multistream['steps'].append(multistream_step)
+		update_status(wording.get('multistream_step').format(
+			stream_total = multistream_step['stream_total'],
+			fps = multistream_step['fps'],
+			latency_p50 = multistream_step['latency_p50'],
+			latency_p95 = multistream_step['latency_p95'],
+			expired = multistream_step['expired']
+		))
+	multistream['step'] = create_multistream_step(stream_total)
+
+
+def get_multistream_step(multistream : MultiStream) -> MultiStreamStep:
+	with multistream['condition']:
+		step = multistream['step']
+		step_time = time.perf_counter() - step['start_time']
+		latencies = step['latencies'] or [ 0.0 ]
+		return\
+		{
+			'stream_total': step['stream_total'],
+			'processed': step['processed'],
+			'expired': step['expired'],
+			'fps': round(step['processed'] / step_time, 2) if step_time > 0 else 0.0,
+			'latency_p50': round(float(numpy.percentile(latencies, 50)), 2),
+			'latency_p95': round(float(numpy.percentile(latencies, 95)), 2)
+		}
+
+
+def get_multistream_steps(multistream : MultiStream) -> List[MultiStreamStep]:
+	with multistream['condition']:
+		return list(multistream['steps'])
@@ -2,20 +2,24 @@ import os
 import sys
 import importlib
 import psutil
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from queue import Queue
 from types import ModuleType
-from typing import Any, List, Callable
+from typing import Any, Dict, List, Callable
 from tqdm import tqdm
 
 import faceswap.globals
 from faceswap import wording
+from faceswap.typing import FrameProcessorCapabilities
+from faceswap.utilities import conditional_download, resolve_relative_path
 
-FRAME_PROCESSORS_MODULES : List[ModuleType] = []
+FRAME_PROCESSORS_REGISTRY : Dict[str, ModuleType] = {}
 FRAME_PROCESSORS_METHODS =\
 [
 	'get_frame_processor',
 	'clear_frame_processor',
+	'get_model_urls',
 	'pre_check',
 	'pre_process',
 	'process_frame',
@@ -24,14 +28,37 @@ FRAME_PROCESSORS_METHODS =\
 	'process_video',
 	'post_process'
 ]
+FRAME_PROCESSORS_CAPABILITIES =\
+[
+	'needs_faces',
+	'needs_source_face',
+	'can_batch',
+	'preferred_concurrency',
+	'changes_geometry',
+	'optional'
+]
+PROGRESS_LISTENERS : List[Callable[[int, int], None]] = []
+THREAD_LOCK = threading.Lock()
 
 
 def load_frame_processor_module(frame_processor : str) -> Any:
+	if frame_processor in FRAME_PROCESSORS_REGISTRY:
+		return FRAME_PROCESSORS_REGISTRY[frame_processor]
+	with THREAD_LOCK:
+		if frame_processor not in FRAME_PROCESSORS_REGISTRY:
+			FRAME_PROCESSORS_REGISTRY[frame_processor] = resolve_frame_processor_module(frame_processor)
+	return FRAME_PROCESSORS_REGISTRY[frame_processor]
+
+
+def resolve_frame_processor_module(frame_processor : str) -> ModuleType:
 	try:
 		frame_processor_module = importlib.import_module('faceswap.processors.frame.modules.' + frame_processor)
 		for method_name in FRAME_PROCESSORS_METHODS:
 			if not hasattr(frame_processor_module, method_name):
 				raise NotImplementedError
+		capabilities = getattr(frame_processor_module, 'CAPABILITIES', None)
+		if not isinstance(capabilities, dict) or any(capability_name not in capabilities for capability_name in FRAME_PROCESSORS_CAPABILITIES):
+			raise NotImplementedError
 	except ModuleNotFoundError:
 		sys.exit(wording.get('frame_processor_not_loaded').format(frame_processor = frame_processor))
 	except NotImplementedError:
@@ -40,28 +67,35 @@ def load_frame_processor_module(frame_processor : str) -> Any:
 
 
 def get_frame_processors_modules(frame_processors : List[str]) -> List[ModuleType]:
-	global FRAME_PROCESSORS_MODULES
+	return [ load_frame_processor_module(frame_processor) for frame_processor in frame_processors ]
 
-	if not FRAME_PROCESSORS_MODULES:
-		for frame_processor in frame_processors:
-			frame_processor_module = load_frame_processor_module(frame_processor)
-			FRAME_PROCESSORS_MODULES.append(frame_processor_module)
-	return FRAME_PROCESSORS_MODULES
 
+def pre_check_frame_processors(frame_processors : List[str]) -> bool:
+	frame_processors_modules = get_frame_processors_modules(frame_processors)
+	# one download call fetches the models of every processor concurrently
+	conditional_download(resolve_relative_path('../.assets/models'), [ model_url for frame_processor_module in frame_processors_modules for model_url in frame_processor_module.get_model_urls() ])
+	return all(frame_processor_module.pre_check() for frame_processor_module in frame_processors_modules)
 
-def clear_frame_processors_modules() -> None:
-	global FRAME_PROCESSORS_MODULES
 
-	for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors):
+def get_frame_processor_capabilities(frame_processor : str) -> FrameProcessorCapabilities:
+	return load_frame_processor_module(frame_processor).CAPABILITIES
+
+
+def has_frame_processor_capability(frame_processors : List[str], capability_name : str) -> bool:
+	return any(get_frame_processor_capabilities(frame_processor)[capability_name] for frame_processor in frame_processors)
+
+
+def clear_frame_processors_modules() -> None:
+	for frame_processor_module in FRAME_PROCESSORS_REGISTRY.values():
 		frame_processor_module.clear_frame_processor()
-	FRAME_PROCESSORS_MODULES = []
 
 
 def multi_process_frame(source_path : str, temp_frame_paths : List[str], process_frames: Callable[[str, List[str], Any], None], update: Callable[[], None]) -> None:
-	with ThreadPoolExecutor(max_workers = faceswap.globals.execution_thread_count) as executor:
+	execution_thread_count = faceswap.globals.execution_thread_count
+	with ThreadPoolExecutor(max_workers = execution_thread_count) as executor:
 		futures = []
 		queue = create_queue(temp_frame_paths)
-		queue_per_future = max(len(temp_frame_paths) // faceswap.globals.execution_thread_count * faceswap.globals.execution_queue_count, 1)
+		queue_per_future = max(len(temp_frame_paths) // execution_thread_count * faceswap.globals.execution_queue_count, 1)
 		while not queue.empty():
 			future = executor.submit(process_frames, source_path, pick_queue(queue, queue_per_future), update)
 			futures.append(future)
@@ -103,3 +137,5 @@ def update_progress(progress : Any = None) -> None:
 	})
 	progress.refresh()
 	progress.update(1)
+	for progress_listener in PROGRESS_LISTENERS:
+		progress_listener(progress.n, progress.total)
@@ -1,49 +1,55 @@
 from typing import Any, List, Callable
-import cv2
 import threading
-from gfpgan.utils import GFPGANer
 
 import faceswap.globals
-from faceswap import wording, utilities
+from faceswap import model_manager, wording, utilities
 from faceswap.core import update_status
 from faceswap.face_analyser import get_many_faces
-from faceswap.typing import Frame, Face, ProcessMode
-from faceswap.utilities import conditional_download, resolve_relative_path, is_image, is_video
+from faceswap.metrics import measure
+from faceswap.typing import Frame, Face, ProcessMode, FrameProcessorCapabilities
+from faceswap.utilities import conditional_download, resolve_relative_path, read_temp_frame, write_temp_frame, is_image, is_video, is_directory
 
-FRAME_PROCESSOR = None
-THREAD_SEMAPHORE = threading.Semaphore()
-THREAD_LOCK = threading.Lock()
 NAME = 'FACESWAP.FRAME_PROCESSOR.FACE_ENHANCER'
+CAPABILITIES : FrameProcessorCapabilities =\
+{
+	'needs_faces': True,
+	'needs_source_face': False,
+	'can_batch': False,
+	'preferred_concurrency': 1,
+	'changes_geometry': False,
+	'optional': True
+}
+# the cap holds around the model only, the other threads keep reading and writing frames
+THREAD_SEMAPHORE = threading.Semaphore(CAPABILITIES['preferred_concurrency'] or 1)
 
 
 def get_frame_processor() -> Any:
-	global FRAME_PROCESSOR
-
-	with THREAD_LOCK:
-		if FRAME_PROCESSOR is None:
-			model_path = resolve_relative_path('../.assets/models/GFPGANv1.4.pth')
-			FRAME_PROCESSOR = GFPGANer(
-				model_path = model_path,
-				upscale = 1,
-				device = utilities.get_device(faceswap.globals.execution_providers)
-			)
-	return FRAME_PROCESSOR
+	from gfpgan.utils import GFPGANer
+
+	model_path = resolve_relative_path('../.assets/models/GFPGANv1.4.pth')
+	return model_manager.get_model(NAME, model_path, lambda: GFPGANer(
+		model_path = model_path,
+		upscale = 1,
+		device = utilities.get_device(faceswap.globals.execution_providers)
+	))
 
 
 def clear_frame_processor() -> None:
-	global FRAME_PROCESSOR
+	model_manager.clear_model(NAME)
+
 
-	FRAME_PROCESSOR = None
+def get_model_urls() -> List[str]:
+	return [ 'https://github.com/faceswap/faceswap-assets/releases/download/models/GFPGANv1.4.pth' ]
 
 
 def pre_check() -> bool:
 	download_directory_path = resolve_relative_path('../.assets/models')
-	conditional_download(download_directory_path, [ 'https://github.com/faceswap/faceswap-assets/releases/download/models/GFPGANv1.4.pth' ])
+	conditional_download(download_directory_path, get_model_urls())
 	return True
 
 
 def pre_process(mode : ProcessMode) -> bool:
-	if mode in [ 'output', 'preview' ] and not is_image(faceswap.globals.target_path) and not is_video(faceswap.globals.target_path):
+	if mode in [ 'output', 'preview' ] and not is_image(faceswap.globals.target_path) and not is_video(faceswap.globals.target_path) and not is_directory(faceswap.globals.target_path):
 		update_status(wording.get('select_image_or_video_target') + wording.get('exclamation_mark'), NAME)
 		return False
 	if mode == 'output' and not faceswap.globals.output_path:
@@ -53,7 +59,7 @@ def pre_process(mode : ProcessMode) -> bool:
 
 
 def post_process() -> None:
-	clear_frame_processor()
+	pass
 
 
 def enhance_face(target_face : Face, temp_frame : Frame) -> Frame:
@@ -66,12 +72,13 @@ def enhance_face(target_face : Face, temp_frame : Frame) -> Frame:
 	end_y = max(0, end_y + padding_y)
 	crop_frame = temp_frame[start_y:end_y, start_x:end_x]
 	if crop_frame.size:
-		with THREAD_SEMAPHORE:
+		with THREAD_SEMAPHORE, measure('enhance'):
 			_, _, crop_frame = get_frame_processor().enhance(
 				crop_frame,
 				paste_back = True
 			)
-		temp_frame[start_y:end_y, start_x:end_x] = crop_frame
+		with measure('paste_back'):
+			temp_frame[start_y:end_y, start_x:end_x] = crop_frame
 	return temp_frame
 
 
@@ -85,17 +92,15 @@ def process_frame(source_face : Face, reference_face : Face, temp_frame : Frame)
 
 def process_frames(source_path : str, temp_frame_paths : List[str], update: Callable[[], None]) -> None:
 	for temp_frame_path in temp_frame_paths:
-		temp_frame = cv2.imread(temp_frame_path)
+		temp_frame = read_temp_frame(temp_frame_path)
 		result_frame = process_frame(None, None, temp_frame)
-		cv2.imwrite(temp_frame_path, result_frame)
+		write_temp_frame(temp_frame_path, result_frame)
 		if update:
 			update()
 
 
-def process_image(source_path : str, target_path : str, output_path : str) -> None:
-	target_frame = cv2.imread(target_path)
-	result_frame = process_frame(None, None, target_frame)
-	cv2.imwrite(output_path, result_frame)
+def process_image(source_path : str, target_frame : Frame) -> Frame:
+	return process_frame(None, None, target_frame)
 
 
 def process_video(source_path : str, temp_frame_paths : List[str]) -> None:
@@ -1,41 +1,46 @@
 from typing import Any, List, Callable
 import cv2
-import insightface
-import threading
 
 import faceswap.globals
 import faceswap.processors.frame.core as frame_processors
-from faceswap import wording
+from faceswap import model_manager, wording
 from faceswap.core import update_status
 from faceswap.face_analyser import get_one_face, get_many_faces, find_similar_faces
 from faceswap.face_reference import get_face_reference, set_face_reference
-from faceswap.typing import Face, Frame, ProcessMode
-from faceswap.utilities import conditional_download, resolve_relative_path, is_image, is_video
+from faceswap.metrics import measure
+from faceswap.typing import Face, Frame, ProcessMode, FrameProcessorCapabilities
+from faceswap.utilities import conditional_download, resolve_relative_path, read_temp_frame, write_temp_frame, is_image, is_video, is_directory
 
-FRAME_PROCESSOR = None
-THREAD_LOCK = threading.Lock()
 NAME = 'FACESWAP.FRAME_PROCESSOR.FACE_SWAPPER'
+CAPABILITIES : FrameProcessorCapabilities =\
+{
+	'needs_faces': True,
+	'needs_source_face': True,
+	'can_batch': False,
+	'preferred_concurrency': None,
+	'changes_geometry': False,
+	'optional': False
+}
 
 
 def get_frame_processor() -> Any:
-	global FRAME_PROCESSOR
+	import insightface
 
-	with THREAD_LOCK:
-		if FRAME_PROCESSOR is None:
-			model_path = resolve_relative_path('../.assets/models/inswapper_128.onnx')
-			FRAME_PROCESSOR = insightface.model_zoo.get_model(model_path, providers = faceswap.globals.execution_providers)
-	return FRAME_PROCESSOR
+	model_path = resolve_relative_path('../.assets/models/inswapper_128.onnx')
+	return model_manager.get_model(NAME, model_path, lambda: insightface.model_zoo.get_model(model_path, providers = faceswap.globals.execution_providers))
 
 
 def clear_frame_processor() -> None:
-	global FRAME_PROCESSOR
+	model_manager.clear_model(NAME)
 
-	FRAME_PROCESSOR = None
+
+def get_model_urls() -> List[str]:
+	return [ 'https://github.com/faceswap/faceswap-assets/releases/download/models/inswapper_128.onnx' ]
 
 
 def pre_check() -> bool:
 	download_directory_path = resolve_relative_path('../.assets/models')
-	conditional_download(download_directory_path, [ 'https://github.com/faceswap/faceswap-assets/releases/download/models/inswapper_128.onnx' ])
+	conditional_download(download_directory_path, get_model_urls())
 	return True
 
 
@@ -46,7 +51,7 @@ def pre_process(mode : ProcessMode) -> bool:
 	elif not get_one_face(cv2.imread(faceswap.globals.source_path)):
 		update_status(wording.get('no_source_face_detected') + wording.get('exclamation_mark'), NAME)
 		return False
-	if mode in [ 'output', 'preview' ] and not is_image(faceswap.globals.target_path) and not is_video(faceswap.globals.target_path):
+	if mode in [ 'output', 'preview' ] and not is_image(faceswap.globals.target_path) and not is_video(faceswap.globals.target_path) and not is_directory(faceswap.globals.target_path):
 		update_status(wording.get('select_image_or_video_target') + wording.get('exclamation_mark'), NAME)
 	if mode == 'output' and not faceswap.globals.output_path:
 		update_status(wording.get('select_file_or_directory_output') + wording.get('exclamation_mark'), NAME)
@@ -55,11 +60,13 @@ def pre_process(mode : ProcessMode) -> bool:
 
 
 def post_process() -> None:
-	clear_frame_processor()
+	pass
 
 
 def swap_face(source_face : Face, target_face : Face, temp_frame : Frame) -> Frame:
-	return get_frame_processor().get(temp_frame, target_face, source_face, paste_back = True)
+	# the model pastes back itself, so swap includes paste back here
+	with measure('swap'):
+		return get_frame_processor().get(temp_frame, target_face, source_face, paste_back = True)
 
 
 def process_frame(source_face : Face, reference_face : Face, temp_frame : Frame) -> Frame:
@@ -80,19 +87,17 @@ def process_frames(source_path : str, temp_frame_paths : List[str], update: Call
 	source_face = get_one_face(cv2.imread(source_path))
 	reference_face = get_face_reference() if 'reference' in faceswap.globals.face_recognition else None
 	for temp_frame_path in temp_frame_paths:
-		temp_frame = cv2.imread(temp_frame_path)
+		temp_frame = read_temp_frame(temp_frame_path)
 		result_frame = process_frame(source_face, reference_face, temp_frame)
-		cv2.imwrite(temp_frame_path, result_frame)
+		write_temp_frame(temp_frame_path, result_frame)
 		if update:
 			update()
 
 
-def process_image(source_path : str, target_path : str, output_path : str) -> None:
+def process_image(source_path : str, target_frame : Frame) -> Frame:
 	source_face = get_one_face(cv2.imread(source_path))
-	target_frame = cv2.imread(target_path)
 	reference_face = get_one_face(target_frame, faceswap.globals.reference_face_position) if 'reference' in faceswap.globals.face_recognition else None
-	result_frame = process_frame(source_face, reference_face, target_frame)
-	cv2.imwrite(output_path, result_frame)
+	return process_frame(source_face, reference_face, target_frame)
 
 
 def process_video(source_path : str, temp_frame_paths : List[str]) -> None:
@@ -1,56 +1,83 @@
-from typing import Any, List, Callable
+from typing import Any, Dict, List, Tuple, Callable
+import time
 import cv2
+import numpy
+import psutil
 import threading
-from basicsr.archs.rrdbnet_arch import RRDBNet
-from realesrgan import RealESRGANer
 
-import faceswap
+import faceswap.choices
+import faceswap.globals
 import faceswap.processors.frame.core as frame_processors
-from faceswap import wording, utilities
+from faceswap import model_manager, wording, utilities
 from faceswap.core import update_status
-from faceswap.typing import Frame, Face, ProcessMode
-from faceswap.utilities import conditional_download, resolve_relative_path
+from faceswap.metrics import measure
+from faceswap.typing import Frame, Face, ProcessMode, FrameProcessorCapabilities
+from faceswap.utilities import conditional_download, resolve_relative_path, read_temp_frame, write_temp_frame
 
-FRAME_PROCESSOR = None
-THREAD_SEMAPHORE = threading.Semaphore()
-THREAD_LOCK = threading.Lock()
 NAME = 'FACESWAP.FRAME_PROCESSOR.FRAME_ENHANCER'
+CAPABILITIES : FrameProcessorCapabilities =\
+{
+	'needs_faces': False,
+	'needs_source_face': False,
+	'can_batch': True,
+	'preferred_concurrency': 1,
+	'changes_geometry': False,
+	'optional': True
+}
+THREAD_SEMAPHORE = threading.Semaphore(CAPABILITIES['preferred_concurrency'] or 1)
+MODELS : Dict[str, Dict[str, Any]] =\
+{
+	'real_esrgan_x2plus':
+	{
+		'url': 'https://github.com/faceswap/faceswap-assets/releases/download/models/RealESRGAN_x2plus.pth',
+		'path': resolve_relative_path('../.assets/models/RealESRGAN_x2plus.pth'),
+		'scale': 2
+	},
+	'real_esrgan_x4plus':
+	{
+		'url': 'https://github.com/faceswap/faceswap-assets/releases/download/models/RealESRGAN_x4plus.pth',
+		'path': resolve_relative_path('../.assets/models/RealESRGAN_x4plus.pth'),
+		'scale': 4
+	}
+}
+TILE_PAD = 16
+TILE_SIZE_CACHE : Dict[Tuple[Any, ...], int] = {}
 
 
 def get_frame_processor() -> Any:
-	global FRAME_PROCESSOR
-
-	with THREAD_LOCK:
-		if FRAME_PROCESSOR is None:
-			model_path = resolve_relative_path('../.assets/models/RealESRGAN_x4plus.pth')
-			FRAME_PROCESSOR = RealESRGANer(
-				model_path = model_path,
-				model = RRDBNet(
-					num_in_ch = 3,
-					num_out_ch = 3,
-					num_feat = 64,
-					num_block = 23,
-					num_grow_ch = 32,
-					scale = 4
-				),
-				device = utilities.get_device(faceswap.globals.execution_providers),
-				tile = 512,
-				tile_pad = 32,
-				pre_pad = 0,
-				scale = 4
-			)
-	return FRAME_PROCESSOR
+	from basicsr.archs.rrdbnet_arch import RRDBNet
+	from realesrgan import RealESRGANer
+
+	model = MODELS[faceswap.globals.frame_enhancer_model]
+	return model_manager.get_model(NAME + '.' + faceswap.globals.frame_enhancer_model, model['path'], lambda: RealESRGANer(
+		model_path = model['path'],
+		model = RRDBNet(
+			num_in_ch = 3,
+			num_out_ch = 3,
+			num_feat = 64,
+			num_block = 23,
+			num_grow_ch = 32,
+			scale = model['scale']
+		),
+		device = utilities.get_device(faceswap.globals.execution_providers),
+		pre_pad = 0,
+		scale = model['scale']
+	))
 
 
 def clear_frame_processor() -> None:
-	global FRAME_PROCESSOR
+	for frame_enhancer_model in MODELS:
+		model_manager.clear_model(NAME + '.' + frame_enhancer_model)
+	TILE_SIZE_CACHE.clear()
 
-	FRAME_PROCESSOR = None
+
+def get_model_urls() -> List[str]:
+	return [ MODELS[faceswap.globals.frame_enhancer_model]['url'] ]
 
 
 def pre_check() -> bool:
 	download_directory_path = resolve_relative_path('../.assets/models')
-	conditional_download(download_directory_path, [ 'https://github.com/faceswap/faceswap-assets/releases/download/models/RealESRGAN_x4plus.pth' ])
+	conditional_download(download_directory_path, get_model_urls())
 	return True
 
 
@@ -62,32 +89,121 @@ def pre_process(mode : ProcessMode) -> bool:
 
 
 def post_process() -> None:
-	clear_frame_processor()
+	pass
 
 
 def enhance_frame(temp_frame : Frame) -> Frame:
-	with THREAD_SEMAPHORE:
-		temp_frame, _ = get_frame_processor().enhance(temp_frame, outscale = 1)
+	with THREAD_SEMAPHORE, measure('enhance'):
+		tile_size = get_tile_size(temp_frame)
+		temp_frame = enhance_tiles(temp_frame, tile_size, faceswap.globals.frame_enhancer_tile_batch_size)
 	return temp_frame
 
 
+def enhance_tiles(temp_frame : Frame, tile_size : int, tile_batch_size : int) -> Frame:
+	model_scale = MODELS[faceswap.globals.frame_enhancer_model]['scale']
+	height, width = temp_frame.shape[:2]
+	pad_frame, tile_positions = prepare_tiles(temp_frame, tile_size)
+	output_frame = numpy.zeros((pad_frame.shape[0] * model_scale, pad_frame.shape[1] * model_scale, 3), dtype = numpy.float32)
+	for index in range(0, len(tile_positions), tile_batch_size):
+		batch_positions = tile_positions[index:index + tile_batch_size]
+		output_tiles = forward_tiles(pad_frame, batch_positions, tile_size)
+		for (start_y, start_x), output_tile in zip(batch_positions, output_tiles):
+			output_frame[start_y * model_scale:(start_y + tile_size) * model_scale, start_x * model_scale:(start_x + tile_size) * model_scale] = output_tile[TILE_PAD * model_scale:(TILE_PAD + tile_size) * model_scale, TILE_PAD * model_scale:(TILE_PAD + tile_size) * model_scale]
+	output_frame = output_frame[:height * model_scale, :width * model_scale]
+	output_frame = (output_frame.clip(0, 1) * 255).round().astype(numpy.uint8)
+	output_frame = cv2.cvtColor(output_frame, cv2.COLOR_RGB2BGR)
+	return cv2.resize(output_frame, (width, height), interpolation = cv2.INTER_LANCZOS4)
+
+
+def prepare_tiles(temp_frame : Frame, tile_size : int) -> Tuple[Frame, List[Tuple[int, int]]]:
+	height, width = temp_frame.shape[:2]
+	pad_height = (tile_size - height % tile_size) % tile_size
+	pad_width = (tile_size - width % tile_size) % tile_size
+	# pad to whole tiles so every tile shares one shape and can be batched
+	pad_frame = cv2.copyMakeBorder(temp_frame, TILE_PAD, TILE_PAD + pad_height, TILE_PAD, TILE_PAD + pad_width, cv2.BORDER_REFLECT_101)
+	pad_frame = cv2.cvtColor(pad_frame, cv2.COLOR_BGR2RGB).astype(numpy.float32) / 255
+	tile_positions = [ (start_y, start_x) for start_y in range(0, height + pad_height, tile_size) for start_x in range(0, width + pad_width, tile_size) ]
+	return pad_frame, tile_positions
+
+
+def forward_tiles(pad_frame : Frame, tile_positions : List[Tuple[int, int]], tile_size : int) -> Frame:
+	import torch
+
+	frame_processor = get_frame_processor()
+	tile_frames = numpy.stack([ pad_frame[start_y:start_y + tile_size + TILE_PAD * 2, start_x:start_x + tile_size + TILE_PAD * 2] for start_y, start_x in tile_positions ])
+	with torch.no_grad():
+		tile_tensor = torch.from_numpy(tile_frames.transpose(0, 3, 1, 2)).to(frame_processor.device)
+		if frame_processor.half:
+			tile_tensor = tile_tensor.half()
+		output_tensor = frame_processor.model(tile_tensor)
+	return output_tensor.float().cpu().numpy().transpose(0, 2, 3, 1)
+
+
+def get_tile_size(temp_frame : Frame) -> int:
+	if faceswap.globals.frame_enhancer_tile_size:
+		return faceswap.globals.frame_enhancer_tile_size
+	height, width = temp_frame.shape[:2]
+	# the fastest tile differs per model and device, not only per resolution
+	tile_key = height, width, faceswap.globals.frame_enhancer_model, tuple(faceswap.globals.execution_providers), faceswap.globals.frame_enhancer_tile_batch_size
+	if tile_key not in TILE_SIZE_CACHE:
+		TILE_SIZE_CACHE[tile_key] = autotune_tile_size(temp_frame)
+	return TILE_SIZE_CACHE[tile_key]
+
+
+def autotune_tile_size(temp_frame : Frame) -> int:
+	tile_batch_size = faceswap.globals.frame_enhancer_tile_batch_size
+	memory_budget = get_memory_budget()
+	tile_sizes = [ tile_size for tile_size in faceswap.choices.frame_enhancer_tile_size if estimate_tile_memory(tile_size, tile_batch_size) <= memory_budget ]
+	tile_sizes = [ tile_size for tile_size in tile_sizes if tile_size <= max(temp_frame.shape[:2]) ] or [ min(faceswap.choices.frame_enhancer_tile_size) ]
+	process_times = []
+	for tile_size in tile_sizes:
+		pad_frame, tile_positions = prepare_tiles(temp_frame, tile_size)
+		batch_positions = tile_positions[:tile_batch_size]
+		# warm up once to exclude allocator and kernel setup from the measure
+		if not process_times:
+			forward_tiles(pad_frame, batch_positions, tile_size)
+		start_time = time.perf_counter()
+		forward_tiles(pad_frame, batch_positions, tile_size)
+		batch_time = time.perf_counter() - start_time
+		batch_total = -(-len(tile_positions) // tile_batch_size)
+		process_times.append(batch_time * batch_total)
+	return tile_sizes[process_times.index(min(process_times))]
+
+
+def estimate_tile_memory(tile_size : int, tile_batch_size : int) -> int:
+	model_scale = MODELS[faceswap.globals.frame_enhancer_model]['scale']
+	tile_pixel_total = (tile_size + TILE_PAD * 2) ** 2 * tile_batch_size
+	# dense block features plus the upsampled output, both in float32
+	return tile_pixel_total * 4 * (192 + 64 * model_scale ** 2)
+
+
+def get_memory_budget() -> int:
+	import torch
+
+	if utilities.get_device(faceswap.globals.execution_providers) == 'cuda':
+		memory_free, _ = torch.cuda.mem_get_info()
+		return memory_free // 2
+	memory_free = psutil.virtual_memory().available
+	if faceswap.globals.max_memory:
+		memory_free = min(memory_free, faceswap.globals.max_memory * 1024 ** 3)
+	return memory_free // 2
+
+
 def process_frame(source_face : Face, reference_face : Face, temp_frame : Frame) -> Frame:
 	return enhance_frame(temp_frame)
 
 
 def process_frames(source_path : str, temp_frame_paths : List[str], update: Callable[[], None]) -> None:
 	for temp_frame_path in temp_frame_paths:
-		temp_frame = cv2.imread(temp_frame_path)
+		temp_frame = read_temp_frame(temp_frame_path)
 		result_frame = process_frame(None, None, temp_frame)
-		cv2.imwrite(temp_frame_path, result_frame)
+		write_temp_frame(temp_frame_path, result_frame)
 		if update:
 			update()
 
 
-def process_image(source_path : str, target_path : str, output_path : str) -> None:
-	target_frame = cv2.imread(target_path)
-	result = process_frame(None, None, target_frame)
-	cv2.imwrite(output_path, result)
+def process_image(source_path : str, target_frame : Frame) -> Frame:
+	return process_frame(None, None, target_frame)
 
 
 def process_video(source_path : str, temp_frame_paths : List[str]) -> None:
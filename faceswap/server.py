@@ -0,0 +1,305 @@
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import json
+import multiprocessing
+import sys
+import threading
+import uuid
+
+import faceswap.globals
+import faceswap.processors.frame.core as frame_processors
+from faceswap import core, wording
+from faceswap.batch import run_batch_job
+from faceswap.typing import BatchJob, ServerJob, ServerWorker
+
+SERVER_JOBS : Dict[str, ServerJob] = {}
+SERVER_JOB_LIMIT = 1000
+SERVER_QUEUE : Deque[str] = deque()
+SERVER_WORKERS : List[ServerWorker] = []
+SERVER_BASE_ARGS : List[str] = []
+SERVER_STOP = threading.Event()
+HTTP_SERVER : Optional[ThreadingHTTPServer] = None
+EVENT_QUEUE : Any = None
+WORKER_JOB_ID : Optional[str] = None
+WORKER_STOP_TIMEOUT = 5
+THREAD_LOCK = threading.RLock()
+
+
+def run() -> None:
+	http_server = start('127.0.0.1', faceswap.globals.server_port, faceswap.globals.server_concurrency, sys.argv[1:])
+	host, port = http_server.server_address[:2]
+	core.update_status(wording.get('server_started').format(host = host, port = port))
+	try:
+		SERVER_STOP.wait()
+	finally:
+		stop()
+
+
+def start(host : str, port : int, concurrency : int, base_args : List[str]) -> ThreadingHTTPServer:
+	global HTTP_SERVER, EVENT_QUEUE
+
+	SERVER_STOP.clear()
+	SERVER_BASE_ARGS[:] = base_args
+	# spawn keeps the workers clear of the threads and native state of this process
+	EVENT_QUEUE = multiprocessing.get_context('spawn').Queue()
+	for _ in range(max(concurrency, 1)):
+		SERVER_WORKERS.append(create_worker())
+	threading.Thread(target = listen_events, daemon = True).start()
+	HTTP_SERVER = ThreadingHTTPServer((host, port), ServerRequestHandler)
+	threading.Thread(target = HTTP_SERVER.serve_forever, daemon = True).start()
+	return HTTP_SERVER
+
+
+def stop() -> None:
+	SERVER_STOP.set()
+	if HTTP_SERVER:
+		HTTP_SERVER.shutdown()
+		HTTP_SERVER.server_close()
+	with THREAD_LOCK:
+		for server_worker in SERVER_WORKERS:
+			server_worker['task_queue'].put(None)
+		for server_worker in SERVER_WORKERS:
+			server_worker['process'].join(timeout = WORKER_STOP_TIMEOUT)
+			if server_worker['process'].is_alive():
+				server_worker['process'].terminate()
+		SERVER_WORKERS.clear()
+		SERVER_QUEUE.clear()
+		SERVER_JOBS.clear()
+
+
+def create_worker() -> ServerWorker:
+	context = multiprocessing.get_context('spawn')
+	task_queue = context.Queue()
+	process = context.Process(target = run_worker, args = (SERVER_BASE_ARGS, task_queue, EVENT_QUEUE), daemon = True)
+	process.start()
+	return\
+	{
+		'process': process,
+		'task_queue': task_queue,
+		'job_id': None
+	}
+
+
+def run_worker(base_args : List[str], task_queue : Any, event_queue : Any) -> None:
+	global WORKER_JOB_ID
+
+	core.apply_args(core.create_program().parse_args(base_args))
+	core.limit_resources()
+	core.STATUS_LISTENERS.append(lambda message, scope: event_queue.put(('message', WORKER_JOB_ID, message)))
+	frame_processors.PROGRESS_LISTENERS.append(lambda progress_count, progress_total: event_queue.put(('progress', WORKER_JOB_ID, progress_count / max(progress_total, 1))))
+	# models stay resident for every job this worker receives
+	pre_load_error = None
+	try:
+		core.pre_load()
+	except Exception as exception:
+		pre_load_error = wording.get('pre_load_failed').format(error = exception)
+		core.update_status(pre_load_error)
+	while True:
+		task = task_queue.get()
+		if task is None:
+			break
+		WORKER_JOB_ID, batch_job = task
+		if pre_load_error:
+			event_queue.put(('report', WORKER_JOB_ID,
+			{
+				'index': 1,
+				'source_path': batch_job.get('source'),
+				'target_path': batch_job.get('target'),
+				'output_path': batch_job.get('output'),
+				'status': 'failed',
+				'error': pre_load_error,
+				'process_time': 0.0
+			}))
+		else:
+			event_queue.put(('report', WORKER_JOB_ID, run_batch_job(base_args, batch_job, 1)))
+
+
+def listen_events() -> None:
+	while not SERVER_STOP.is_set():
+		try:
+			event_name, job_id, event_value = EVENT_QUEUE.get(timeout = 0.5)
+			handle_event(event_name, job_id, event_value)
+		except Empty:
+			pass
+		except (EOFError, OSError):
+			break
+		restore_workers()
+
+
+def handle_event(event_name : str, job_id : str, event_value : Any) -> None:
+	with THREAD_LOCK:
+		server_job = SERVER_JOBS.get(job_id)
+		# events of cancelled jobs may still arrive from their terminated worker
+		if not server_job or server_job['status'] != 'running':
+			return
+		if event_name == 'message':
+			server_job['message'] = event_value
+		if event_name == 'progress':
+			server_job['progress'] = round(event_value, 2)
+		if event_name == 'report':
+			server_job['status'] = event_value['status']
+			server_job['error'] = event_value['error']
+			server_job['output_path'] = event_value['output_path']
+			server_job['process_time'] = event_value['process_time']
+			if server_job['status'] == 'completed':
+				server_job['progress'] = 1.0
+			for server_worker in SERVER_WORKERS:
+				if server_worker['job_id'] == job_id:
+					server_worker['job_id'] = None
+			dispatch_jobs()
+
+
+def restore_workers() -> None:
+	with THREAD_LOCK:
+		if SERVER_STOP.is_set():
+			return
+		for index, server_worker in enumerate(SERVER_WORKERS):
+			if not server_worker['process'].is_alive():
+				server_job = SERVER_JOBS.get(server_worker['job_id'])
+				if server_job and server_job['status'] == 'running':
+					server_job['status'] = 'failed'
+					server_job['error'] = wording.get('server_worker_exited')
+				SERVER_WORKERS[index] = create_worker()
+		dispatch_jobs()
+
+
+def dispatch_jobs() -> None:
+	with THREAD_LOCK:
+		for server_worker in SERVER_WORKERS:
+			if server_worker['job_id'] is None and SERVER_QUEUE:
+				job_id = SERVER_QUEUE.popleft()
+				server_worker['job_id'] = job_id
+				SERVER_JOBS[job_id]['status'] = 'running'
+				server_worker['task_queue'].put((job_id, SERVER_JOBS[job_id]['request']))
+
+
+def submit_job(batch_job : BatchJob) -> ServerJob:
+	job_id = uuid.uuid4().hex[:8]
+	with THREAD_LOCK:
+		SERVER_JOBS[job_id] =\
+		{
+			'job_id': job_id,
+			'request': batch_job,
+			'status': 'queued',
+			'progress': 0.0,
+			'message': None,
+			'error': None,
+			'output_path': None,
+			'process_time': None
+		}
+		SERVER_QUEUE.append(job_id)
+		prune_jobs()
+		dispatch_jobs()
+		return get_job(job_id)
+
+
+def prune_jobs() -> None:
+	# finished jobs give way oldest first, queued and running ones are kept
+	with THREAD_LOCK:
+		finished_job_ids = [ job_id for job_id, server_job in SERVER_JOBS.items() if server_job['status'] not in [ 'queued', 'running' ] ]
+		for job_id in finished_job_ids[:max(len(SERVER_JOBS) - SERVER_JOB_LIMIT, 0)]:
+			del SERVER_JOBS[job_id]
+
+
+def get_job(job_id : str) -> Optional[ServerJob]:
+	with THREAD_LOCK:
+		if job_id in SERVER_JOBS:
+			return dict(SERVER_JOBS[job_id]) # type: ignore[return-value]
+	return None
+
+
+def get_jobs() -> List[ServerJob]:
+	with THREAD_LOCK:
+		return [ dict(server_job) for server_job in SERVER_JOBS.values() ] # type: ignore[misc]
+
+
+def cancel_job(job_id : str) -> Optional[ServerJob]:
+	cancelled_processes = []
+	with THREAD_LOCK:
+		server_job = SERVER_JOBS.get(job_id)
+		if not server_job or server_job['status'] not in [ 'queued', 'running' ]:
+			return None
+		if server_job['status'] == 'queued':
+			SERVER_QUEUE.remove(job_id)
+		if server_job['status'] == 'running':
+			# a running job is only interruptible with its worker, the replacement warms up again
+			for index, server_worker in enumerate(SERVER_WORKERS):
+				if server_worker['job_id'] == job_id:
+					cancelled_processes.append(server_worker['process'])
+					SERVER_WORKERS[index] = create_worker()
+		server_job['status'] = 'cancelled'
+		dispatch_jobs()
+	# waiting for the old worker must not stall the other requests
+	for process in cancelled_processes:
+		process.terminate()
+		process.join(timeout = WORKER_STOP_TIMEOUT)
+		if process.is_alive():
+			process.kill()
+			process.join()
+	return get_job(job_id)
+
+
+def get_health() -> Dict[str, Any]:
+	with THREAD_LOCK:
+		return\
+		{
+			'workers': len(SERVER_WORKERS),
+			'workers_busy': len([ server_worker for server_worker in SERVER_WORKERS if server_worker['job_id'] ]),
+			'jobs_queued': len(SERVER_QUEUE)
+		}
+
+
+class ServerRequestHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self) -> None:
+		resource, job_id = parse_path(self.path)
+		if resource == 'health' and not job_id:
+			self.send_json(200, get_health())
+		elif resource == 'jobs' and not job_id:
+			self.send_json(200, get_jobs())
+		elif resource == 'jobs' and get_job(job_id):
+			self.send_json(200, get_job(job_id))
+		else:
+			self.send_json(404, { 'error': wording.get('server_job_not_found').format(job_id = job_id) })
+
+	def do_POST(self) -> None:
+		resource, job_id = parse_path(self.path)
+		try:
+			batch_job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+		except ValueError:
+			batch_job = None
+		if resource != 'jobs' or job_id:
+			self.send_json(404, { 'error': wording.get('server_request_invalid') })
+		elif not isinstance(batch_job, dict):
+			self.send_json(400, { 'error': wording.get('server_request_invalid') })
+		else:
+			self.send_json(201, submit_job(batch_job))
+
+	def do_DELETE(self) -> None:
+		resource, job_id = parse_path(self.path)
+		if resource != 'jobs' or not get_job(job_id):
+			self.send_json(404, { 'error': wording.get('server_job_not_found').format(job_id = job_id) })
+			return
+		server_job = cancel_job(job_id)
+		if server_job:
+			self.send_json(200, server_job)
+		else:
+			self.send_json(409, { 'error': wording.get('server_job_not_cancellable').format(job_id = job_id) })
+
+	def send_json(self, status_code : int, body : Any) -> None:
+		content = json.dumps(body).encode()
+		self.send_response(status_code)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(content)))
+		self.end_headers()
+		self.wfile.write(content)
+
+	def log_message(self, format : str, *args : Any) -> None:
+		pass
+
+
+def parse_path(path : str) -> Tuple[str, str]:
+	resource, _, job_id = path.split('?')[0].strip('/').partition('/')
+	return resource, job_id
@@ -0,0 +1,375 @@
+from collections import deque
+from types import ModuleType
+from typing import Any, Callable, List, Optional, Tuple
+import os
+import threading
+import time
+import cv2
+import numpy
+
+import faceswap.globals
+from faceswap.face_analyser import get_many_faces, set_reused_faces
+from faceswap.metrics import measure
+from faceswap.typing import Face, Frame, FrameSlot, StreamMode, StreamPipeline, StreamStatistics, StreamQuality, StreamQualityController, StreamWriter, StreamWriterStatistics
+from faceswap.utilities import open_ffmpeg
+
+LATENCY_SMOOTHING = 0.1
+STREAM_WRITER_BUFFER_SIZE = 4
+STREAM_QUALITY_LEVELS : List[StreamQuality] =\
+[
+	{
+		'scale': 1.0,
+		'detection_interval': 1,
+		'optional_processors': True
+	},
+	{
+		'scale': 1.0,
+		'detection_interval': 2,
+		'optional_processors': True
+	},
+	{
+		'scale': 1.0,
+		'detection_interval': 2,
+		'optional_processors': False
+	},
+	{
+		'scale': 0.75,
+		'detection_interval': 3,
+		'optional_processors': False
+	},
+	{
+		'scale': 0.5,
+		'detection_interval': 4,
+		'optional_processors': False
+	}
+]
+QUALITY_DOWNGRADE_FRAMES = 10
+QUALITY_UPGRADE_FRAMES = 60
+QUALITY_UPGRADE_HEADROOM = 0.6
+
+
+def create_frame_slot() -> FrameSlot:
+	return\
+	{
+		'condition': threading.Condition(),
+		'frame': None,
+		'frame_number': 0,
+		'capture_time': 0.0,
+		'closed': False
+	}
+
+
+def put_frame_slot(frame_slot : FrameSlot, frame : Frame, capture_time : float) -> None:
+	# the slot only holds the newest frame, older ones are overwritten
+	with frame_slot['condition']:
+		frame_slot['frame'] = frame
+		frame_slot['frame_number'] += 1
+		frame_slot['capture_time'] = capture_time
+		frame_slot['condition'].notify_all()
+
+
+def get_frame_slot(frame_slot : FrameSlot, frame_number : int, timeout : Optional[float] = None) -> Optional[Tuple[int, float, Frame]]:
+	with frame_slot['condition']:
+		frame_slot['condition'].wait_for(lambda: frame_slot['frame_number'] > frame_number or frame_slot['closed'], timeout)
+		if frame_slot['frame_number'] > frame_number:
+			return frame_slot['frame_number'], frame_slot['capture_time'], frame_slot['frame']
+	return None
+
+
+def close_frame_slot(frame_slot : FrameSlot) -> None:
+	with frame_slot['condition']:
+		frame_slot['closed'] = True
+		frame_slot['condition'].notify_all()
+
+
+def start_stream_pipeline(capture : cv2.VideoCapture, process_frame : Callable[[Frame], Frame]) -> StreamPipeline:
+	capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+	stream_pipeline : StreamPipeline =\
+	{
+		'capture': capture,
+		'capture_slot': create_frame_slot(),
+		'output_slot': create_frame_slot(),
+		'statistics':
+		{
+			'captured': 0,
+			'processed': 0,
+			'dropped': 0,
+			'displayed': 0,
+			'late': 0,
+			'latency': 0.0
+		}
+	}
+	stream_pipeline['threads'] =\
+	[
+		threading.Thread(target = run_capture, args = (stream_pipeline,), daemon = True),
+		threading.Thread(target = run_process, args = (stream_pipeline, process_frame), daemon = True)
+	]
+	for thread in stream_pipeline['threads']:
+		thread.start()
+	return stream_pipeline
+
+
+def run_capture(stream_pipeline : StreamPipeline) -> None:
+	capture_slot = stream_pipeline['capture_slot']
+	# reading without pause keeps the driver from queueing stale frames
+	while not capture_slot['closed']:
+		with measure('capture'):
+			has_frame, temp_frame = stream_pipeline['capture'].read()
+		if not has_frame:
+			break
+		put_frame_slot(capture_slot, temp_frame, time.perf_counter())
+		stream_pipeline['statistics']['captured'] += 1
+	close_frame_slot(capture_slot)
+
+
+def run_process(stream_pipeline : StreamPipeline, process_frame : Callable[[Frame], Frame]) -> None:
+	capture_slot = stream_pipeline['capture_slot']
+	output_slot = stream_pipeline['output_slot']
+	frame_number = 0
+	while not output_slot['closed']:
+		frame_slot_value = get_frame_slot(capture_slot, frame_number)
+		if frame_slot_value is None:
+			break
+		next_frame_number, capture_time, temp_frame = frame_slot_value
+		# frames captured meanwhile are stale and skipped
+		stream_pipeline['statistics']['dropped'] += next_frame_number - frame_number - 1
+		frame_number = next_frame_number
+		temp_frame = process_frame(temp_frame)
+		if temp_frame is not None:
+			put_frame_slot(output_slot, temp_frame, capture_time)
+			stream_pipeline['statistics']['processed'] += 1
+	close_frame_slot(output_slot)
+
+
+def read_stream_pipeline(stream_pipeline : StreamPipeline, frame_number : int) -> Optional[Tuple[int, Frame]]:
+	frame_slot_value = get_frame_slot(stream_pipeline['output_slot'], frame_number)
+	if frame_slot_value is None:
+		return None
+	frame_number, capture_time, temp_frame = frame_slot_value
+	update_stream_latency(stream_pipeline['statistics'], (time.perf_counter() - capture_time) * 1000)
+	return frame_number, temp_frame
+
+
+def update_stream_latency(stream_statistics : StreamStatistics, latency : float) -> None:
+	stream_statistics['displayed'] += 1
+	if stream_statistics['latency']:
+		stream_statistics['latency'] += (latency - stream_statistics['latency']) * LATENCY_SMOOTHING
+	else:
+		stream_statistics['latency'] = latency
+	if faceswap.globals.stream_latency_target and latency > faceswap.globals.stream_latency_target:
+		stream_statistics['late'] += 1
+
+
+def stop_stream_pipeline(stream_pipeline : StreamPipeline) -> None:
+	close_frame_slot(stream_pipeline['capture_slot'])
+	close_frame_slot(stream_pipeline['output_slot'])
+	for thread in stream_pipeline['threads']:
+		thread.join()
+	stream_pipeline['capture'].release()
+
+
+def get_stream_statistics(stream_pipeline : StreamPipeline) -> StreamStatistics:
+	stream_statistics : Any = dict(stream_pipeline['statistics'])
+	stream_statistics['latency'] = round(stream_statistics['latency'], 2)
+	return stream_statistics
+
+
+def create_quality_controller() -> StreamQualityController:
+	return\
+	{
+		'level': 0,
+		'frame_count': 0,
+		'frame_times': [],
+		'frame_time': 0.0,
+		'many_faces': None,
+		'changed': False
+	}
+
+
+def get_stream_quality(stream_quality_controller : StreamQualityController) -> StreamQuality:
+	return STREAM_QUALITY_LEVELS[stream_quality_controller['level']]
+
+
+def get_stream_fps(stream_quality_controller : StreamQualityController) -> float:
+	if stream_quality_controller['frame_time']:
+		return round(1000 / stream_quality_controller['frame_time'], 2)
+	return 0.0
+
+
+def update_quality_controller(stream_quality_controller : StreamQualityController, frame_time : float) -> bool:
+	frame_times = stream_quality_controller['frame_times']
+	frame_times.append(frame_time)
+	stream_quality_controller['frame_time'] = sum(frame_times) / len(frame_times)
+	if not faceswap.globals.stream_frame_budget:
+		return False
+	level = stream_quality_controller['level']
+	# degrade quickly on overload, recover slowly once there is clear headroom
+	if len(frame_times) >= QUALITY_DOWNGRADE_FRAMES and stream_quality_controller['frame_time'] > faceswap.globals.stream_frame_budget:
+		level = min(level + 1, len(STREAM_QUALITY_LEVELS) - 1)
+	elif len(frame_times) >= QUALITY_UPGRADE_FRAMES and stream_quality_controller['frame_time'] < faceswap.globals.stream_frame_budget * QUALITY_UPGRADE_HEADROOM:
+		level = max(level - 1, 0)
+	if len(frame_times) >= QUALITY_UPGRADE_FRAMES:
+		frame_times.pop(0)
+	if level != stream_quality_controller['level']:
+		if STREAM_QUALITY_LEVELS[level]['scale'] != get_stream_quality(stream_quality_controller)['scale']:
+			stream_quality_controller['many_faces'] = None
+		stream_quality_controller['level'] = level
+		frame_times.clear()
+		return True
+	return False
+
+
+def process_quality_frame(stream_quality_controller : StreamQualityController, frame_processors_modules : List[ModuleType], source_face : Optional[Face], temp_frame : Frame) -> Frame:
+	start_time = time.perf_counter()
+	process_frame = scale_quality_frame(stream_quality_controller, temp_frame)
+	if is_quality_detection_frame(stream_quality_controller, frame_processors_modules):
+		stream_quality_controller['many_faces'] = get_many_faces(process_frame)
+	return finish_quality_frame(stream_quality_controller, frame_processors_modules, source_face, temp_frame, process_frame, start_time)
+
+
+def scale_quality_frame(stream_quality_controller : StreamQualityController, temp_frame : Frame) -> Frame:
+	stream_quality = get_stream_quality(stream_quality_controller)
+	if stream_quality['scale'] < 1:
+		height, width = temp_frame.shape[:2]
+		return cv2.resize(temp_frame, (int(width * stream_quality['scale']), int(height * stream_quality['scale'])), interpolation = cv2.INTER_AREA)
+	return temp_frame
+
+
+def is_quality_detection_frame(stream_quality_controller : StreamQualityController, frame_processors_modules : List[ModuleType]) -> bool:
+	if any(frame_processor_module.CAPABILITIES['needs_faces'] for frame_processor_module in frame_processors_modules):
+		return stream_quality_controller['many_faces'] is None or stream_quality_controller['frame_count'] % get_stream_quality(stream_quality_controller)['detection_interval'] == 0
+	return False
+
+
+def finish_quality_frame(stream_quality_controller : StreamQualityController, frame_processors_modules : List[ModuleType], source_face : Optional[Face], temp_frame : Frame, process_frame : Frame, start_time : float, skip_optional : bool = False) -> Frame:
+	stream_quality = get_stream_quality(stream_quality_controller)
+	set_reused_faces(stream_quality_controller['many_faces'])
+	try:
+		for frame_processor_module in frame_processors_modules:
+			# optional processors are the first to go under load, wherever they sit in the chain
+			if frame_processor_module.CAPABILITIES['optional'] and (skip_optional or not stream_quality['optional_processors']):
+				continue
+			process_frame = frame_processor_module.process_frame(source_face, None, process_frame)
+	finally:
+		set_reused_faces(None)
+	if stream_quality['scale'] < 1:
+		height, width = temp_frame.shape[:2]
+		process_frame = cv2.resize(process_frame, (width, height))
+	stream_quality_controller['frame_count'] += 1
+	stream_quality_controller['changed'] = update_quality_controller(stream_quality_controller, (time.perf_counter() - start_time) * 1000)
+	return process_frame
+
+
+def open_stream_writer(mode : StreamMode, resolution : Tuple[int, int], fps : float) -> StreamWriter:
+	width, height = resolution
+	# frames arrive at the processing rate, the wallclock stamps them and the output rate fills the gaps
+	commands = [ '-use_wallclock_as_timestamps', '1', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', str(width) + 'x' + str(height), '-i', '-', '-r', str(fps) ]
+	if mode == 'udp':
+		commands.extend([ '-b:v', '2000k', '-f', 'mpegts', 'udp://localhost:27000?pkt_size=1316' ])
+	if mode == 'v4l2':
+		device_name = os.listdir('/sys/devices/virtual/video4linux')[0]
+		commands.extend([ '-f', 'v4l2', '/dev/' + device_name ])
+	return start_stream_writer(open_ffmpeg(commands), resolution)
+
+
+def start_stream_writer(process : Any, resolution : Tuple[int, int]) -> StreamWriter:
+	stream_writer : StreamWriter =\
+	{
+		'process': process,
+		'resolution': resolution,
+		'buffer': deque(maxlen = STREAM_WRITER_BUFFER_SIZE),
+		'condition': threading.Condition(),
+		'closed': False,
+		'statistics':
+		{
+			'written': 0,
+			'dropped': 0
+		}
+	}
+	stream_writer['thread'] = threading.Thread(target = run_stream_writer, args = (stream_writer,), daemon = True)
+	stream_writer['thread'].start()
+	return stream_writer
+
+
+def write_stream_frame(stream_writer : StreamWriter, temp_frame : Frame) -> None:
+	width, height = stream_writer['resolution']
+	if temp_frame.shape[:2] != (height, width):
+		temp_frame = cv2.resize(temp_frame, (width, height))
+	with stream_writer['condition']:
+		# under backpressure the oldest frame gives way to the newest
+		if len(stream_writer['buffer']) == stream_writer['buffer'].maxlen:
+			stream_writer['statistics']['dropped'] += 1
+		stream_writer['buffer'].append(numpy.ascontiguousarray(temp_frame))
+		stream_writer['condition'].notify()
+
+
+def run_stream_writer(stream_writer : StreamWriter) -> None:
+	while True:
+		with stream_writer['condition']:
+			stream_writer['condition'].wait_for(lambda: stream_writer['buffer'] or stream_writer['closed'])
+			if not stream_writer['buffer']:
+				break
+			temp_frame = stream_writer['buffer'].popleft()
+		try:
+			# the frame buffer goes to the pipe as is, without a bytes copy
+			with measure('io'):
+				stream_writer['process'].stdin.write(memoryview(temp_frame))
+			stream_writer['statistics']['written'] += 1
+		except (OSError, ValueError):
+			with stream_writer['condition']:
+				stream_writer['statistics']['dropped'] += len(stream_writer['buffer']) + 1
+				stream_writer['buffer'].clear()
+				stream_writer['closed'] = True
+			break
+
+
+def close_stream_writer(stream_writer : StreamWriter) -> None:
+	with stream_writer['condition']:
+		stream_writer['closed'] = True
+		stream_writer['condition'].notify()
+	stream_writer['thread'].join()
+	try:
+		stream_writer['process'].stdin.close()
+	except OSError:
+		pass
+	stream_writer['process'].wait()
+
+
+def get_stream_writer_statistics(stream_writer : StreamWriter) -> StreamWriterStatistics:
+	return dict(stream_writer['statistics']) # type: ignore[return-value]
+
+
+class FakeCapture:
+	# plays a video file in a loop at its own rate, standing in for a camera
+	def __init__(self, video_path : str, fps : Optional[float] = None) -> None:
+		self.capture = cv2.VideoCapture(video_path)
+		self.fps = fps or self.capture.get(cv2.CAP_PROP_FPS) or 30
+		self.frame_time = 0.0
+
+	def isOpened(self) -> bool:
+		return self.capture.isOpened()
+
+	def read(self) -> Tuple[bool, Optional[Frame]]:
+		has_frame, temp_frame = self.capture.read()
+		if not has_frame:
+			self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+			has_frame, temp_frame = self.capture.read()
+		# like a camera the next frame is not ready before its time, a slow reader misses frames instead of getting a burst
+		current_time = time.perf_counter()
+		if self.frame_time > current_time:
+			time.sleep(self.frame_time - current_time)
+		self.frame_time = max(self.frame_time, current_time) + 1 / self.fps
+		return has_frame, temp_frame
+
+	def get(self, property_id : int) -> float:
+		if property_id == cv2.CAP_PROP_FPS:
+			return self.fps
+		return self.capture.get(property_id)
+
+	def set(self, property_id : int, value : float) -> bool:
+		if property_id == cv2.CAP_PROP_BUFFERSIZE:
+			return True
+		return self.capture.set(property_id, value)
+
+	def release(self) -> None:
+		self.capture.release()
@@ -0,0 +1,130 @@
+from queue import Queue
+from typing import Dict, Iterator, List, Optional, Tuple
+import re
+import subprocess
+import threading
+import numpy
+
+from faceswap import wording
+from faceswap.core import update_status
+from faceswap.typing import Frame, TimelineEntry, VideoTimeline
+from faceswap.uis.engine import ENGINE_PRIORITY_BACKGROUND, analyse_engine_frame, set_engine_priority
+from faceswap.vision import detect_fps, detect_video_resolution, count_video_frame_total
+
+VIDEO_TIMELINES : Dict[str, VideoTimeline] = {}
+VIDEO_TIMELINE_LIMIT = 4
+TIMELINE_THUMBNAIL_HEIGHT = 160
+TIMELINE_THUMBNAIL_TOTAL = 100
+TIMELINE_SUGGESTION_TOTAL = 5
+THREAD_LOCK = threading.Lock()
+
+
+def start_video_timeline(video_path : str) -> VideoTimeline:
+	with THREAD_LOCK:
+		if video_path not in VIDEO_TIMELINES:
+			VIDEO_TIMELINES[video_path] =\
+			{
+				'thumbnails': {},
+				'entries': [],
+				'frame_interval': max(count_video_frame_total(video_path) // TIMELINE_THUMBNAIL_TOTAL, 1),
+				'done': threading.Event()
+			}
+			threading.Thread(target = build_video_timeline, args = (video_path, VIDEO_TIMELINES[video_path]), daemon = True).start()
+			while len(VIDEO_TIMELINES) > VIDEO_TIMELINE_LIMIT:
+				VIDEO_TIMELINES.pop(next(iter(VIDEO_TIMELINES)))
+		return VIDEO_TIMELINES[video_path]
+
+
+def get_video_timeline(video_path : str) -> Optional[VideoTimeline]:
+	with THREAD_LOCK:
+		return VIDEO_TIMELINES.get(video_path)
+
+
+def build_video_timeline(video_path : str, video_timeline : VideoTimeline) -> None:
+	# the thumbnails are analysed in the engine process, behind the preview requests
+	set_engine_priority(ENGINE_PRIORITY_BACKGROUND)
+	try:
+		for frame_number, thumbnail_frame in extract_thumbnail_frames(video_path, video_timeline['frame_interval']):
+			video_timeline['thumbnails'][frame_number] = thumbnail_frame
+			video_timeline['entries'].append(create_timeline_entry(frame_number, thumbnail_frame))
+	except Exception as exception:
+		update_status(wording.get('building_timeline_failed').format(video_path = video_path, error = exception))
+	finally:
+		video_timeline['done'].set()
+
+
+def extract_thumbnail_frames(video_path : str, frame_interval : int) -> Iterator[Tuple[int, Frame]]:
+	fps = detect_fps(video_path)
+	video_resolution = detect_video_resolution(video_path)
+	if not fps or not video_resolution:
+		return
+	width, height = video_resolution
+	thumbnail_height = min(TIMELINE_THUMBNAIL_HEIGHT, height)
+	thumbnail_width = round(width * thumbnail_height / height / 2) * 2
+	# only keyframes get decoded, showinfo reports the timestamp of every frame handed out
+	commands = [ 'ffmpeg', '-hide_banner', '-nostats', '-skip_frame', 'nokey', '-i', video_path, '-vf', 'scale=' + str(thumbnail_width) + ':' + str(thumbnail_height) + ',showinfo', '-vsync', '0', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-' ]
+	process = subprocess.Popen(commands, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+	frame_times : Queue[Optional[float]] = Queue()
+	threading.Thread(target = read_frame_times, args = (process, frame_times), daemon = True).start()
+	frame_size = thumbnail_width * thumbnail_height * 3
+	start_time = None
+	frame_buckets = set()
+	try:
+		while True:
+			frame_buffer = process.stdout.read(frame_size)
+			frame_time = frame_times.get()
+			if len(frame_buffer) < frame_size or frame_time is None:
+				break
+			if start_time is None:
+				start_time = frame_time
+			frame_number = round((frame_time - start_time) * fps) + 1
+			if frame_number // frame_interval not in frame_buckets:
+				frame_buckets.add(frame_number // frame_interval)
+				yield frame_number, numpy.frombuffer(frame_buffer, dtype = numpy.uint8).reshape(thumbnail_height, thumbnail_width, 3)
+	finally:
+		process.kill()
+		process.wait()
+
+
+def read_frame_times(process : subprocess.Popen[bytes], frame_times : 'Queue[Optional[float]]') -> None:
+	for line in process.stderr:
+		match = re.search(rb'Parsed_showinfo.*pts_time:\s*([-\d.]+)', line)
+		if match:
+			frame_times.put(float(match.group(1)))
+	frame_times.put(None)
+
+
+def create_timeline_entry(frame_number : int, thumbnail_frame : Frame) -> TimelineEntry:
+	many_faces = analyse_engine_frame(thumbnail_frame)
+	face_score = 0.0
+	# confident and large faces make the best reference
+	for face in many_faces:
+		face_score = max(face_score, float(face['det_score']) * min((face['bbox'][3] - face['bbox'][1]) / thumbnail_frame.shape[0] * 2, 1))
+	return\
+	{
+		'frame_number': frame_number,
+		'face_total': len(many_faces),
+		'face_score': round(face_score, 4)
+	}
+
+
+def suggest_reference_frames(video_path : str) -> List[int]:
+	video_timeline = get_video_timeline(video_path)
+	reference_frame_numbers : List[int] = []
+	if video_timeline:
+		timeline_entries = sorted(video_timeline['entries'], key = lambda timeline_entry: timeline_entry['face_score'], reverse = True)
+		for timeline_entry in timeline_entries:
+			if len(reference_frame_numbers) == TIMELINE_SUGGESTION_TOTAL or not timeline_entry['face_score']:
+				break
+			# suggestions spread over the video rather than one shot
+			if all(abs(timeline_entry['frame_number'] - frame_number) > video_timeline['frame_interval'] * 5 for frame_number in reference_frame_numbers):
+				reference_frame_numbers.append(timeline_entry['frame_number'])
+	return reference_frame_numbers
+
+
+def get_thumbnail_frame(video_path : str, frame_number : int) -> Optional[Frame]:
+	video_timeline = get_video_timeline(video_path)
+	if video_timeline and video_timeline['thumbnails']:
+		thumbnails = dict(video_timeline['thumbnails'])
+		return thumbnails[min(thumbnails, key = lambda thumbnail_number: abs(thumbnail_number - frame_number))]
+	return None
@@ -1,8 +1,10 @@
-from typing import Any, Literal
-from insightface.app.common import Face
+from typing import TYPE_CHECKING, Any, Dict, Literal, Optional, TypedDict
 import numpy
 
-Face = Face
+if TYPE_CHECKING:
+	from insightface.app.common import Face
+else:
+	Face = Any
 Frame = numpy.ndarray[Any, Any]
 
 ProcessMode = Literal[ 'output', 'preview', 'stream' ]
@@ -11,4 +13,130 @@ FaceAnalyserDirection = Literal[ 'left-right', 'right-left', 'top-bottom', 'bott
 FaceAnalyserAge = Literal[ 'child', 'teen', 'adult', 'senior' ]
 FaceAnalyserGender = Literal[ 'male', 'female' ]
 TempFrameFormat = Literal[ 'jpg', 'png' ]
+TempFrameTier = Literal[ 'memory', 'disk' ]
 OutputVideoEncoder = Literal[ 'libx264', 'libx265', 'libvpx-vp9', 'h264_nvenc', 'hevc_nvenc' ]
+FrameEnhancerModel = Literal[ 'real_esrgan_x2plus', 'real_esrgan_x4plus' ]
+FrameProcessorCapabilities = TypedDict('FrameProcessorCapabilities',
+{
+	'needs_faces': bool,
+	'needs_source_face': bool,
+	'can_batch': bool,
+	'preferred_concurrency': Optional[int],
+	'changes_geometry': bool,
+	'optional': bool
+})
+DownloadManifestEntry = TypedDict('DownloadManifestEntry',
+{
+	'size': int,
+	'sha256': str
+})
+DownloadManifest = Dict[str, DownloadManifestEntry]
+BatchJob = Dict[str, Any]
+BatchJobStatus = Literal[ 'completed', 'failed' ]
+BatchJobReport = TypedDict('BatchJobReport',
+{
+	'index': int,
+	'source_path': Optional[str],
+	'target_path': Optional[str],
+	'output_path': Optional[str],
+	'status': BatchJobStatus,
+	'error': Optional[str],
+	'process_time': float
+})
+ImagePipelineStatistics = TypedDict('ImagePipelineStatistics',
+{
+	'processed': int,
+	'skipped': int,
+	'failed': int,
+	'process_time': float,
+	'images_per_second': float,
+	'utilization': Dict[str, float]
+})
+FrameSlot = Dict[str, Any]
+VideoDecoder = Dict[str, Any]
+VideoTimeline = Dict[str, Any]
+TimelineEntry = TypedDict('TimelineEntry',
+{
+	'frame_number': int,
+	'face_total': int,
+	'face_score': float
+})
+StreamMode = Literal[ 'udp', 'v4l2' ]
+StreamWriter = Dict[str, Any]
+StreamWriterStatistics = TypedDict('StreamWriterStatistics',
+{
+	'written': int,
+	'dropped': int
+})
+StreamQuality = TypedDict('StreamQuality',
+{
+	'scale': float,
+	'detection_interval': int,
+	'optional_processors': bool
+})
+StreamQualityController = Dict[str, Any]
+StreamPipeline = Dict[str, Any]
+StreamSession = Dict[str, Any]
+MultiStream = Dict[str, Any]
+MultiStreamStep = TypedDict('MultiStreamStep',
+{
+	'stream_total': int,
+	'processed': int,
+	'expired': int,
+	'fps': float,
+	'latency_p50': float,
+	'latency_p95': float
+})
+StreamStatistics = TypedDict('StreamStatistics',
+{
+	'captured': int,
+	'processed': int,
+	'dropped': int,
+	'displayed': int,
+	'late': int,
+	'latency': float
+})
+MetricPercentiles = TypedDict('MetricPercentiles',
+{
+	'count': int,
+	'p50': float,
+	'p95': float,
+	'p99': float
+})
+ServerJobStatus = Literal[ 'queued', 'running', 'completed', 'failed', 'cancelled' ]
+ServerJob = TypedDict('ServerJob',
+{
+	'job_id': str,
+	'request': BatchJob,
+	'status': ServerJobStatus,
+	'progress': float,
+	'message': Optional[str],
+	'error': Optional[str],
+	'output_path': Optional[str],
+	'process_time': Optional[float]
+})
+ServerWorker = Dict[str, Any]
+OutputJob = TypedDict('OutputJob',
+{
+	'job_id': str,
+	'status': ServerJobStatus,
+	'stage': Optional[str],
+	'progress_count': int,
+	'progress_total': int,
+	'progress_time': float,
+	'fps': float,
+	'eta': Optional[float],
+	'output_path': str,
+	'start_time': float,
+	'process_time': Optional[float],
+	'error': Optional[str]
+})
+EngineStatus = Literal[ 'warming', 'running', 'stopped' ]
+EngineHealth = TypedDict('EngineHealth',
+{
+	'status': EngineStatus,
+	'pid': Optional[int],
+	'pending': int,
+	'restarts': int,
+	'latency': float
+})
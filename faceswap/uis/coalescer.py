@@ -0,0 +1,79 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import threading
+
+COALESCER_TICKETS : Dict[str, int] = {}
+COALESCER_LOCKS : Dict[str, threading.Lock] = {}
+COALESCER_REQUEST = threading.local()
+COALESCER_DONE = object()
+SHARED_FUTURES : Dict[Tuple[Any, ...], 'Future[Any]'] = {}
+THREAD_LOCK = threading.Lock()
+
+
+def run_latest(request_name : str, function : Callable[..., Any], *args : Any) -> Optional[Any]:
+	ticket, request_lock = create_ticket(request_name)
+	# one request per name runs at a time, the ones waiting behind it collapse into the newest
+	with request_lock:
+		if is_ticket_superseded(request_name, ticket):
+			return None
+		COALESCER_REQUEST.ticket = request_name, ticket
+		try:
+			result = function(*args)
+		finally:
+			COALESCER_REQUEST.ticket = None
+	if is_ticket_superseded(request_name, ticket):
+		return None
+	return result
+
+
+def iterate_latest(request_name : str, function : Callable[..., Iterator[Any]], *args : Any) -> Iterator[Any]:
+	ticket, request_lock = create_ticket(request_name)
+	with request_lock:
+		iterator = function(*args)
+		while not is_ticket_superseded(request_name, ticket):
+			# consecutive steps may run on different threads, the ticket travels with every step
+			COALESCER_REQUEST.ticket = request_name, ticket
+			try:
+				value = next(iterator, COALESCER_DONE)
+			finally:
+				COALESCER_REQUEST.ticket = None
+			if value is COALESCER_DONE or is_ticket_superseded(request_name, ticket):
+				break
+			yield value
+
+
+def create_ticket(request_name : str) -> Tuple[int, threading.Lock]:
+	with THREAD_LOCK:
+		ticket = COALESCER_TICKETS.get(request_name, 0) + 1
+		COALESCER_TICKETS[request_name] = ticket
+		return ticket, COALESCER_LOCKS.setdefault(request_name, threading.Lock())
+
+
+def is_request_superseded() -> bool:
+	request_ticket = getattr(COALESCER_REQUEST, 'ticket', None)
+	if request_ticket:
+		return is_ticket_superseded(*request_ticket)
+	return False
+
+
+def is_ticket_superseded(request_name : str, ticket : int) -> bool:
+	with THREAD_LOCK:
+		return COALESCER_TICKETS.get(request_name) != ticket
+
+
+def run_shared(shared_key : Tuple[Any, ...], function : Callable[[], Any]) -> Any:
+	with THREAD_LOCK:
+		future = SHARED_FUTURES.get(shared_key)
+		is_owner = future is None
+		if future is None:
+			future = SHARED_FUTURES[shared_key] = Future()
+	# concurrent callers with the same key wait for the owner instead of computing again
+	if is_owner:
+		try:
+			future.set_result(function())
+		except Exception as exception:
+			future.set_exception(exception)
+		finally:
+			with THREAD_LOCK:
+				SHARED_FUTURES.pop(shared_key, None)
+	return future.result()
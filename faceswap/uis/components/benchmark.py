@@ -1,4 +1,4 @@
-from typing import Any, Optional, List, Dict, Generator
+from typing import Any, Optional, List, Dict, Generator, Tuple
 import time
 import tempfile
 import statistics
@@ -8,16 +8,19 @@ import faceswap.globals
 from faceswap import wording
 from faceswap.vision import count_video_frame_total
 from faceswap.core import limit_resources, conditional_process
+from faceswap.metrics import clear_metrics, get_metrics_summary
 from faceswap.uis.typing import Update
-from faceswap.utilities import normalize_output_path, clear_temp
+from faceswap.utilities import normalize_output_path, clear_temp, is_image
 
 BENCHMARK_RESULTS_DATAFRAME : Optional[gradio.Dataframe] = None
+BENCHMARK_METRICS_DATAFRAME : Optional[gradio.Dataframe] = None
 BENCHMARK_RUNS_CHECKBOX_GROUP : Optional[gradio.CheckboxGroup] = None
 BENCHMARK_CYCLES_SLIDER : Optional[gradio.Button] = None
 BENCHMARK_START_BUTTON : Optional[gradio.Button] = None
 BENCHMARK_CLEAR_BUTTON : Optional[gradio.Button] = None
 BENCHMARKS : Dict[str, str] = \
 {
+	'image': '.assets/examples/target-1080p.jpg',
 	'240p': '.assets/examples/target-240p.mp4',
 	'360p': '.assets/examples/target-360p.mp4',
 	'540p': '.assets/examples/target-540p.mp4',
@@ -30,6 +33,7 @@ BENCHMARKS : Dict[str, str] = \
 
 def render() -> None:
 	global BENCHMARK_RESULTS_DATAFRAME
+	global BENCHMARK_METRICS_DATAFRAME
 	global BENCHMARK_RUNS_CHECKBOX_GROUP
 	global BENCHMARK_CYCLES_SLIDER
 	global BENCHMARK_START_BUTTON
@@ -40,6 +44,7 @@ def render() -> None:
 		headers =
 		[
 			'target_path',
+			'frame_enhancer_model',
 			'benchmark_cycles',
 			'average_run',
 			'fastest_run',
@@ -50,7 +55,29 @@ def render() -> None:
 		datatype =
 		[
 			'str',
+			'str',
+			'number',
+			'number',
+			'number',
 			'number',
+			'number'
+		]
+	)
+	BENCHMARK_METRICS_DATAFRAME = gradio.Dataframe(
+		label = wording.get('benchmark_metrics_dataframe_label'),
+		headers =
+		[
+			'target_path',
+			'stage',
+			'count',
+			'p50',
+			'p95',
+			'p99'
+		],
+		datatype =
+		[
+			'str',
+			'str',
 			'number',
 			'number',
 			'number',
@@ -75,23 +102,27 @@ def render() -> None:
 
 def listen() -> None:
 	BENCHMARK_RUNS_CHECKBOX_GROUP.change(update_benchmark_runs, inputs = BENCHMARK_RUNS_CHECKBOX_GROUP, outputs = BENCHMARK_RUNS_CHECKBOX_GROUP)
-	BENCHMARK_START_BUTTON.click(start, inputs = [ BENCHMARK_RUNS_CHECKBOX_GROUP, BENCHMARK_CYCLES_SLIDER ], outputs = BENCHMARK_RESULTS_DATAFRAME)
-	BENCHMARK_CLEAR_BUTTON.click(clear, outputs = BENCHMARK_RESULTS_DATAFRAME)
+	BENCHMARK_START_BUTTON.click(start, inputs = [ BENCHMARK_RUNS_CHECKBOX_GROUP, BENCHMARK_CYCLES_SLIDER ], outputs = [ BENCHMARK_RESULTS_DATAFRAME, BENCHMARK_METRICS_DATAFRAME ])
+	BENCHMARK_CLEAR_BUTTON.click(clear, outputs = [ BENCHMARK_RESULTS_DATAFRAME, BENCHMARK_METRICS_DATAFRAME ])
 
 
 def update_benchmark_runs(benchmark_runs : List[str]) -> Update:
 	return gradio.update(value = benchmark_runs)
 
 
-def start(benchmark_runs : List[str], benchmark_cycles : int) -> Generator[List[Any], None, None]:
+def start(benchmark_runs : List[str], benchmark_cycles : int) -> Generator[Tuple[List[Any], List[Any]], None, None]:
 	faceswap.globals.source_path = '.assets/examples/source.jpg'
 	target_paths = [ BENCHMARKS[benchmark_run] for benchmark_run in benchmark_runs if benchmark_run in BENCHMARKS ]
 	benchmark_results = []
+	benchmark_metrics = []
 	if target_paths:
 		warm_up(BENCHMARKS['240p'])
 		for target_path in target_paths:
+			# stage timings are collected per run to show where its time goes
+			clear_metrics()
 			benchmark_results.append(benchmark(target_path, benchmark_cycles))
-			yield benchmark_results
+			benchmark_metrics.extend([ [ target_path ] + metric_summary for metric_summary in get_metrics_summary() ])
+			yield benchmark_results, benchmark_metrics
 
 
 def warm_up(target_path : str) -> None:
@@ -106,7 +137,8 @@ def benchmark(target_path : str, benchmark_cycles : int) -> List[Any]:
 	for i in range(benchmark_cycles):
 		faceswap.globals.target_path = target_path
 		faceswap.globals.output_path = normalize_output_path(faceswap.globals.source_path, faceswap.globals.target_path, tempfile.gettempdir())
-		video_frame_total = count_video_frame_total(faceswap.globals.target_path)
+		# an image counts as one frame, so relative fps reads as images per second
+		video_frame_total = 1 if is_image(faceswap.globals.target_path) else count_video_frame_total(faceswap.globals.target_path)
 		start_time = time.perf_counter()
 		limit_resources()
 		conditional_process()
@@ -118,9 +150,12 @@ def benchmark(target_path : str, benchmark_cycles : int) -> List[Any]:
 	fastest_run = round(min(process_times), 2)
 	slowest_run = round(max(process_times), 2)
 	relative_fps = round(total_fps / benchmark_cycles, 2)
+	# runs with either enhancer model stay apart in the results
+	frame_enhancer_model = faceswap.globals.frame_enhancer_model if 'frame_enhancer' in faceswap.globals.frame_processors else None
 	return\
 	[
 		faceswap.globals.target_path,
+		frame_enhancer_model,
 		benchmark_cycles,
 		average_run,
 		fastest_run,
@@ -129,7 +164,7 @@ def benchmark(target_path : str, benchmark_cycles : int) -> List[Any]:
 	]
 
 
-def clear() -> Update:
+def clear() -> Tuple[Update, Update]:
 	if faceswap.globals.target_path:
 		clear_temp(faceswap.globals.target_path)
-	return gradio.update(value = None)
+	return gradio.update(value = None), gradio.update(value = None)
@@ -0,0 +1,43 @@
+from typing import Optional
+import gradio
+
+from faceswap import wording
+from faceswap.uis.engine import get_engine_health, restart_engine
+from faceswap.uis.typing import Update
+
+ENGINE_HEALTH_TEXTBOX : Optional[gradio.Textbox] = None
+ENGINE_RESTART_BUTTON : Optional[gradio.Button] = None
+ENGINE_HEALTH_INTERVAL = 2
+
+
+def render() -> None:
+	global ENGINE_HEALTH_TEXTBOX
+	global ENGINE_RESTART_BUTTON
+
+	ENGINE_HEALTH_TEXTBOX = gradio.Textbox(
+		label = wording.get('engine_health_textbox_label'),
+		value = create_engine_health_message,
+		every = ENGINE_HEALTH_INTERVAL,
+		interactive = False
+	)
+	ENGINE_RESTART_BUTTON = gradio.Button(wording.get('restart_button_label'))
+
+
+def listen() -> None:
+	ENGINE_RESTART_BUTTON.click(restart, outputs = ENGINE_HEALTH_TEXTBOX)
+
+
+def restart() -> Update:
+	restart_engine()
+	return gradio.update(value = create_engine_health_message())
+
+
+def create_engine_health_message() -> str:
+	engine_health = get_engine_health()
+	return wording.get('engine_health').format(
+		status = engine_health['status'],
+		pid = engine_health['pid'],
+		pending = engine_health['pending'],
+		latency = engine_health['latency'],
+		restarts = engine_health['restarts']
+	)
@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple, Any, Dict
+from typing import List, Optional, Tuple, Any, Dict, Iterator
 
 import cv2
 import gradio
@@ -6,23 +6,31 @@ import gradio
 import faceswap.choices
 import faceswap.globals
 from faceswap import wording
-from faceswap.vision import get_video_frame, normalize_frame_color
-from faceswap.face_analyser import get_many_faces
+from faceswap.core import is_warming_up
+from faceswap.frame_cache import get_cached_video_frame
+from faceswap.vision import normalize_frame_color
 from faceswap.face_reference import clear_face_reference
-from faceswap.typing import Frame, FaceRecognition
+from faceswap.timeline import start_video_timeline, suggest_reference_frames, get_thumbnail_frame
+from faceswap.typing import Frame, Face, FaceRecognition
 from faceswap.uis import core as ui
+from faceswap.uis.coalescer import run_latest, run_shared
+from faceswap.uis.engine import is_engine_warming_up, analyse_engine_frame
 from faceswap.uis.typing import ComponentName, Update
 from faceswap.utilities import is_image, is_video
 
 FACE_RECOGNITION_DROPDOWN : Optional[gradio.Dropdown] = None
 REFERENCE_FACE_POSITION_GALLERY : Optional[gradio.Gallery] = None
 REFERENCE_FACE_DISTANCE_SLIDER : Optional[gradio.Slider] = None
+REFERENCE_FRAME_SUGGESTIONS_GALLERY : Optional[gradio.Gallery] = None
+REFERENCE_FRAME_SUGGESTIONS : List[int] = []
+REFERENCE_FRAME_SUGGESTIONS_INTERVAL = 1
 
 
 def render() -> None:
 	global FACE_RECOGNITION_DROPDOWN
 	global REFERENCE_FACE_POSITION_GALLERY
 	global REFERENCE_FACE_DISTANCE_SLIDER
+	global REFERENCE_FRAME_SUGGESTIONS_GALLERY
 
 	reference_face_gallery_args: Dict[str, Any] =\
 	{
@@ -33,12 +41,8 @@ def render() -> None:
 		'allow_preview': False,
 		'visible': 'reference' in faceswap.globals.face_recognition
 	}
-	if is_image(faceswap.globals.target_path):
-		reference_frame = cv2.imread(faceswap.globals.target_path)
-		reference_face_gallery_args['value'] = extract_gallery_frames(reference_frame)
-	if is_video(faceswap.globals.target_path):
-		reference_frame = get_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number)
-		reference_face_gallery_args['value'] = extract_gallery_frames(reference_frame)
+	if (is_image(faceswap.globals.target_path) or is_video(faceswap.globals.target_path)) and not is_warming_up() and not is_engine_warming_up():
+		reference_face_gallery_args['value'] = extract_gallery_frames(*get_reference_faces())
 	FACE_RECOGNITION_DROPDOWN = gradio.Dropdown(
 		label = wording.get('face_recognition_dropdown_label'),
 		choices = faceswap.choices.face_recognition,
@@ -52,13 +56,21 @@ def render() -> None:
 		step = 0.05,
 		visible = 'reference' in faceswap.globals.face_recognition
 	)
+	REFERENCE_FRAME_SUGGESTIONS_GALLERY = gradio.Gallery(
+		label = wording.get('reference_frame_suggestions_gallery_label'),
+		height = 120,
+		object_fit = 'cover',
+		columns = 10,
+		allow_preview = False,
+		visible = 'reference' in faceswap.globals.face_recognition and is_video(faceswap.globals.target_path)
+	)
 	ui.register_component('face_recognition_dropdown', FACE_RECOGNITION_DROPDOWN)
 	ui.register_component('reference_face_position_gallery', REFERENCE_FACE_POSITION_GALLERY)
 	ui.register_component('reference_face_distance_slider', REFERENCE_FACE_DISTANCE_SLIDER)
 
 
 def listen() -> None:
-	FACE_RECOGNITION_DROPDOWN.select(update_face_recognition, inputs = FACE_RECOGNITION_DROPDOWN, outputs = [ REFERENCE_FACE_POSITION_GALLERY, REFERENCE_FACE_DISTANCE_SLIDER ])
+	FACE_RECOGNITION_DROPDOWN.select(update_face_recognition, inputs = FACE_RECOGNITION_DROPDOWN, outputs = [ REFERENCE_FACE_POSITION_GALLERY, REFERENCE_FACE_DISTANCE_SLIDER, REFERENCE_FRAME_SUGGESTIONS_GALLERY ])
 	REFERENCE_FACE_POSITION_GALLERY.select(clear_and_update_face_reference_position)
 	REFERENCE_FACE_DISTANCE_SLIDER.change(update_reference_face_distance, inputs = REFERENCE_FACE_DISTANCE_SLIDER)
 	multi_component_names : List[ComponentName] =\
@@ -72,6 +84,7 @@ def listen() -> None:
 		if component:
 			for method in [ 'upload', 'change', 'clear' ]:
 				getattr(component, method)(update_face_reference_position, outputs = REFERENCE_FACE_POSITION_GALLERY)
+				getattr(component, method)(update_reference_frame_suggestions, outputs = REFERENCE_FRAME_SUGGESTIONS_GALLERY)
 	select_component_names : List[ComponentName] =\
 	[
 		'face_analyser_direction_dropdown',
@@ -82,18 +95,22 @@ def listen() -> None:
 		component = ui.get_component(component_name)
 		if component:
 			component.select(update_face_reference_position, outputs = REFERENCE_FACE_POSITION_GALLERY)
+	warm_up_state_textbox = ui.get_component('warm_up_state_textbox')
+	if warm_up_state_textbox:
+		warm_up_state_textbox.change(refresh_face_reference_position, inputs = warm_up_state_textbox, outputs = REFERENCE_FACE_POSITION_GALLERY)
 	preview_frame_slider = ui.get_component('preview_frame_slider')
 	if preview_frame_slider:
 		preview_frame_slider.release(update_face_reference_position, outputs = REFERENCE_FACE_POSITION_GALLERY)
+		REFERENCE_FRAME_SUGGESTIONS_GALLERY.select(select_reference_frame_suggestion, outputs = [ preview_frame_slider, REFERENCE_FACE_POSITION_GALLERY ])
 
 
-def update_face_recognition(face_recognition : FaceRecognition) -> Tuple[Update, Update]:
+def update_face_recognition(face_recognition : FaceRecognition) -> Tuple[Update, Update, Update]:
 	if face_recognition == 'reference':
 		faceswap.globals.face_recognition = face_recognition
-		return gradio.update(visible = True), gradio.update(visible = True)
+		return gradio.update(visible = True), gradio.update(visible = True), gradio.update(visible = is_video(faceswap.globals.target_path))
 	if face_recognition == 'many':
 		faceswap.globals.face_recognition = face_recognition
-		return gradio.update(visible = False), gradio.update(visible = False)
+		return gradio.update(visible = False), gradio.update(visible = False), gradio.update(visible = False)
 
 
 def clear_and_update_face_reference_position(event: gradio.SelectData) -> Update:
@@ -102,27 +119,78 @@ def clear_and_update_face_reference_position(event: gradio.SelectData) -> Update
 
 
 def update_face_reference_position(reference_face_position : int = 0) -> Update:
-	gallery_frames = []
 	faceswap.globals.reference_face_position = reference_face_position
-	if is_image(faceswap.globals.target_path):
-		reference_frame = cv2.imread(faceswap.globals.target_path)
-		gallery_frames = extract_gallery_frames(reference_frame)
-	if is_video(faceswap.globals.target_path):
-		reference_frame = get_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number)
-		gallery_frames = extract_gallery_frames(reference_frame)
+	return run_latest('reference_face_position_gallery', update_reference_face_gallery) or gradio.update()
+
+
+def refresh_face_reference_position(warm_up_state : str) -> Update:
+	if warm_up_state == 'ready' and (is_image(faceswap.globals.target_path) or is_video(faceswap.globals.target_path)):
+		return update_face_reference_position(faceswap.globals.reference_face_position)
+	return gradio.update()
+
+
+def update_reference_face_gallery() -> Update:
+	gallery_frames = extract_gallery_frames(*get_reference_faces())
 	if gallery_frames:
 		return gradio.update(value = gallery_frames)
 	return gradio.update(value = None)
 
 
+def update_reference_frame_suggestions() -> Iterator[Update]:
+	REFERENCE_FRAME_SUGGESTIONS.clear()
+	if not is_video(faceswap.globals.target_path):
+		yield gradio.update(value = None, visible = False)
+		return
+	# the timeline started with the upload, the suggestions follow it while it builds
+	video_timeline = start_video_timeline(faceswap.globals.target_path)
+	while True:
+		is_done = video_timeline['done'].wait(REFERENCE_FRAME_SUGGESTIONS_INTERVAL)
+		REFERENCE_FRAME_SUGGESTIONS[:] = suggest_reference_frames(faceswap.globals.target_path)
+		suggestion_frames = [ (normalize_frame_color(get_thumbnail_frame(faceswap.globals.target_path, frame_number)), str(frame_number)) for frame_number in REFERENCE_FRAME_SUGGESTIONS ]
+		yield gradio.update(value = suggestion_frames or None, visible = 'reference' in faceswap.globals.face_recognition)
+		if is_done:
+			break
+
+
+def select_reference_frame_suggestion(event : gradio.SelectData) -> Tuple[Update, Update]:
+	if event.index < len(REFERENCE_FRAME_SUGGESTIONS):
+		faceswap.globals.reference_frame_number = REFERENCE_FRAME_SUGGESTIONS[event.index]
+		clear_face_reference()
+		return gradio.update(value = faceswap.globals.reference_frame_number), update_face_reference_position()
+	return gradio.update(), gradio.update()
+
+
 def update_reference_face_distance(reference_face_distance : float) -> Update:
 	faceswap.globals.reference_face_distance = reference_face_distance
 	return gradio.update(value = reference_face_distance)
 
 
-def extract_gallery_frames(reference_frame : Frame) -> List[Frame]:
+def get_reference_faces() -> Tuple[Optional[Frame], List[Face]]:
+	reference_key =\
+	(
+		faceswap.globals.target_path,
+		faceswap.globals.reference_frame_number,
+		faceswap.globals.face_analyser_direction,
+		faceswap.globals.face_analyser_age,
+		faceswap.globals.face_analyser_gender
+	)
+	# preview and gallery analyse the same reference frame, concurrent requests share one analysis
+	return run_shared(reference_key, analyse_reference_frame)
+
+
+def analyse_reference_frame() -> Tuple[Optional[Frame], List[Face]]:
+	reference_frame = None
+	if is_image(faceswap.globals.target_path):
+		reference_frame = cv2.imread(faceswap.globals.target_path)
+	if is_video(faceswap.globals.target_path):
+		reference_frame = get_cached_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number)
+	if reference_frame is None:
+		return None, []
+	return reference_frame, analyse_engine_frame(reference_frame)
+
+
+def extract_gallery_frames(reference_frame : Optional[Frame], faces : List[Face]) -> List[Frame]:
 	crop_frames = []
-	faces = get_many_faces(reference_frame)
 	for face in faces:
 		start_x, start_y, end_x, end_y = map(int, face['bbox'])
 		padding_x = int((end_x - start_x) * 0.25)
@@ -6,10 +6,12 @@ from faceswap import wording
 from faceswap.uis.typing import Update
 
 MAX_MEMORY_SLIDER : Optional[gradio.Slider] = None
+MODEL_MEMORY_LIMIT_SLIDER : Optional[gradio.Slider] = None
 
 
 def render() -> None:
 	global MAX_MEMORY_SLIDER
+	global MODEL_MEMORY_LIMIT_SLIDER
 
 	MAX_MEMORY_SLIDER = gradio.Slider(
 		label = wording.get('max_memory_slider_label'),
@@ -17,12 +19,25 @@ def render() -> None:
 		maximum = 128,
 		step = 1
 	)
+	MODEL_MEMORY_LIMIT_SLIDER = gradio.Slider(
+		label = wording.get('model_memory_limit_slider_label'),
+		value = faceswap.globals.model_memory_limit or 0,
+		minimum = 0,
+		maximum = 128,
+		step = 1
+	)
 
 
 def listen() -> None:
 	MAX_MEMORY_SLIDER.change(update_max_memory, inputs = MAX_MEMORY_SLIDER, outputs = MAX_MEMORY_SLIDER)
+	MODEL_MEMORY_LIMIT_SLIDER.change(update_model_memory_limit, inputs = MODEL_MEMORY_LIMIT_SLIDER, outputs = MODEL_MEMORY_LIMIT_SLIDER)
 
 
 def update_max_memory(max_memory : int) -> Update:
 	faceswap.globals.max_memory = max_memory if max_memory > 0 else None
 	return gradio.update(value = max_memory)
+
+
+def update_model_memory_limit(model_memory_limit : int) -> Update:
+	faceswap.globals.model_memory_limit = model_memory_limit if model_memory_limit > 0 else None
+	return gradio.update(value = model_memory_limit)
@@ -1,10 +1,12 @@
 import tempfile
-from typing import Tuple, Optional
+import time
+from typing import Generator, Tuple, Optional
 import gradio
 
 import faceswap.globals
 from faceswap import wording
-from faceswap.core import limit_resources, conditional_process
+from faceswap.typing import OutputJob
+from faceswap.uis.jobs import submit_output_job, get_output_job, cancel_output_jobs
 from faceswap.uis.typing import Update
 from faceswap.utilities import is_image, is_video, normalize_output_path, clear_temp
 
@@ -13,6 +15,9 @@ OUTPUT_VIDEO : Optional[gradio.Video] = None
 OUTPUT_PATH_TEXTBOX : Optional[gradio.Textbox] = None
 OUTPUT_START_BUTTON : Optional[gradio.Button] = None
 OUTPUT_CLEAR_BUTTON : Optional[gradio.Button] = None
+OUTPUT_CANCEL_BUTTON : Optional[gradio.Button] = None
+OUTPUT_PROGRESS_TEXTBOX : Optional[gradio.Textbox] = None
+OUTPUT_PROGRESS_INTERVAL = 0.5
 
 
 def render() -> None:
@@ -21,6 +26,8 @@ def render() -> None:
 	global OUTPUT_PATH_TEXTBOX
 	global OUTPUT_START_BUTTON
 	global OUTPUT_CLEAR_BUTTON
+	global OUTPUT_CANCEL_BUTTON
+	global OUTPUT_PROGRESS_TEXTBOX
 
 	OUTPUT_IMAGE = gradio.Image(
 		label = wording.get('output_image_or_video_label'),
@@ -34,25 +41,63 @@ def render() -> None:
 		value = faceswap.globals.output_path or tempfile.gettempdir(),
 		max_lines = 1
 	)
+	OUTPUT_PROGRESS_TEXTBOX = gradio.Textbox(
+		label = wording.get('output_progress_textbox_label'),
+		interactive = False
+	)
 	OUTPUT_START_BUTTON = gradio.Button(wording.get('start_button_label'))
+	OUTPUT_CANCEL_BUTTON = gradio.Button(wording.get('cancel_button_label'))
 	OUTPUT_CLEAR_BUTTON = gradio.Button(wording.get('clear_button_label'))
 
 
 def listen() -> None:
 	OUTPUT_PATH_TEXTBOX.change(update_output_path, inputs = OUTPUT_PATH_TEXTBOX, outputs = OUTPUT_PATH_TEXTBOX)
-	OUTPUT_START_BUTTON.click(start, inputs = OUTPUT_PATH_TEXTBOX, outputs = [ OUTPUT_IMAGE, OUTPUT_VIDEO ])
+	OUTPUT_START_BUTTON.click(start, inputs = OUTPUT_PATH_TEXTBOX, outputs = [ OUTPUT_IMAGE, OUTPUT_VIDEO, OUTPUT_PROGRESS_TEXTBOX ])
+	OUTPUT_CANCEL_BUTTON.click(cancel)
 	OUTPUT_CLEAR_BUTTON.click(clear, outputs = [ OUTPUT_IMAGE, OUTPUT_VIDEO ])
 
 
-def start(output_path : str) -> Tuple[Update, Update]:
+def start(output_path : str) -> Generator[Tuple[Update, Update, Update], None, None]:
 	faceswap.globals.output_path = normalize_output_path(faceswap.globals.source_path, faceswap.globals.target_path, output_path)
-	limit_resources()
-	conditional_process()
-	if is_image(faceswap.globals.output_path):
-		return gradio.update(value = faceswap.globals.output_path, visible = True), gradio.update(value = None, visible = False)
-	if is_video(faceswap.globals.output_path):
-		return gradio.update(value = None, visible = False), gradio.update(value = faceswap.globals.output_path, visible = True)
-	return gradio.update(), gradio.update()
+	# the render runs in a worker process, this handler only reports on it
+	job_id = submit_output_job(faceswap.globals.output_path)
+	output_job = get_output_job(job_id)
+	while output_job and output_job['status'] in [ 'queued', 'running' ]:
+		yield gradio.update(), gradio.update(), gradio.update(value = create_output_job_message(output_job))
+		time.sleep(OUTPUT_PROGRESS_INTERVAL)
+		output_job = get_output_job(job_id)
+	if output_job and output_job['status'] == 'completed' and is_image(output_job['output_path']):
+		yield gradio.update(value = output_job['output_path'], visible = True), gradio.update(value = None, visible = False), gradio.update(value = create_output_job_message(output_job))
+	elif output_job and output_job['status'] == 'completed' and is_video(output_job['output_path']):
+		yield gradio.update(value = None, visible = False), gradio.update(value = output_job['output_path'], visible = True), gradio.update(value = create_output_job_message(output_job))
+	elif output_job:
+		yield gradio.update(), gradio.update(), gradio.update(value = create_output_job_message(output_job))
+
+
+def cancel() -> None:
+	cancel_output_jobs()
+
+
+def create_output_job_message(output_job : OutputJob) -> str:
+	if output_job['status'] == 'queued':
+		return wording.get('output_job_queued')
+	if output_job['status'] == 'running' and output_job['progress_total']:
+		return wording.get('output_job_progress').format(
+			stage = output_job['stage'],
+			progress_count = output_job['progress_count'],
+			progress_total = output_job['progress_total'],
+			fps = output_job['fps'],
+			eta = output_job['eta'] if output_job['eta'] is not None else '?'
+		)
+	if output_job['status'] == 'running':
+		return output_job['stage'] or wording.get('processing')
+	if output_job['status'] == 'completed':
+		return wording.get('output_job_completed').format(process_time = output_job['process_time'])
+	if output_job['status'] == 'cancelled':
+		return wording.get('output_job_cancelled')
+	if output_job['error']:
+		return wording.get('output_job_failed_error').format(error = output_job['error'])
+	return wording.get('output_job_failed')
 
 
 def update_output_path(output_path : str) -> Update:
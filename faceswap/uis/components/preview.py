@@ -1,25 +1,69 @@
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
+import os
+import threading
+import time
 import cv2
 import gradio
 
 import faceswap.globals
 from faceswap import wording
-from faceswap.vision import get_video_frame, count_video_frame_total, normalize_frame_color, resize_frame_dimension
-from faceswap.face_analyser import get_one_face
+from faceswap.core import is_warming_up
+from faceswap.frame_cache import get_cached_video_frame
+from faceswap.vision import count_video_frame_total, normalize_frame_color, resize_frame_dimension
 from faceswap.face_reference import get_face_reference, set_face_reference
-from faceswap.processors.frame.core import load_frame_processor_module
+from faceswap.processors.frame.core import get_frame_processors_modules, has_frame_processor_capability
+from faceswap.timeline import get_thumbnail_frame
 from faceswap.typing import Frame, Face
 from faceswap.uis import core as ui
+from faceswap.uis.coalescer import iterate_latest, is_request_superseded
+from faceswap.uis.components.face_selector import get_reference_faces
+from faceswap.uis.engine import ENGINE_PRIORITY_BACKGROUND, is_engine_warming_up, set_engine_priority, process_engine_frame, analyse_engine_frame
 from faceswap.uis.typing import ComponentName, Update
-from faceswap.utilities import is_video, is_image
+from faceswap.utilities import is_file, is_video, is_image
 
 PREVIEW_IMAGE : Optional[gradio.Image] = None
 PREVIEW_FRAME_SLIDER : Optional[gradio.Slider] = None
+WARM_UP_STATE_TEXTBOX : Optional[gradio.Textbox] = None
+WARM_UP_STATE_INTERVAL = 1
+PREVIEW_CACHE : 'OrderedDict[Tuple[Any, ...], Frame]' = OrderedDict()
+PREVIEW_CACHE_SIZE = 64
+PREVIEW_SETTING_NAMES =\
+[
+	'frame_processors',
+	'frame_enhancer_model',
+	'frame_enhancer_tile_size',
+	'face_recognition',
+	'face_analyser_direction',
+	'face_analyser_age',
+	'face_analyser_gender',
+	'reference_face_position',
+	'reference_face_distance'
+]
+PREVIEW_PREFETCH : Dict[str, Any] =\
+{
+	'frame_number': 0,
+	'request_time': 0.0
+}
+PREVIEW_PREFETCH_OFFSETS = [ 1, 2, -1, 3, 4 ]
+PREVIEW_PREFETCH_DELAY = 0.5
+PREVIEW_PREFETCH_EVENT = threading.Event()
+PREVIEW_PREFETCH_THREAD : Optional[threading.Thread] = None
+PREVIEW_DRAFT : Dict[str, Any] =\
+{
+	'level': 0
+}
+PREVIEW_DRAFT_HEIGHTS = [ 360, 240, 160 ]
+PREVIEW_DRAFT_DETECTOR_SIZE = 320
+PREVIEW_DRAFT_BUDGET = 0.15
+PREVIEW_DRAFT_FACES : 'OrderedDict[Tuple[Any, ...], List[Face]]' = OrderedDict()
+THREAD_LOCK = threading.Lock()
 
 
 def render() -> None:
 	global PREVIEW_IMAGE
 	global PREVIEW_FRAME_SLIDER
+	global WARM_UP_STATE_TEXTBOX
 
 	preview_image_args: Dict[str, Any] =\
 	{
@@ -31,16 +75,13 @@ def render() -> None:
 		'step': 1,
 		'visible': False
 	}
-	conditional_set_face_reference()
-	source_face = get_one_face(cv2.imread(faceswap.globals.source_path)) if faceswap.globals.source_path else None
-	reference_face = get_face_reference() if 'reference' in faceswap.globals.face_recognition else None
 	if is_image(faceswap.globals.target_path):
 		target_frame = cv2.imread(faceswap.globals.target_path)
-		preview_frame = process_preview_frame(source_face, reference_face, target_frame)
+		preview_frame = render_preview_frame(target_frame)
 		preview_image_args['value'] = normalize_frame_color(preview_frame)
 	if is_video(faceswap.globals.target_path):
-		temp_frame = get_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number)
-		preview_frame = process_preview_frame(source_face, reference_face, temp_frame)
+		temp_frame = get_cached_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number, 480)
+		preview_frame = render_preview_frame(temp_frame)
 		preview_image_args['value'] = normalize_frame_color(preview_frame)
 		preview_image_args['visible'] = True
 		preview_frame_slider_args['value'] = faceswap.globals.reference_frame_number
@@ -48,11 +89,18 @@ def render() -> None:
 		preview_frame_slider_args['visible'] = True
 	PREVIEW_IMAGE = gradio.Image(**preview_image_args)
 	PREVIEW_FRAME_SLIDER = gradio.Slider(**preview_frame_slider_args)
+	# the layout renders before the models are loaded, its change refreshes the outputs once they are
+	WARM_UP_STATE_TEXTBOX = gradio.Textbox(
+		value = wait_for_warm_up,
+		visible = False
+	)
 	ui.register_component('preview_frame_slider', PREVIEW_FRAME_SLIDER)
+	ui.register_component('warm_up_state_textbox', WARM_UP_STATE_TEXTBOX)
 
 
 def listen() -> None:
 	PREVIEW_FRAME_SLIDER.change(update_preview_image, inputs = PREVIEW_FRAME_SLIDER, outputs = PREVIEW_IMAGE)
+	WARM_UP_STATE_TEXTBOX.change(refresh_preview_image, inputs = [ PREVIEW_FRAME_SLIDER, WARM_UP_STATE_TEXTBOX ], outputs = PREVIEW_IMAGE)
 	multi_component_names : List[ComponentName] =\
 	[
 		'source_image',
@@ -90,22 +138,193 @@ def listen() -> None:
 		reference_face_distance_slider.change(update_preview_image, inputs = PREVIEW_FRAME_SLIDER, outputs = PREVIEW_IMAGE)
 
 
-def update_preview_image(frame_number : int = 0) -> Update:
+def get_warm_up_state() -> str:
+	if is_warming_up() or is_engine_warming_up():
+		return 'warming'
+	return 'ready'
+
+
+def wait_for_warm_up() -> str:
+	# runs once per page load and ends with the warm up, no timer is left behind
+	while get_warm_up_state() == 'warming':
+		time.sleep(WARM_UP_STATE_INTERVAL)
+	return 'ready'
+
+
+def refresh_preview_image(frame_number : int, warm_up_state : str) -> Generator[Update, None, None]:
+	if warm_up_state == 'ready':
+		yield from update_preview_image(frame_number)
+	else:
+		yield gradio.update()
+
+
+def render_preview_frame(temp_frame : Frame) -> Optional[Frame]:
+	# keep the layout from waiting on the warm up, the first preview update processes the frame
+	if is_warming_up() or is_engine_warming_up():
+		return resize_frame_dimension(temp_frame, 480)
+	conditional_set_face_reference()
+	reference_face = get_face_reference() if 'reference' in faceswap.globals.face_recognition else None
+	return process_preview_frame(reference_face, temp_frame)
+
+
+def update_preview_image(frame_number : int = 0) -> Generator[Update, None, None]:
+	if is_video(faceswap.globals.target_path):
+		faceswap.globals.reference_frame_number = frame_number
+	# a burst of events only renders the newest one, the superseded ones leave the image untouched
+	preview_updates = iterate_latest('preview_image', render_preview_image, frame_number)
+	yield next(preview_updates, gradio.update())
+	yield from preview_updates
+
+
+def render_preview_image(frame_number : int) -> Iterator[Update]:
 	conditional_set_face_reference()
-	source_face = get_one_face(cv2.imread(faceswap.globals.source_path)) if faceswap.globals.source_path else None
+	if is_image(faceswap.globals.target_path):
+		frame_number = 0
+	if not is_image(faceswap.globals.target_path) and not is_video(faceswap.globals.target_path):
+		yield gradio.update(value = None)
+		return
+	# the nearest timeline thumbnail stands in while the frame decodes
+	if is_video(faceswap.globals.target_path) and not has_preview_frame(frame_number):
+		thumbnail_frame = get_thumbnail_frame(faceswap.globals.target_path, frame_number)
+		if thumbnail_frame is not None:
+			yield gradio.update(value = normalize_frame_color(thumbnail_frame))
+	# a draft without the heavy processors shows up first, the full preview follows
+	if not has_preview_frame(frame_number) and 0 < len(get_draft_frame_processors()) < len(faceswap.globals.frame_processors):
+		draft_frame = get_draft_frame(frame_number)
+		if draft_frame is not None:
+			yield gradio.update(value = normalize_frame_color(draft_frame))
+	preview_frame = get_preview_frame(frame_number)
+	if is_video(faceswap.globals.target_path):
+		prefetch_preview_frames(frame_number)
+	if preview_frame is not None:
+		yield gradio.update(value = normalize_frame_color(preview_frame))
+	else:
+		yield gradio.update(value = None)
+
+
+def has_preview_frame(frame_number : int) -> bool:
+	with THREAD_LOCK:
+		return create_preview_key(frame_number) in PREVIEW_CACHE
+
+
+def get_draft_frame_processors() -> List[str]:
+	frame_processors_modules = get_frame_processors_modules(faceswap.globals.frame_processors)
+	return [ frame_processor for frame_processor, frame_processor_module in zip(faceswap.globals.frame_processors, frame_processors_modules) if frame_processor_module.CAPABILITIES['needs_source_face'] ]
+
+
+def get_draft_frame(frame_number : int) -> Optional[Frame]:
+	start_time = time.perf_counter()
+	draft_height = PREVIEW_DRAFT_HEIGHTS[PREVIEW_DRAFT['level']]
+	temp_frame = read_target_frame(frame_number, draft_height)
+	if temp_frame is None:
+		return None
+	draft_key = create_preview_key(frame_number) + (draft_height,)
+	with THREAD_LOCK:
+		many_faces = PREVIEW_DRAFT_FACES.get(draft_key)
+	if many_faces is None:
+		many_faces = analyse_engine_frame(temp_frame, PREVIEW_DRAFT_DETECTOR_SIZE)
+		with THREAD_LOCK:
+			PREVIEW_DRAFT_FACES[draft_key] = many_faces
+			while len(PREVIEW_DRAFT_FACES) > PREVIEW_CACHE_SIZE:
+				PREVIEW_DRAFT_FACES.popitem(last = False)
 	reference_face = get_face_reference() if 'reference' in faceswap.globals.face_recognition else None
+	if is_request_superseded():
+		return None
+	temp_frame = process_engine_frame(temp_frame, reference_face, many_faces, get_draft_frame_processors())
+	if temp_frame is None:
+		return None
+	# the draft size follows the time it takes to stay within the budget
+	draft_time = time.perf_counter() - start_time
+	if draft_time > PREVIEW_DRAFT_BUDGET:
+		PREVIEW_DRAFT['level'] = min(PREVIEW_DRAFT['level'] + 1, len(PREVIEW_DRAFT_HEIGHTS) - 1)
+	if draft_time < PREVIEW_DRAFT_BUDGET * 0.5:
+		PREVIEW_DRAFT['level'] = max(PREVIEW_DRAFT['level'] - 1, 0)
+	return temp_frame
+
+
+def read_target_frame(frame_number : int, max_height : int) -> Optional[Frame]:
 	if is_image(faceswap.globals.target_path):
 		target_frame = cv2.imread(faceswap.globals.target_path)
-		preview_frame = process_preview_frame(source_face, reference_face, target_frame)
-		preview_frame = normalize_frame_color(preview_frame)
-		return gradio.update(value = preview_frame)
+		if target_frame is not None:
+			return resize_frame_dimension(target_frame, max_height)
 	if is_video(faceswap.globals.target_path):
-		faceswap.globals.reference_frame_number = frame_number
-		temp_frame = get_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number)
-		preview_frame = process_preview_frame(source_face, reference_face, temp_frame)
-		preview_frame = normalize_frame_color(preview_frame)
-		return gradio.update(value = preview_frame)
-	return gradio.update(value = None)
+		return get_cached_video_frame(faceswap.globals.target_path, frame_number, max_height)
+	return None
+
+
+def get_preview_frame(frame_number : int) -> Optional[Frame]:
+	preview_key = create_preview_key(frame_number)
+	with THREAD_LOCK:
+		if preview_key in PREVIEW_CACHE:
+			PREVIEW_CACHE.move_to_end(preview_key)
+			return PREVIEW_CACHE[preview_key]
+	preview_frame = render_target_frame(frame_number)
+	# settings changed while rendering make the result stale before it is stored
+	if preview_frame is not None and create_preview_key(frame_number) == preview_key:
+		with THREAD_LOCK:
+			PREVIEW_CACHE[preview_key] = preview_frame
+			while len(PREVIEW_CACHE) > PREVIEW_CACHE_SIZE:
+				PREVIEW_CACHE.popitem(last = False)
+	return preview_frame
+
+
+def render_target_frame(frame_number : int) -> Optional[Frame]:
+	temp_frame = read_target_frame(frame_number, 480)
+	if temp_frame is None:
+		return None
+	reference_face = get_face_reference() if 'reference' in faceswap.globals.face_recognition else None
+	return process_preview_frame(reference_face, temp_frame)
+
+
+def create_preview_key(frame_number : int) -> Tuple[Any, ...]:
+	reference_face = get_face_reference() if 'reference' in faceswap.globals.face_recognition else None
+	return\
+	(
+		create_file_key(faceswap.globals.target_path),
+		frame_number,
+		create_file_key(faceswap.globals.source_path),
+		reference_face.embedding.tobytes() if reference_face is not None else None,
+		tuple(repr(getattr(faceswap.globals, setting_name)) for setting_name in PREVIEW_SETTING_NAMES)
+	)
+
+
+def create_file_key(file_path : Optional[str]) -> Tuple[Optional[str], float]:
+	if is_file(file_path):
+		return file_path, os.path.getmtime(file_path)
+	return file_path, 0.0
+
+
+def prefetch_preview_frames(frame_number : int) -> None:
+	global PREVIEW_PREFETCH_THREAD
+
+	with THREAD_LOCK:
+		PREVIEW_PREFETCH['frame_number'] = frame_number
+		PREVIEW_PREFETCH['request_time'] = time.monotonic()
+		if PREVIEW_PREFETCH_THREAD is None:
+			PREVIEW_PREFETCH_THREAD = threading.Thread(target = run_prefetch, daemon = True)
+			PREVIEW_PREFETCH_THREAD.start()
+	PREVIEW_PREFETCH_EVENT.set()
+
+
+def run_prefetch() -> None:
+	# neighbours give way to the frame the user asked for
+	set_engine_priority(ENGINE_PRIORITY_BACKGROUND)
+	while True:
+		PREVIEW_PREFETCH_EVENT.wait()
+		# neighbours are only rendered once the user stopped scrubbing
+		while time.monotonic() - PREVIEW_PREFETCH['request_time'] < PREVIEW_PREFETCH_DELAY:
+			time.sleep(PREVIEW_PREFETCH_DELAY)
+		PREVIEW_PREFETCH_EVENT.clear()
+		frame_number = PREVIEW_PREFETCH['frame_number']
+		video_frame_total = count_video_frame_total(faceswap.globals.target_path) if is_video(faceswap.globals.target_path) else 0
+		for frame_offset in PREVIEW_PREFETCH_OFFSETS:
+			if PREVIEW_PREFETCH_EVENT.is_set() or not is_video(faceswap.globals.target_path):
+				break
+			if 0 <= frame_number + frame_offset <= video_frame_total:
+				try:
+					get_preview_frame(frame_number + frame_offset)
+				except Exception:
+					pass
 
 
 def update_preview_frame_slider(frame_number : int = 0) -> Update:
@@ -118,21 +337,16 @@ def update_preview_frame_slider(frame_number : int = 0) -> Update:
 	return gradio.update(value = None, maximum = None, visible = False)
 
 
-def process_preview_frame(source_face : Face, reference_face : Face, temp_frame : Frame) -> Frame:
+def process_preview_frame(reference_face : Face, temp_frame : Frame) -> Optional[Frame]:
 	temp_frame = resize_frame_dimension(temp_frame, 480)
-	for frame_processor in faceswap.globals.frame_processors:
-		frame_processor_module = load_frame_processor_module(frame_processor)
-		if frame_processor_module.pre_process('preview'):
-			temp_frame = frame_processor_module.process_frame(
-				source_face,
-				reference_face,
-				temp_frame
-			)
-	return temp_frame
+	if is_request_superseded():
+		return None
+	# the inference runs in the engine process, the ui only hands over the frame
+	return process_engine_frame(temp_frame, reference_face)
 
 
 def conditional_set_face_reference() -> None:
-	if 'reference' in faceswap.globals.face_recognition and not get_face_reference():
-		reference_frame = get_video_frame(faceswap.globals.target_path, faceswap.globals.reference_frame_number)
-		reference_face = get_one_face(reference_frame, faceswap.globals.reference_face_position)
-		set_face_reference(reference_face)
+	if 'reference' in faceswap.globals.face_recognition and not get_face_reference() and has_frame_processor_capability(faceswap.globals.frame_processors, 'needs_faces'):
+		_, reference_faces = get_reference_faces()
+		if reference_faces:
+			set_face_reference(reference_faces[min(faceswap.globals.reference_face_position, len(reference_faces) - 1)])
@@ -3,7 +3,7 @@ import gradio
 
 import faceswap.globals
 from faceswap import wording
-from faceswap.processors.frame.core import load_frame_processor_module, clear_frame_processors_modules
+from faceswap.processors.frame.core import pre_check_frame_processors
 from faceswap.uis import core as ui
 from faceswap.uis.typing import Update
 from faceswap.utilities import list_module_names
@@ -27,11 +27,8 @@ def listen() -> None:
 
 
 def update_frame_processors(frame_processors : List[str]) -> Update:
-	clear_frame_processors_modules()
 	faceswap.globals.frame_processors = frame_processors
-	for frame_processor in faceswap.globals.frame_processors:
-		frame_processor_module = load_frame_processor_module(frame_processor)
-		frame_processor_module.pre_check()
+	pre_check_frame_processors(faceswap.globals.frame_processors)
 	return gradio.update(value = frame_processors, choices = sort_frame_processors(frame_processors))
 
 
@@ -4,6 +4,8 @@ import gradio
 import faceswap.globals
 from faceswap import wording
 from faceswap.face_reference import clear_face_reference
+from faceswap.frame_cache import get_video_decoder
+from faceswap.timeline import start_video_timeline
 from faceswap.uis import core as ui
 from faceswap.uis.typing import Update
 from faceswap.utilities import is_image, is_video
@@ -57,6 +59,9 @@ def update(file : IO[Any]) -> Tuple[Update, Update]:
 		return gradio.update(value = file.name, visible = True), gradio.update(value = None, visible = False)
 	if file and is_video(file.name):
 		faceswap.globals.target_path = file.name
+		# the decoder opens and indexes the keyframes while the other components update
+		get_video_decoder(file.name)
+		start_video_timeline(file.name)
 		return gradio.update(value = None, visible = False), gradio.update(value = file.name, visible = True)
 	faceswap.globals.target_path = None
 	return gradio.update(value = None, visible = False), gradio.update(value = None, visible = False)
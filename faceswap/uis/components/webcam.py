@@ -1,25 +1,29 @@
-from typing import Optional, Generator
-import os
-import subprocess
+from typing import Any, Optional, Generator, Tuple
 import cv2
 import gradio
 from tqdm import tqdm
 
 import faceswap.globals
 from faceswap import wording
-from faceswap.typing import Frame, Face
+from faceswap.typing import Frame, MultiStreamStep, StreamMode, StreamStatistics, StreamQualityController, StreamWriterStatistics
 from faceswap.face_analyser import get_one_face
-from faceswap.processors.frame.core import load_frame_processor_module
+from faceswap.processors.frame.core import get_frame_processors_modules, has_frame_processor_capability
 from faceswap.uis import core as ui
 from faceswap.uis import choices
-from faceswap.uis.typing import StreamMode, WebcamMode, Update
-from faceswap.utilities import open_ffmpeg
+from faceswap.uis.typing import WebcamMode, Update
+from faceswap.core import update_status
+from faceswap.metrics import clear_metrics, get_metrics_summary
+from faceswap.multistream import get_multistream, add_stream, remove_stream, get_multistream_step
+from faceswap.stream import FakeCapture, read_stream_pipeline, get_stream_statistics, get_stream_quality, get_stream_fps, open_stream_writer, write_stream_frame, close_stream_writer, get_stream_writer_statistics
 from faceswap.vision import normalize_frame_color
 
 WEBCAM_IMAGE : Optional[gradio.Image] = None
 WEBCAM_MODE_RADIO : Optional[gradio.Radio] = None
 WEBCAM_START_BUTTON : Optional[gradio.Button] = None
 WEBCAM_STOP_BUTTON : Optional[gradio.Button] = None
+WEBCAM_LATENCY_TARGET_SLIDER : Optional[gradio.Slider] = None
+WEBCAM_STATISTICS_TEXTBOX : Optional[gradio.Textbox] = None
+STREAM_STATISTICS_INTERVAL = 100
 
 
 def render() -> None:
@@ -27,23 +31,37 @@ def render() -> None:
 	global WEBCAM_MODE_RADIO
 	global WEBCAM_START_BUTTON
 	global WEBCAM_STOP_BUTTON
+	global WEBCAM_LATENCY_TARGET_SLIDER
+	global WEBCAM_STATISTICS_TEXTBOX
 
 	WEBCAM_IMAGE = gradio.Image(
 		label = wording.get('webcam_image_label')
 	)
+	WEBCAM_STATISTICS_TEXTBOX = gradio.Textbox(
+		label = wording.get('webcam_statistics_textbox_label'),
+		interactive = False
+	)
 	WEBCAM_MODE_RADIO = gradio.Radio(
 		label = wording.get('webcam_mode_radio_label'),
 		choices = choices.webcam_mode,
 		value = 'inline'
 	)
+	WEBCAM_LATENCY_TARGET_SLIDER = gradio.Slider(
+		label = wording.get('webcam_latency_target_slider_label'),
+		value = faceswap.globals.stream_latency_target,
+		minimum = 50,
+		maximum = 1000,
+		step = 10
+	)
 	WEBCAM_START_BUTTON = gradio.Button(wording.get('start_button_label'))
 	WEBCAM_STOP_BUTTON = gradio.Button(wording.get('stop_button_label'))
 
 
 def listen() -> None:
-	start_event = WEBCAM_START_BUTTON.click(start, inputs = WEBCAM_MODE_RADIO, outputs = WEBCAM_IMAGE)
+	start_event = WEBCAM_START_BUTTON.click(start, inputs = WEBCAM_MODE_RADIO, outputs = [ WEBCAM_IMAGE, WEBCAM_STATISTICS_TEXTBOX ])
 	WEBCAM_MODE_RADIO.change(update, outputs = WEBCAM_IMAGE, cancels = start_event)
 	WEBCAM_STOP_BUTTON.click(None, cancels = start_event)
+	WEBCAM_LATENCY_TARGET_SLIDER.change(update_latency_target, inputs = WEBCAM_LATENCY_TARGET_SLIDER, outputs = WEBCAM_LATENCY_TARGET_SLIDER)
 	source_image = ui.get_component('source_image')
 	if source_image:
 		for method in [ 'upload', 'change', 'clear' ]:
@@ -54,50 +72,113 @@ def update() -> Update:
 	return gradio.update(value = None)
 
 
-def start(mode : WebcamMode) -> Generator[Frame, None, None]:
+def update_latency_target(stream_latency_target : int) -> Update:
+	faceswap.globals.stream_latency_target = stream_latency_target
+	return gradio.update(value = stream_latency_target)
+
+
+def start(mode : WebcamMode) -> Generator[Tuple[Frame, str], None, None]:
 	faceswap.globals.face_recognition = 'many'
-	source_face = get_one_face(cv2.imread(faceswap.globals.source_path)) if faceswap.globals.source_path else None
-	stream = None
+	source_face = None
+	if faceswap.globals.source_path and has_frame_processor_capability(faceswap.globals.frame_processors, 'needs_source_face'):
+		source_face = get_one_face(cv2.imread(faceswap.globals.source_path))
+	frame_processors_modules = [ frame_processor_module for frame_processor_module in get_frame_processors_modules(faceswap.globals.frame_processors) if frame_processor_module.pre_process('stream') ]
+	stream_mode : Optional[StreamMode] = None
 	if mode == 'stream_udp':
-		stream = open_stream('udp')
+		stream_mode = 'udp'
 	if mode == 'stream_v4l2':
-		stream = open_stream('v4l2')
+		stream_mode = 'v4l2'
+	stream_writer = None
 	capture = capture_webcam()
 	if capture.isOpened():
+		# capture, processing and output run apart, the processing is shared with the other webcam sessions
+		multistream = get_multistream()
+		if not multistream['sessions']:
+			clear_metrics()
+		stream_session = add_stream(multistream, capture, frame_processors_modules, source_face)
+		stream_quality_controller = stream_session['quality_controller']
 		progress = tqdm(desc = wording.get('processing'), unit = 'frame', dynamic_ncols = True)
-		while True:
-			_, temp_frame = capture.read()
-			temp_frame = process_stream_frame(source_face, temp_frame)
-			if temp_frame is not None:
-				if stream is not None:
-					stream.stdin.write(temp_frame.tobytes())
-				yield normalize_frame_color(temp_frame)
+		frame_number = 0
+		try:
+			while True:
+				stream_pipeline_value = read_stream_pipeline(stream_session, frame_number)
+				if stream_pipeline_value is None:
+					break
+				frame_number, temp_frame = stream_pipeline_value
+				if stream_quality_controller['changed']:
+					stream_quality_controller['changed'] = False
+					update_status(create_stream_quality_message(stream_quality_controller))
+				# the stream is opened with the geometry and rate actually delivered
+				if stream_mode and stream_writer is None:
+					height, width = temp_frame.shape[:2]
+					stream_writer = open_stream_writer(stream_mode, (width, height), capture.get(cv2.CAP_PROP_FPS) or 30)
+				if stream_writer is not None:
+					write_stream_frame(stream_writer, temp_frame)
+				yield normalize_frame_color(temp_frame), create_stream_quality_message(stream_quality_controller) + '\n' + create_multistream_step_message(get_multistream_step(multistream)) + '\n' + create_stream_metrics_message()
+				stream_statistics = get_stream_statistics(stream_session)
+				progress.set_postfix(
+				{
+					'latency': str(stream_statistics['latency']) + 'ms',
+					'dropped': stream_statistics['dropped']
+				})
 				progress.update(1)
-
-
-def capture_webcam(webcam_id : int = 0) -> cv2.VideoCapture:
+				if stream_statistics['displayed'] % STREAM_STATISTICS_INTERVAL == 0:
+					report_stream_statistics(stream_statistics)
+				if stream_statistics['displayed'] % STREAM_STATISTICS_INTERVAL == 0 and stream_writer is not None:
+					report_stream_writer_statistics(get_stream_writer_statistics(stream_writer))
+		finally:
+			remove_stream(multistream, stream_session)
+			report_stream_statistics(get_stream_statistics(stream_session))
+			if stream_writer is not None:
+				close_stream_writer(stream_writer)
+				report_stream_writer_statistics(get_stream_writer_statistics(stream_writer))
+
+
+def capture_webcam(webcam_id : int = 0) -> Any:
+	if faceswap.globals.stream_fake_camera_path:
+		return FakeCapture(faceswap.globals.stream_fake_camera_path)
 	capture = cv2.VideoCapture(webcam_id)
 	capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G')) # type: ignore[attr-defined]
 	return capture
 
 
-def process_stream_frame(source_face : Face, temp_frame : Frame) -> Frame:
-	for frame_processor in faceswap.globals.frame_processors:
-		frame_processor_module = load_frame_processor_module(frame_processor)
-		if frame_processor_module.pre_process('stream'):
-			temp_frame = frame_processor_module.process_frame(
-				source_face,
-				None,
-				temp_frame
-			)
-	return temp_frame
-
-
-def open_stream(mode : StreamMode) -> subprocess.Popen[bytes]:
-	commands = [ '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', '640x480', '-r', '30', '-i', '-' ]
-	if mode == 'udp':
-		commands.extend([ '-b:v', '2000k', '-f', 'mpegts', 'udp://localhost:27000?pkt_size=1316' ])
-	if mode == 'v4l2':
-		device_name = os.listdir('/sys/devices/virtual/video4linux')[0]
-		commands.extend([ '-f', 'v4l2', '/dev/' + device_name ])
-	return open_ffmpeg(commands)
+def report_stream_statistics(stream_statistics : StreamStatistics) -> None:
+	update_status(wording.get('stream_statistics').format(
+		latency = stream_statistics['latency'],
+		latency_target = faceswap.globals.stream_latency_target,
+		processed = stream_statistics['processed'],
+		dropped = stream_statistics['dropped'],
+		late = stream_statistics['late']
+	))
+
+
+def report_stream_writer_statistics(stream_writer_statistics : StreamWriterStatistics) -> None:
+	update_status(wording.get('stream_writer_statistics').format(
+		written = stream_writer_statistics['written'],
+		dropped = stream_writer_statistics['dropped']
+	))
+
+
+def create_stream_quality_message(stream_quality_controller : StreamQualityController) -> str:
+	stream_quality = get_stream_quality(stream_quality_controller)
+	return wording.get('stream_quality').format(
+		level = stream_quality_controller['level'],
+		scale = stream_quality['scale'],
+		detection_interval = stream_quality['detection_interval'],
+		optional_processors = 'on' if stream_quality['optional_processors'] else 'off',
+		fps = get_stream_fps(stream_quality_controller)
+	)
+
+
+def create_multistream_step_message(multistream_step : MultiStreamStep) -> str:
+	return wording.get('multistream_step').format(
+		stream_total = multistream_step['stream_total'],
+		fps = multistream_step['fps'],
+		latency_p50 = multistream_step['latency_p50'],
+		latency_p95 = multistream_step['latency_p95'],
+		expired = multistream_step['expired']
+	)
+
+
+def create_stream_metrics_message() -> str:
+	return ', '.join(wording.get('stream_metrics').format(stage = stage_name, p50 = p50, p95 = p95) for stage_name, _, p50, p95, _ in get_metrics_summary())
@@ -0,0 +1,238 @@
+from concurrent.futures import Future
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import numpy
+
+import faceswap.globals
+from faceswap import core, wording
+from faceswap.face_analyser import get_one_face, get_many_faces, set_reused_faces, clear_face_analyser
+from faceswap.processors.frame.core import get_frame_processors_modules, has_frame_processor_capability, clear_frame_processors_modules
+from faceswap.typing import EngineHealth, EngineStatus, Face, Frame
+from faceswap.uis.jobs import create_globals_snapshot
+from faceswap.vision import read_image
+
+ENGINE : Dict[str, Any] =\
+{
+	'process': None,
+	'request_queue': None,
+	'response_queue': None,
+	'warming': False,
+	'restarts': 0,
+	'latency': 0.0
+}
+ENGINE_FUTURES : Dict[str, 'Future[Any]'] = {}
+ENGINE_TIMEOUT = 120
+ENGINE_SHARED_FRAME = 'shared_frame'
+ENGINE_PRIORITY_FOREGROUND = 0
+ENGINE_PRIORITY_BACKGROUND = 1
+ENGINE_PRIORITY = threading.local()
+SOURCE_FACE_CACHE : Dict[Tuple[Any, ...], Optional[Face]] = {}
+THREAD_LOCK = threading.RLock()
+
+
+def start_engine() -> None:
+	with THREAD_LOCK:
+		if ENGINE['process'] is None or not ENGINE['process'].is_alive():
+			if ENGINE['process'] is not None:
+				ENGINE['restarts'] += 1
+			context = multiprocessing.get_context('spawn')
+			ENGINE['request_queue'] = context.Queue()
+			ENGINE['response_queue'] = context.Queue()
+			ENGINE['process'] = context.Process(target = run_engine, args = (ENGINE['request_queue'], ENGINE['response_queue']), daemon = True)
+			ENGINE['process'].start()
+			threading.Thread(target = listen_responses, args = (ENGINE['process'], ENGINE['response_queue']), daemon = True).start()
+			ENGINE['warming'] = True
+			ENGINE['request_queue'].put((ENGINE_PRIORITY_FOREGROUND, None, 'warm_up', create_globals_snapshot(), None, ()))
+
+
+def stop_engine() -> None:
+	with THREAD_LOCK:
+		if ENGINE['process'] is not None:
+			ENGINE['process'].terminate()
+			ENGINE['process'].join()
+
+
+def restart_engine() -> None:
+	# the ui keeps running, only the models are loaded again
+	stop_engine()
+	start_engine()
+
+
+def is_engine_warming_up() -> bool:
+	with THREAD_LOCK:
+		return ENGINE['warming'] and ENGINE['process'] is not None and ENGINE['process'].is_alive()
+
+
+def get_engine_health() -> EngineHealth:
+	with THREAD_LOCK:
+		is_alive = ENGINE['process'] is not None and ENGINE['process'].is_alive()
+		engine_status : EngineStatus = 'stopped'
+		if is_alive:
+			engine_status = 'warming' if ENGINE['warming'] else 'running'
+		return\
+		{
+			'status': engine_status,
+			'pid': ENGINE['process'].pid if is_alive else None,
+			'pending': len(ENGINE_FUTURES),
+			'restarts': ENGINE['restarts'],
+			'latency': ENGINE['latency']
+		}
+
+
+def set_engine_priority(engine_priority : int) -> None:
+	ENGINE_PRIORITY.value = engine_priority
+
+
+def get_engine_priority() -> int:
+	return getattr(ENGINE_PRIORITY, 'value', ENGINE_PRIORITY_FOREGROUND)
+
+
+def process_engine_frame(temp_frame : Frame, reference_face : Optional[Face], many_faces : Optional[List[Face]] = None, frame_processors : Optional[List[str]] = None) -> Optional[Frame]:
+	try:
+		return request_engine('process_frame', temp_frame, reference_face, many_faces, frame_processors)
+	except Exception:
+		return None
+
+
+def analyse_engine_frame(frame : Frame, detector_size : Optional[int] = None) -> List[Face]:
+	try:
+		return request_engine('analyse_frame', frame, detector_size)
+	except Exception:
+		return []
+
+
+def request_engine(request_name : str, frame : Optional[Frame], *request_args : Any) -> Any:
+	start_time = time.perf_counter()
+	request_id = uuid.uuid4().hex[:8]
+	future : Future[Any] = Future()
+	shared_memory = None
+	shared_frame = None
+	# frames travel through shared memory, only their descriptor goes over the queue
+	if frame is not None:
+		shared_memory = SharedMemory(create = True, size = max(frame.nbytes, 1))
+		numpy.ndarray(frame.shape, dtype = frame.dtype, buffer = shared_memory.buf)[:] = frame
+		shared_frame = shared_memory.name, frame.shape, frame.dtype.str
+	try:
+		with THREAD_LOCK:
+			start_engine()
+			ENGINE_FUTURES[request_id] = future
+			ENGINE['request_queue'].put((get_engine_priority(), request_id, request_name, create_globals_snapshot(), shared_frame, request_args))
+		result = future.result(timeout = ENGINE_TIMEOUT)
+		if result == ENGINE_SHARED_FRAME and shared_memory and shared_frame:
+			result = numpy.ndarray(shared_frame[1], dtype = shared_frame[2], buffer = shared_memory.buf).copy()
+		with THREAD_LOCK:
+			ENGINE['latency'] = round((time.perf_counter() - start_time) * 1000, 2)
+		return result
+	finally:
+		with THREAD_LOCK:
+			ENGINE_FUTURES.pop(request_id, None)
+		if shared_memory:
+			shared_memory.close()
+			shared_memory.unlink()
+
+
+def listen_responses(process : Any, response_queue : Any) -> None:
+	while process.is_alive() or not response_queue.empty():
+		try:
+			request_id, result, error = response_queue.get(timeout = 0.5)
+		except Empty:
+			continue
+		except (EOFError, OSError):
+			break
+		with THREAD_LOCK:
+			future = ENGINE_FUTURES.get(request_id)
+			if request_id is None and ENGINE['process'] is process:
+				ENGINE['warming'] = False
+		if request_id is None and error:
+			core.update_status(wording.get('pre_load_failed').format(error = error))
+		if future and error:
+			future.set_exception(RuntimeError(error))
+		elif future:
+			future.set_result(result)
+	# requests of a stopped engine fail right away, the next request starts a new one
+	with THREAD_LOCK:
+		if ENGINE['process'] is process:
+			for future in ENGINE_FUTURES.values():
+				if not future.done():
+					future.set_exception(RuntimeError('engine stopped'))
+
+
+def run_engine(request_queue : Any, response_queue : Any) -> None:
+	engine_handlers : Dict[str, Callable[..., Any]] =\
+	{
+		'warm_up': handle_warm_up,
+		'process_frame': handle_process_frame,
+		'analyse_frame': handle_analyse_frame
+	}
+	engine_requests : List[Tuple[int, int, Any]] = []
+	request_counter = itertools.count()
+	while True:
+		# everything queued so far is taken at once, foreground requests overtake the background ones
+		try:
+			request = request_queue.get(block = not engine_requests)
+			while True:
+				heapq.heappush(engine_requests, (request[0], next(request_counter), request))
+				request = request_queue.get_nowait()
+		except Empty:
+			pass
+		_, request_id, request_name, globals_snapshot, shared_frame, request_args = heapq.heappop(engine_requests)[2]
+		# the models follow the execution providers picked in the ui
+		if globals_snapshot.get('execution_providers') != faceswap.globals.execution_providers:
+			clear_face_analyser()
+			clear_frame_processors_modules()
+		for name, value in globals_snapshot.items():
+			setattr(faceswap.globals, name, value)
+		shared_memory = SharedMemory(name = shared_frame[0]) if shared_frame else None
+		try:
+			frame = numpy.ndarray(shared_frame[1], dtype = shared_frame[2], buffer = shared_memory.buf) if shared_memory and shared_frame else None
+			result = engine_handlers[request_name](frame.copy() if frame is not None else None, *request_args)
+			# a result shaped like the request frame is written back in place
+			if frame is not None and isinstance(result, numpy.ndarray) and result.shape == frame.shape and result.dtype == frame.dtype:
+				frame[:] = result
+				result = ENGINE_SHARED_FRAME
+			response_queue.put((request_id, result, None))
+		except Exception as exception:
+			response_queue.put((request_id, None, str(exception) or type(exception).__name__))
+		finally:
+			if shared_memory:
+				shared_memory.close()
+
+
+def handle_warm_up(frame : None) -> None:
+	core.limit_resources()
+	core.pre_load()
+
+
+def handle_analyse_frame(frame : Frame, detector_size : Optional[int]) -> List[Face]:
+	return get_many_faces(frame, detector_size)
+
+
+def handle_process_frame(temp_frame : Frame, reference_face : Optional[Face], many_faces : Optional[List[Face]], frame_processors : Optional[List[str]]) -> Frame:
+	source_face = get_source_face()
+	for frame_processor_module in get_frame_processors_modules(frame_processors if frame_processors is not None else faceswap.globals.frame_processors):
+		if frame_processor_module.pre_process('preview'):
+			# faces detected by the caller spare the detection here
+			set_reused_faces(many_faces)
+			try:
+				temp_frame = frame_processor_module.process_frame(source_face, reference_face, temp_frame)
+			finally:
+				set_reused_faces(None)
+	return temp_frame
+
+
+def get_source_face() -> Optional[Face]:
+	if faceswap.globals.source_path and has_frame_processor_capability(faceswap.globals.frame_processors, 'needs_source_face'):
+		source_key = faceswap.globals.source_path, os.path.getmtime(faceswap.globals.source_path), faceswap.globals.face_analyser_direction, faceswap.globals.face_analyser_age, faceswap.globals.face_analyser_gender
+		if source_key not in SOURCE_FACE_CACHE:
+			SOURCE_FACE_CACHE.clear()
+			SOURCE_FACE_CACHE[source_key] = get_one_face(read_image(faceswap.globals.source_path))
+		return SOURCE_FACE_CACHE[source_key]
+	return None
@@ -0,0 +1,179 @@
+from queue import Empty
+from typing import Any, Dict, Optional
+import copy
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import psutil
+
+import faceswap.globals
+import faceswap.processors.frame.core as frame_processors
+from faceswap import core
+from faceswap.face_reference import clear_face_reference
+from faceswap.typing import OutputJob
+from faceswap.utilities import is_file, clear_stale_temp
+
+OUTPUT_JOBS : Dict[str, OutputJob] = {}
+OUTPUT_WORKER : Dict[str, Any] =\
+{
+	'process': None,
+	'task_queue': None,
+	'event_queue': None
+}
+WORKER_JOB_ID : Optional[str] = None
+THREAD_LOCK = threading.RLock()
+
+
+def submit_output_job(output_path : str) -> str:
+	job_id = uuid.uuid4().hex[:8]
+	# the job renders what was selected at submit time, later ui changes only affect the preview
+	globals_snapshot = create_globals_snapshot()
+	globals_snapshot['output_path'] = output_path
+	with THREAD_LOCK:
+		OUTPUT_JOBS[job_id] =\
+		{
+			'job_id': job_id,
+			'status': 'queued',
+			'stage': None,
+			'progress_count': 0,
+			'progress_total': 0,
+			'progress_time': 0.0,
+			'fps': 0.0,
+			'eta': None,
+			'output_path': output_path,
+			'start_time': time.time(),
+			'process_time': None,
+			'error': None
+		}
+		start_worker()
+		OUTPUT_WORKER['task_queue'].put((job_id, globals_snapshot))
+	return job_id
+
+
+def get_output_job(job_id : str) -> Optional[OutputJob]:
+	with THREAD_LOCK:
+		if job_id in OUTPUT_JOBS:
+			return copy.copy(OUTPUT_JOBS[job_id])
+	return None
+
+
+def cancel_output_jobs() -> None:
+	output_paths = []
+	with THREAD_LOCK:
+		for output_job in OUTPUT_JOBS.values():
+			if output_job['status'] == 'running':
+				output_paths.append((output_job['output_path'], output_job['start_time']))
+			if output_job['status'] in [ 'queued', 'running' ]:
+				output_job['status'] = 'cancelled'
+		# stopping the worker is the only prompt way to stop its thread pool, the next job starts a fresh one
+		if OUTPUT_WORKER['process']:
+			stop_process_tree(OUTPUT_WORKER['process'])
+			OUTPUT_WORKER['process'] = None
+	# the workspace of the stopped worker is stale now, a partial output goes with it
+	clear_stale_temp()
+	for output_path, start_time in output_paths:
+		if is_file(output_path) and os.path.getmtime(output_path) >= start_time:
+			os.remove(output_path)
+
+
+def stop_process_tree(process : Any) -> None:
+	# ffmpeg children keep writing when only the worker stops
+	try:
+		child_processes = psutil.Process(process.pid).children(recursive = True)
+	except psutil.NoSuchProcess:
+		child_processes = []
+	for child_process in child_processes:
+		try:
+			child_process.kill()
+		except psutil.NoSuchProcess:
+			pass
+	psutil.wait_procs(child_processes, timeout = 5)
+	process.terminate()
+	process.join()
+
+
+def create_globals_snapshot() -> Dict[str, Any]:
+	return { name: copy.deepcopy(value) for name, value in vars(faceswap.globals).items() if not name.startswith('_') and isinstance(value, (str, int, float, list, type(None))) }
+
+
+def start_worker() -> None:
+	with THREAD_LOCK:
+		if OUTPUT_WORKER['process'] is None or not OUTPUT_WORKER['process'].is_alive():
+			context = multiprocessing.get_context('spawn')
+			OUTPUT_WORKER['task_queue'] = context.Queue()
+			OUTPUT_WORKER['event_queue'] = context.Queue()
+			OUTPUT_WORKER['process'] = context.Process(target = run_worker, args = (OUTPUT_WORKER['task_queue'], OUTPUT_WORKER['event_queue']), daemon = True)
+			OUTPUT_WORKER['process'].start()
+			threading.Thread(target = listen_events, args = (OUTPUT_WORKER['process'], OUTPUT_WORKER['event_queue']), daemon = True).start()
+
+
+def run_worker(task_queue : Any, event_queue : Any) -> None:
+	global WORKER_JOB_ID
+
+	core.STATUS_LISTENERS.append(lambda message, scope: event_queue.put(('message', WORKER_JOB_ID, (message, scope))))
+	frame_processors.PROGRESS_LISTENERS.append(lambda progress_count, progress_total: event_queue.put(('progress', WORKER_JOB_ID, (progress_count, progress_total))))
+	while True:
+		task = task_queue.get()
+		if task is None:
+			break
+		WORKER_JOB_ID, globals_snapshot = task
+		for name, value in globals_snapshot.items():
+			setattr(faceswap.globals, name, value)
+		event_queue.put(('started', WORKER_JOB_ID, None))
+		start_time = time.time()
+		error = None
+		try:
+			core.limit_resources()
+			clear_face_reference()
+			core.conditional_process()
+			is_completed = is_file(faceswap.globals.output_path) and os.path.getmtime(faceswap.globals.output_path) >= start_time
+		except Exception as exception:
+			is_completed = False
+			error = str(exception) or type(exception).__name__
+		event_queue.put(('finished', WORKER_JOB_ID, ('completed' if is_completed else 'failed', error)))
+
+
+def listen_events(process : Any, event_queue : Any) -> None:
+	while process.is_alive() or not event_queue.empty():
+		try:
+			event_name, job_id, event_value = event_queue.get(timeout = 0.5)
+		except Empty:
+			continue
+		except (EOFError, OSError):
+			break
+		handle_event(event_name, job_id, event_value)
+	# a worker that died on its own takes its jobs with it
+	with THREAD_LOCK:
+		if OUTPUT_WORKER['process'] is process:
+			for output_job in OUTPUT_JOBS.values():
+				if output_job['status'] in [ 'queued', 'running' ]:
+					output_job['status'] = 'failed'
+
+
+def handle_event(event_name : str, job_id : str, event_value : Any) -> None:
+	with THREAD_LOCK:
+		output_job = OUTPUT_JOBS.get(job_id)
+		if not output_job or output_job['status'] not in [ 'queued', 'running' ]:
+			return
+		current_time = time.time()
+		if event_name == 'started':
+			output_job['status'] = 'running'
+		if event_name == 'message':
+			message, scope = event_value
+			output_job['stage'] = message if scope == 'FACESWAP.CORE' else scope.split('.')[-1].lower()
+		if event_name == 'progress':
+			progress_count, progress_total = event_value
+			# every processor runs over the frames again and restarts the rate
+			if progress_total != output_job['progress_total'] or progress_count < output_job['progress_count']:
+				output_job['progress_time'] = current_time
+			output_job['progress_count'] = progress_count
+			output_job['progress_total'] = progress_total
+			progress_time = current_time - output_job['progress_time']
+			if progress_time > 0:
+				output_job['fps'] = round(progress_count / progress_time, 2)
+				output_job['eta'] = round((progress_total - progress_count) / output_job['fps'], 1) if output_job['fps'] else None
+		if event_name == 'finished':
+			output_job['status'], output_job['error'] = event_value
+			output_job['process_time'] = round(current_time - output_job['start_time'], 2)
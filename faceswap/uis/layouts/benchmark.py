@@ -1,7 +1,7 @@
 import gradio
 
 from faceswap.uis.components import about, processors, execution, execution_settings, limit_resources, benchmark
-from faceswap.utilities import conditional_download
+from faceswap.utilities import conditional_download, is_file, run_ffmpeg
 
 
 def pre_check() -> bool:
@@ -16,6 +16,8 @@ def pre_check() -> bool:
 		'https://github.com/faceswap/faceswap-assets/releases/download/examples/target-1440p.mp4',
 		'https://github.com/faceswap/faceswap-assets/releases/download/examples/target-2160p.mp4'
 	])
+	if not is_file('.assets/examples/target-1080p.jpg'):
+		run_ffmpeg([ '-i', '.assets/examples/target-1080p.mp4', '-vframes', '1', '.assets/examples/target-1080p.jpg' ])
 	return True
 
 
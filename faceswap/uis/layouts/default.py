@@ -1,6 +1,7 @@
 import gradio
 
-from faceswap.uis.components import about, processors, execution, execution_settings, limit_resources, temp_frame, output_settings, settings, source, target, preview, trim_frame, face_analyser, face_selector, output
+from faceswap.uis.engine import start_engine
+from faceswap.uis.components import about, processors, engine, execution, execution_settings, limit_resources, temp_frame, output_settings, settings, source, target, preview, trim_frame, face_analyser, face_selector, output
 
 
 def pre_check() -> bool:
@@ -8,6 +9,8 @@ def pre_check() -> bool:
 
 
 def pre_render() -> bool:
+	# the engine loads its models while the layout renders
+	start_engine()
 	return True
 
 
@@ -22,6 +25,8 @@ def render() -> gradio.Blocks:
 				with gradio.Blocks():
 					execution.render()
 					execution_settings.render()
+				with gradio.Blocks():
+					engine.render()
 				with gradio.Blocks():
 					limit_resources.render()
 				with gradio.Blocks():
@@ -53,6 +58,7 @@ def listen() -> None:
 	processors.listen()
 	execution.listen()
 	execution_settings.listen()
+	engine.listen()
 	limit_resources.listen()
 	temp_frame.listen()
 	output_settings.listen()
@@ -67,4 +73,6 @@ def listen() -> None:
 
 
 def run(ui : gradio.Blocks) -> None:
+	# the preview streams its draft and full frame, which needs the queue
+	ui.queue(concurrency_count = 4, api_open = False)
 	ui.launch(show_api = False)
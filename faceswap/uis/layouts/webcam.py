@@ -1,5 +1,6 @@
 import gradio
 
+import faceswap.globals
 from faceswap.uis.components import about, processors, execution, source, webcam
 
 
@@ -37,5 +38,6 @@ def listen() -> None:
 
 
 def run(ui : gradio.Blocks) -> None:
-	ui.queue(concurrency_count = 2, api_open = False)
+	# every webcam session holds a queue slot for as long as it streams
+	ui.queue(concurrency_count = faceswap.globals.stream_concurrency or 2, api_open = False)
 	ui.launch(show_api = False)
@@ -8,6 +8,7 @@ ComponentName = Literal\
 	'target_image',
 	'target_video',
 	'preview_frame_slider',
+	'warm_up_state_textbox',
 	'face_recognition_dropdown',
 	'reference_face_position_gallery',
 	'reference_face_distance_slider',
@@ -17,5 +18,4 @@ ComponentName = Literal\
 	'frame_processors_checkbox_group'
 ]
 WebcamMode = Literal[ 'inline', 'stream_udp', 'stream_v4l2' ]
-StreamMode = Literal[ 'udp', 'v4l2' ]
 Update = Dict[Any, Any]
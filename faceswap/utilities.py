@@ -1,24 +1,54 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from tqdm import tqdm
 import glob
+import hashlib
+import json
+import math
 import mimetypes
 import os
 import platform
+import psutil
 import shutil
 import ssl
 import subprocess
 import tempfile
-import urllib
-import onnxruntime
+import threading
+import urllib.error
+import urllib.request
+import uuid
+import cv2
 
 import faceswap.globals
 from faceswap import wording
-from faceswap.vision import detect_fps
+from faceswap.metrics import measure
+from faceswap.typing import Frame, TempFrameTier, DownloadManifest, DownloadManifestEntry
+from faceswap.vision import detect_fps, detect_video_resolution, count_video_frame_total
 
 TEMP_DIRECTORY_PATH = os.path.join(tempfile.gettempdir(), 'faceswap')
+TEMP_MEMORY_DIRECTORY_PATH = os.path.join('/dev/shm', 'faceswap')
+TEMP_FRAME_STATISTICS : Dict[TempFrameTier, Dict[str, int]] =\
+{
+	'memory':
+	{
+		'written': 0,
+		'read': 0
+	},
+	'disk':
+	{
+		'written': 0,
+		'read': 0
+	}
+}
+TEMP_FRAME_MEMORY_USAGE : Dict[str, int] = {}
+THREAD_LOCK = threading.Lock()
 TEMP_OUTPUT_VIDEO_NAME = 'temp.mp4'
-TEMP_OUTPUT_AUDIO_NAME = 'temp.mp3'
+TEMP_OUTPUT_AUDIO_NAME = 'temp.mka'
+TEMP_KEEP_NAME = '.keep'
+DOWNLOAD_MANIFEST_NAME = '.manifest.json'
+DOWNLOAD_CHUNK_SIZE = 1024 ** 2
+DOWNLOAD_THREAD_COUNT = 4
 
 # monkey patch ssl
 if platform.system().lower() == 'darwin':
@@ -46,23 +76,35 @@ def extract_frames(target_path : str, fps : float) -> bool:
 	trim_frame_start = faceswap.globals.trim_frame_start
 	trim_frame_end = faceswap.globals.trim_frame_end
 	temp_frames_pattern = get_temp_frames_pattern(target_path)
-	commands = [ '-hwaccel', 'auto', '-i', target_path, '-q:v', str(temp_frame_compression), '-pix_fmt', 'rgb24' ]
 	if trim_frame_start is not None and trim_frame_end is not None:
-		commands.extend([ '-vf', 'trim=start_frame=' + str(trim_frame_start) + ':end_frame=' + str(trim_frame_end) + ',fps=' + str(fps) ])
+		temp_frames_filter = 'trim=start_frame=' + str(trim_frame_start) + ':end_frame=' + str(trim_frame_end) + ',fps=' + str(fps)
 	elif trim_frame_start is not None:
-		commands.extend([ '-vf', 'trim=start_frame=' + str(trim_frame_start) + ',fps=' + str(fps) ])
+		temp_frames_filter = 'trim=start_frame=' + str(trim_frame_start) + ',fps=' + str(fps)
 	elif trim_frame_end is not None:
-		commands.extend([ '-vf', 'trim=end_frame=' + str(trim_frame_end) + ',fps=' + str(fps) ])
+		temp_frames_filter = 'trim=end_frame=' + str(trim_frame_end) + ',fps=' + str(fps)
 	else:
-		commands.extend([ '-vf', 'fps=' + str(fps) ])
-	commands.extend([ '-vsync', '0', temp_frames_pattern ])
-	return run_ffmpeg(commands)
-
-
-def compress_image(output_path : str) -> bool:
-	output_image_compression = round(31 - (faceswap.globals.output_image_quality * 0.31))
-	commands = [ '-hwaccel', 'auto', '-i', output_path, '-q:v', str(output_image_compression), '-y', output_path ]
-	return run_ffmpeg(commands)
+		temp_frames_filter = 'fps=' + str(fps)
+	temp_frame_args = [ '-q:v', str(temp_frame_compression), '-pix_fmt', 'rgb24', '-vsync', '0' ]
+	commands = [ '-hwaccel', 'auto', '-i', target_path ]
+	if use_temp_memory() and count_temp_frame_memory_total(target_path) < estimate_temp_frame_total(target_path, fps):
+		# frames beyond the memory budget go straight to the disk tier within the same decode
+		temp_frame_memory_total = count_temp_frame_memory_total(target_path)
+		temp_disk_frames_pattern = get_temp_disk_frames_pattern(target_path)
+		commands.extend([ '-filter_complex', '[0:v]' + temp_frames_filter + ',split=2[memory][disk];[memory]select=lt(n\\,' + str(temp_frame_memory_total) + ')[memory_frames];[disk]select=gte(n\\,' + str(temp_frame_memory_total) + ')[disk_frames]' ])
+		commands.extend([ '-map', '[memory_frames]' ] + temp_frame_args + [ temp_frames_pattern ])
+		commands.extend([ '-map', '[disk_frames]' ] + temp_frame_args + [ '-start_number', str(temp_frame_memory_total + 1), temp_disk_frames_pattern ])
+		# an empty disk output fails the run although every frame fitted into memory
+		if run_ffmpeg(commands) or len(get_temp_frame_paths(target_path)) == temp_frame_memory_total and not get_temp_disk_frame_paths(target_path):
+			link_temp_disk_frames(target_path)
+			update_temp_frame_memory_usage(target_path)
+			return True
+		return False
+	commands.extend([ '-vf', temp_frames_filter ] + temp_frame_args + [ temp_frames_pattern ])
+	if run_ffmpeg(commands):
+		update_temp_frame_memory_usage(target_path)
+		update_temp_frame_statistics(get_temp_frame_paths(target_path), 'written')
+		return True
+	return False
 
 
 def merge_video(target_path : str, fps : float) -> bool:
@@ -79,25 +121,39 @@ def merge_video(target_path : str, fps : float) -> bool:
 		output_video_compression = round(51 - (faceswap.globals.output_video_quality * 0.5))
 		commands.extend([ '-cq', str(output_video_compression) ])
 	commands.extend([ '-pix_fmt', 'yuv420p', '-y', temp_output_video_path ])
-	return run_ffmpeg(commands)
+	if run_ffmpeg(commands):
+		update_temp_frame_statistics(get_temp_frame_paths(target_path), 'read')
+		return True
+	return False
 
 
-def restore_audio(target_path : str, output_path : str) -> bool:
+def extract_audio(target_path : str) -> bool:
 	fps = detect_fps(target_path)
 	trim_frame_start = faceswap.globals.trim_frame_start
 	trim_frame_end = faceswap.globals.trim_frame_end
-	temp_output_video_path = get_temp_output_video_path(target_path)
 	temp_output_audio_path = get_temp_output_audio_path(target_path)
-	extract_commands = [ '-hwaccel', 'auto', '-i', target_path ]
+	commands = []
+	# seek on the input side and copy the stream to avoid decoding
 	if trim_frame_start is not None:
 		start_time = trim_frame_start / fps
-		extract_commands.extend([ '-ss', str(start_time) ])
+		commands.extend([ '-ss', str(start_time) ])
 	if trim_frame_end is not None:
 		end_time = trim_frame_end / fps
-		extract_commands.extend([ '-to', str(end_time) ])
-	extract_commands.extend([ '-vn', '-y', temp_output_audio_path ])
-	merge_commands = [ '-hwaccel', 'auto', '-i', temp_output_video_path, '-i', temp_output_audio_path, '-y', output_path ]
-	return run_ffmpeg(extract_commands) and run_ffmpeg(merge_commands)
+		commands.extend([ '-to', str(end_time) ])
+	commands.extend([ '-i', target_path, '-vn', '-map', '0:a:0', '-c:a', 'copy', '-y', temp_output_audio_path ])
+	return run_ffmpeg(commands)
+
+
+def restore_audio(target_path : str, output_path : str) -> bool:
+	temp_output_video_path = get_temp_output_video_path(target_path)
+	temp_output_audio_path = get_temp_output_audio_path(target_path)
+	if not is_file(temp_output_audio_path) and not extract_audio(target_path):
+		return False
+	commands = [ '-i', temp_output_video_path, '-i', temp_output_audio_path, '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy', '-shortest' ]
+	if run_ffmpeg(commands + [ '-c:a', 'copy', '-y', output_path ]):
+		return True
+	# fall back to encode audio the output container cannot carry as is
+	return run_ffmpeg(commands + [ '-c:a', 'aac', '-y', output_path ])
 
 
 def get_temp_frame_paths(target_path : str) -> List[str]:
@@ -105,6 +161,11 @@ def get_temp_frame_paths(target_path : str) -> List[str]:
 	return glob.glob((os.path.join(glob.escape(temp_directory_path), '*.' + faceswap.globals.temp_frame_format)))
 
 
+def get_temp_disk_frame_paths(target_path : str) -> List[str]:
+	temp_disk_directory_path = get_temp_disk_directory_path(target_path)
+	return glob.glob(os.path.join(glob.escape(temp_disk_directory_path), '*.' + faceswap.globals.temp_frame_format))
+
+
 def get_temp_frames_pattern(target_path : str) -> str:
 	temp_directory_path = get_temp_directory_path(target_path)
 	return os.path.join(temp_directory_path, '%04d.' + faceswap.globals.temp_frame_format)
@@ -112,7 +173,137 @@ def get_temp_frames_pattern(target_path : str) -> str:
 
 def get_temp_directory_path(target_path : str) -> str:
 	target_name, _ = os.path.splitext(os.path.basename(target_path))
-	return os.path.join(TEMP_DIRECTORY_PATH, target_name)
+	if use_temp_memory():
+		return os.path.join(TEMP_MEMORY_DIRECTORY_PATH, get_job_id(), target_name)
+	return os.path.join(TEMP_DIRECTORY_PATH, get_job_id(), target_name)
+
+
+def get_temp_disk_directory_path(target_path : str) -> str:
+	target_name, _ = os.path.splitext(os.path.basename(target_path))
+	return os.path.join(TEMP_DIRECTORY_PATH, get_job_id(), target_name)
+
+
+def create_job_id() -> str:
+	# the owner pid lets later jobs detect workspaces left behind by dead processes
+	return str(os.getpid()) + '-' + uuid.uuid4().hex[:8]
+
+
+def get_job_id() -> str:
+	if not faceswap.globals.job_id:
+		faceswap.globals.job_id = create_job_id()
+	return faceswap.globals.job_id
+
+
+def is_stale_job_directory(job_directory_path : str) -> bool:
+	job_id = os.path.basename(job_directory_path)
+	owner_pid, _, _ = job_id.partition('-')
+	if not owner_pid.isdigit() or is_file(os.path.join(job_directory_path, TEMP_KEEP_NAME)):
+		return False
+	return not psutil.pid_exists(int(owner_pid))
+
+
+def clear_stale_temp() -> None:
+	for temp_directory_path in [ TEMP_DIRECTORY_PATH, TEMP_MEMORY_DIRECTORY_PATH ]:
+		if is_directory(temp_directory_path):
+			for job_directory_path in glob.glob(os.path.join(glob.escape(temp_directory_path), '*')):
+				if is_directory(job_directory_path) and is_stale_job_directory(job_directory_path):
+					shutil.rmtree(job_directory_path, ignore_errors = True)
+
+
+def get_temp_disk_frames_pattern(target_path : str) -> str:
+	temp_disk_directory_path = get_temp_disk_directory_path(target_path)
+	return os.path.join(temp_disk_directory_path, '%04d.' + faceswap.globals.temp_frame_format)
+
+
+def use_temp_memory() -> bool:
+	return bool(faceswap.globals.temp_frame_memory_limit) and is_directory(os.path.dirname(TEMP_MEMORY_DIRECTORY_PATH))
+
+
+def count_temp_frame_memory_total(target_path : str) -> int:
+	temp_frame_memory_limit = faceswap.globals.temp_frame_memory_limit * 1024 ** 2
+	width, height = detect_video_resolution(target_path) or (0, 0)
+	# estimate the upper bound, jpg frames are assumed to compress to a third
+	temp_frame_size = width * height * 3
+	if faceswap.globals.temp_frame_format == 'jpg':
+		temp_frame_size = temp_frame_size // 3
+	return temp_frame_memory_limit // max(temp_frame_size, 1)
+
+
+def estimate_temp_frame_total(target_path : str, fps : float) -> int:
+	video_frame_total = count_video_frame_total(target_path)
+	trim_frame_start = faceswap.globals.trim_frame_start or 0
+	trim_frame_end = faceswap.globals.trim_frame_end or video_frame_total
+	return math.ceil((trim_frame_end - trim_frame_start) * fps / (detect_fps(target_path) or fps)) + 1
+
+
+def link_temp_disk_frames(target_path : str) -> None:
+	temp_directory_path = get_temp_directory_path(target_path)
+	for temp_disk_frame_path in get_temp_disk_frame_paths(target_path):
+		os.symlink(temp_disk_frame_path, os.path.join(temp_directory_path, os.path.basename(temp_disk_frame_path)))
+	update_temp_frame_statistics(get_temp_frame_paths(target_path), 'written')
+
+
+def update_temp_frame_memory_usage(target_path : str) -> None:
+	temp_directory_path = get_temp_directory_path(target_path)
+	temp_frame_paths = [ temp_frame_path for temp_frame_path in get_temp_frame_paths(target_path) if get_temp_frame_tier(temp_frame_path) == 'memory' ]
+	with THREAD_LOCK:
+		TEMP_FRAME_MEMORY_USAGE[temp_directory_path] = sum(os.path.getsize(temp_frame_path) for temp_frame_path in temp_frame_paths)
+
+
+def get_temp_frame_tier(temp_frame_path : str) -> TempFrameTier:
+	if os.path.realpath(temp_frame_path).startswith(TEMP_MEMORY_DIRECTORY_PATH + os.sep):
+		return 'memory'
+	return 'disk'
+
+
+def update_temp_frame_statistics(temp_frame_paths : List[str], method : str) -> None:
+	for temp_frame_path in temp_frame_paths:
+		temp_frame_tier = get_temp_frame_tier(temp_frame_path)
+		temp_frame_size = os.path.getsize(temp_frame_path)
+		with THREAD_LOCK:
+			TEMP_FRAME_STATISTICS[temp_frame_tier][method] += temp_frame_size
+
+
+def get_temp_frame_statistics() -> Dict[TempFrameTier, Dict[str, int]]:
+	with THREAD_LOCK:
+		return { temp_frame_tier: dict(statistics) for temp_frame_tier, statistics in TEMP_FRAME_STATISTICS.items() }
+
+
+def read_temp_frame(temp_frame_path : str) -> Optional[Frame]:
+	with measure('decode'):
+		temp_frame = cv2.imread(temp_frame_path)
+	if temp_frame is not None:
+		update_temp_frame_statistics([ temp_frame_path ], 'read')
+	return temp_frame
+
+
+def write_temp_frame(temp_frame_path : str, temp_frame : Frame) -> bool:
+	is_memory_tier = get_temp_frame_tier(temp_frame_path) == 'memory'
+	previous_size = os.path.getsize(temp_frame_path) if is_memory_tier and is_file(temp_frame_path) else 0
+	with measure('encode'):
+		if not cv2.imwrite(temp_frame_path, temp_frame):
+			return False
+	update_temp_frame_statistics([ temp_frame_path ], 'written')
+	if is_memory_tier:
+		temp_directory_path = os.path.dirname(temp_frame_path)
+		with THREAD_LOCK:
+			TEMP_FRAME_MEMORY_USAGE[temp_directory_path] = TEMP_FRAME_MEMORY_USAGE.get(temp_directory_path, 0) + os.path.getsize(temp_frame_path) - previous_size
+			is_over_budget = TEMP_FRAME_MEMORY_USAGE[temp_directory_path] > faceswap.globals.temp_frame_memory_limit * 1024 ** 2
+		if is_over_budget:
+			spill_temp_frame(temp_frame_path)
+	return True
+
+
+def spill_temp_frame(temp_frame_path : str) -> None:
+	temp_directory_path = os.path.dirname(temp_frame_path)
+	temp_disk_frame_path = os.path.join(TEMP_DIRECTORY_PATH, os.path.relpath(temp_frame_path, TEMP_MEMORY_DIRECTORY_PATH))
+	temp_frame_size = os.path.getsize(temp_frame_path)
+	Path(os.path.dirname(temp_disk_frame_path)).mkdir(parents = True, exist_ok = True)
+	shutil.move(temp_frame_path, temp_disk_frame_path)
+	os.symlink(temp_disk_frame_path, temp_frame_path)
+	with THREAD_LOCK:
+		TEMP_FRAME_MEMORY_USAGE[temp_directory_path] -= temp_frame_size
+		TEMP_FRAME_STATISTICS['disk']['written'] += temp_frame_size
 
 
 def get_temp_output_video_path(target_path : str) -> str:
@@ -141,8 +332,12 @@ def normalize_output_path(source_path : Optional[str], target_path : Optional[st
 
 
 def create_temp(target_path : str) -> None:
+	clear_stale_temp()
 	temp_directory_path = get_temp_directory_path(target_path)
 	Path(temp_directory_path).mkdir(parents = True, exist_ok = True)
+	if use_temp_memory():
+		temp_disk_directory_path = get_temp_disk_directory_path(target_path)
+		Path(temp_disk_directory_path).mkdir(parents = True, exist_ok = True)
 
 
 def move_temp(target_path : str, output_path : str) -> None:
@@ -154,12 +349,18 @@ def move_temp(target_path : str, output_path : str) -> None:
 
 
 def clear_temp(target_path : str) -> None:
-	temp_directory_path = get_temp_directory_path(target_path)
-	parent_directory_path = os.path.dirname(temp_directory_path)
-	if not faceswap.globals.keep_temp and is_directory(temp_directory_path):
-		shutil.rmtree(temp_directory_path)
-	if os.path.exists(parent_directory_path) and not os.listdir(parent_directory_path):
-		os.rmdir(parent_directory_path)
+	temp_directory_paths = [ get_temp_directory_path(target_path), get_temp_disk_directory_path(target_path) ]
+	for temp_directory_path in dict.fromkeys(temp_directory_paths):
+		job_directory_path = os.path.dirname(temp_directory_path)
+		if faceswap.globals.keep_temp and is_directory(job_directory_path):
+			Path(job_directory_path, TEMP_KEEP_NAME).touch()
+		if not faceswap.globals.keep_temp and is_directory(temp_directory_path):
+			shutil.rmtree(temp_directory_path)
+			with THREAD_LOCK:
+				TEMP_FRAME_MEMORY_USAGE.pop(temp_directory_path, None)
+		# the shared parent stays as concurrent jobs may be creating their workspace in it
+		if os.path.exists(job_directory_path) and not os.listdir(job_directory_path):
+			os.rmdir(job_directory_path)
 
 
 def is_file(file_path : str) -> bool:
@@ -187,13 +388,146 @@ def is_video(video_path : str) -> bool:
 def conditional_download(download_directory_path : str, urls : List[str]) -> None:
 	if not os.path.exists(download_directory_path):
 		os.makedirs(download_directory_path)
-	for url in urls:
-		download_file_path = os.path.join(download_directory_path, os.path.basename(url))
-		if not os.path.exists(download_file_path):
-			request = urllib.request.urlopen(url) # type: ignore[attr-defined]
-			total = int(request.headers.get('Content-Length', 0))
-			with tqdm(total = total, desc = wording.get('downloading'), unit = 'B', unit_scale = True, unit_divisor = 1024) as progress:
-				urllib.request.urlretrieve(url, download_file_path, reporthook = lambda count, block_size, total_size: progress.update(block_size)) # type: ignore[attr-defined]
+	download_manifest = read_download_manifest(download_directory_path)
+	pending_urls = [ url for url in urls if not is_download_done(download_directory_path, url, download_manifest) ]
+	# downloads finished before a failure stay pinned in the manifest
+	try:
+		if pending_urls:
+			with tqdm(total = 0, desc = wording.get('downloading'), unit = 'B', unit_scale = True, unit_divisor = 1024) as progress:
+				with ThreadPoolExecutor(max_workers = min(len(pending_urls), DOWNLOAD_THREAD_COUNT)) as executor:
+					futures = [ executor.submit(download, download_directory_path, url, download_manifest, progress) for url in pending_urls ]
+					for future in as_completed(futures):
+						future.result()
+	finally:
+		write_download_manifest(download_directory_path, download_manifest)
+
+
+def is_download_done(download_directory_path : str, url : str, download_manifest : DownloadManifest) -> bool:
+	download_file_name = os.path.basename(url)
+	download_file_path = os.path.join(download_directory_path, download_file_name)
+	if not is_file(download_file_path):
+		return False
+	download_file_size = os.path.getsize(download_file_path)
+	if download_file_name in download_manifest:
+		if download_file_size == download_manifest[download_file_name]['size']:
+			return True
+	else:
+		# files from before the manifest are trusted when offline and pinned once they match the remote size
+		download_size = get_download_size(url)
+		if download_size is None:
+			return True
+		if download_file_size == download_size:
+			download_manifest[download_file_name] =\
+			{
+				'size': download_file_size,
+				'sha256': hash_file(download_file_path)
+			}
+			return True
+	# an incomplete file becomes the part to resume from
+	os.replace(download_file_path, download_file_path + '.part')
+	return False
+
+
+def download(download_directory_path : str, url : str, download_manifest : DownloadManifest, progress : Any) -> None:
+	download_file_name = os.path.basename(url)
+	download_file_path = os.path.join(download_directory_path, download_file_name)
+	download_part_path = download_file_path + '.part'
+	for _ in range(2):
+		download_part_size = os.path.getsize(download_part_path) if is_file(download_part_path) else 0
+		download_size = download_part(url, download_part_path, download_part_size, progress)
+		if verify_download(download_part_path, download_size, download_manifest.get(download_file_name)):
+			with THREAD_LOCK:
+				download_manifest[download_file_name] =\
+				{
+					'size': os.path.getsize(download_part_path),
+					'sha256': hash_file(download_part_path)
+				}
+			os.replace(download_part_path, download_file_path)
+			return
+		os.remove(download_part_path)
+	raise ValueError(wording.get('download_verification_failed').format(url = url))
+
+
+def download_part(url : str, download_part_path : str, download_part_size : int, progress : Any) -> int:
+	request = urllib.request.Request(url, headers = { 'Range': 'bytes=' + str(download_part_size) + '-' } if download_part_size else {})
+	try:
+		response = urllib.request.urlopen(request)
+	except urllib.error.HTTPError as exception:
+		if exception.code == 416:
+			# the part is only complete when it matches the remote size, otherwise it starts over
+			download_size = get_range_size(exception.headers.get('Content-Range')) or get_download_size(url)
+			if download_size == download_part_size:
+				return download_part_size
+			os.remove(download_part_path)
+			return download_part(url, download_part_path, 0, progress)
+		raise
+	with response:
+		if response.status != 206:
+			download_part_size = 0
+		download_size = download_part_size + int(response.headers.get('Content-Length', 0))
+		with THREAD_LOCK:
+			progress.total += download_size
+			progress.update(download_part_size)
+		with open(download_part_path, 'ab' if download_part_size else 'wb') as download_part_file:
+			while True:
+				chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+				if not chunk:
+					break
+				download_part_file.write(chunk)
+				progress.update(len(chunk))
+	return download_size
+
+
+def verify_download(download_part_path : str, download_size : int, download_manifest_entry : Optional[DownloadManifestEntry]) -> bool:
+	if download_size and os.path.getsize(download_part_path) != download_size:
+		return False
+	if download_manifest_entry:
+		return hash_file(download_part_path) == download_manifest_entry['sha256']
+	return True
+
+
+def get_range_size(content_range : Optional[str]) -> Optional[int]:
+	if content_range and content_range.startswith('bytes */') and content_range[8:].isdigit():
+		return int(content_range[8:])
+	return None
+
+
+def get_download_size(url : str) -> Optional[int]:
+	try:
+		with urllib.request.urlopen(urllib.request.Request(url, method = 'HEAD'), timeout = 10) as response:
+			return int(response.headers.get('Content-Length', 0)) or None
+	except (OSError, ValueError):
+		return None
+
+
+def hash_file(file_path : str) -> str:
+	file_hash = hashlib.sha256()
+	with open(file_path, 'rb') as file:
+		while True:
+			chunk = file.read(DOWNLOAD_CHUNK_SIZE)
+			if not chunk:
+				break
+			file_hash.update(chunk)
+	return file_hash.hexdigest()
+
+
+def read_download_manifest(download_directory_path : str) -> DownloadManifest:
+	download_manifest_path = os.path.join(download_directory_path, DOWNLOAD_MANIFEST_NAME)
+	if is_file(download_manifest_path):
+		try:
+			with open(download_manifest_path) as download_manifest_file:
+				return json.load(download_manifest_file)
+		except ValueError:
+			pass
+	return {}
+
+
+def write_download_manifest(download_directory_path : str, download_manifest : DownloadManifest) -> None:
+	download_manifest_path = os.path.join(download_directory_path, DOWNLOAD_MANIFEST_NAME)
+	if download_manifest != read_download_manifest(download_directory_path):
+		with open(download_manifest_path + '.part', 'w') as download_manifest_file:
+			json.dump(download_manifest, download_manifest_file, indent = 4, sort_keys = True)
+		os.replace(download_manifest_path + '.part', download_manifest_path)
 
 
 def resolve_relative_path(path : str) -> str:
@@ -212,6 +546,8 @@ def encode_execution_providers(execution_providers : List[str]) -> List[str]:
 
 
 def decode_execution_providers(execution_providers: List[str]) -> List[str]:
+	import onnxruntime
+
 	available_execution_providers = onnxruntime.get_available_providers()
 	encoded_execution_providers = encode_execution_providers(available_execution_providers)
 	return [ execution_provider for execution_provider, encoded_execution_provider in zip(available_execution_providers, encoded_execution_providers) if any(execution_provider in encoded_execution_provider for execution_provider in execution_providers) ]
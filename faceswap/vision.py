@@ -1,6 +1,8 @@
-from typing import Optional
+from typing import Optional, Tuple
+import os
 import cv2
 
+from faceswap.metrics import measure
 from faceswap.typing import Frame
 
 
@@ -23,6 +25,16 @@ def detect_fps(video_path : str) -> Optional[float]:
 	return None
 
 
+def detect_video_resolution(video_path : str) -> Optional[Tuple[int, int]]:
+	capture = cv2.VideoCapture(video_path)
+	if capture.isOpened():
+		width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+		height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+		capture.release()
+		return width, height
+	return None
+
+
 def count_video_frame_total(video_path : str) -> int:
 	capture = cv2.VideoCapture(video_path)
 	if capture.isOpened():
@@ -32,6 +44,29 @@ def count_video_frame_total(video_path : str) -> int:
 	return 0
 
 
+def read_image(image_path : str) -> Optional[Frame]:
+	if image_path:
+		with measure('decode'):
+			return cv2.imread(image_path)
+	return None
+
+
+def write_image(image_path : str, frame : Frame, image_quality : int = 100) -> bool:
+	with measure('encode'):
+		return encode_image(image_path, frame, image_quality)
+
+
+def encode_image(image_path : str, frame : Frame, image_quality : int) -> bool:
+	image_extension = os.path.splitext(image_path)[1].lower()
+	if image_extension in [ '.jpg', '.jpeg' ]:
+		return cv2.imwrite(image_path, frame, [ cv2.IMWRITE_JPEG_QUALITY, image_quality ])
+	if image_extension == '.png':
+		return cv2.imwrite(image_path, frame, [ cv2.IMWRITE_PNG_COMPRESSION, round(9 - image_quality * 0.09) ])
+	if image_extension == '.webp':
+		return cv2.imwrite(image_path, frame, [ cv2.IMWRITE_WEBP_QUALITY, max(image_quality, 1) ])
+	return cv2.imwrite(image_path, frame)
+
+
 def normalize_frame_color(frame : Frame) -> Frame:
 	return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
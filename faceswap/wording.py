@@ -1,5 +1,6 @@
 WORDING =\
 {
+	'execution_provider_not_supported': 'Execution provider {execution_provider} is not supported (choices: {choices})',
 	'python_not_supported': 'Python version is not supported, upgrade to {version} or higher',
 	'ffmpeg_not_installed': 'FFMpeg is not installed',
 	'onnxruntime_help': 'select the onnxruntime to be installed',
@@ -7,6 +8,9 @@ WORDING =\
 	'target_help': 'select a target image or video',
 	'output_help': 'specify the output file or directory',
 	'frame_processors_help': 'choose from the available frame processors (choices: {choices}, ...)',
+	'frame_enhancer_model_help': 'choose the model used by the frame enhancer',
+	'frame_enhancer_tile_size_help': 'specify the tile size used by the frame enhancer (tuned automatically when omitted)',
+	'frame_enhancer_tile_batch_size_help': 'specify the number of tiles the frame enhancer processes at once',
 	'ui_layouts_help': 'choose from the available ui layouts (choices: {choices}, ...)',
 	'keep_fps_help': 'preserve the frames per second (fps) of the target',
 	'keep_temp_help': 'retain temporary frames after processing',
@@ -22,33 +26,63 @@ WORDING =\
 	'trim_frame_end_help': 'specify the end frame for extraction',
 	'temp_frame_format_help': 'specify the image format used for frame extraction',
 	'temp_frame_quality_help': 'specify the image quality used for frame extraction',
+	'temp_frame_memory_limit_help': 'specify the maximum amount of ram used to keep temporary frames (in mb)',
 	'output_image_quality_help': 'specify the quality used for the output image',
 	'output_video_encoder_help': 'specify the encoder used for the output video',
 	'output_video_quality_help': 'specify the quality used for the output video',
 	'max_memory_help': 'specify the maximum amount of ram to be used (in gb)',
+	'model_memory_limit_help': 'specify the maximum amount of memory kept for resident models (in gb)',
+	'stream_latency_target_help': 'specify the capture to display latency the stream aims for (in ms)',
+	'stream_frame_budget_help': 'specify the processing time per frame the stream quality adapts to (in ms)',
+	'stream_concurrency_help': 'specify the number of webcam sessions served at the same time',
+	'stream_fake_camera_help': 'specify a video the webcam sessions play in a loop instead of the camera',
+	'trace_path_help': 'specify the file a chrome trace of the processing stages is written to',
 	'execution_providers_help': 'choose from the available execution providers (choices: {choices}, ...)',
 	'execution_thread_count_help': 'specify the number of execution threads',
 	'execution_queue_count_help': 'specify the number of execution queries',
 	'headless_help': 'run the program in headless mode',
+	'batch_manifest_help': 'run the jobs of a manifest (json lines or csv with source, target, output and per job options)',
+	'batch_sources_help': 'run a batch for every source matching the glob pattern',
+	'batch_targets_help': 'run a batch for every target matching the glob pattern',
+	'batch_parallelism_help': 'specify the number of batch jobs processed in parallel',
+	'batch_report_help': 'specify the file the batch report is written to (json lines)',
+	'batch_job_completed': 'Batch job {index} of {total} completed in {process_time} seconds',
+	'batch_job_failed': 'Batch job {index} of {total} failed: {error}',
+	'batch_completed': 'Batch completed with {completed} completed and {failed} failed jobs',
+	'server_help': 'run the program as a local job server',
+	'server_port_help': 'specify the port the local job server listens on',
+	'server_concurrency_help': 'specify the number of jobs the local job server processes in parallel',
+	'server_started': 'Server listening on http://{host}:{port}',
+	'server_job_not_found': 'Server job {job_id} not found',
+	'server_job_not_cancellable': 'Server job {job_id} is already finished',
+	'server_request_invalid': 'Server request is invalid',
+	'server_worker_exited': 'Server worker exited unexpectedly',
 	'creating_temp': 'Creating temporary resources',
 	'extracting_frames_fps': 'Extracting frames with {fps} FPS',
 	'processing': 'Processing',
 	'downloading': 'Downloading',
+	'download_verification_failed': 'Download of {url} could not be verified',
 	'temp_frames_not_found': 'Temporary frames not found',
-	'compressing_image': 'Compressing image',
-	'compressing_image_failed': 'Compressing image failed',
+	'writing_image': 'Writing image',
+	'writing_image_failed': 'Writing image failed',
 	'merging_video_fps': 'Merging video with {fps} FPS',
 	'merging_video_failed': 'Merging video failed',
 	'skipping_audio': 'Skipping audio',
 	'restoring_audio': 'Restoring audio',
 	'restoring_audio_failed': 'Restoring audio failed',
 	'clearing_temp': 'Clearing temporary resources',
+	'temp_frame_statistics': 'Temporary frames memory written {memory_written}MB read {memory_read}MB, disk written {disk_written}MB read {disk_read}MB',
 	'processing_image_succeed': 'Processing to image succeed',
 	'processing_image_failed': 'Processing to image failed',
+	'processing_images_succeed': 'Processing to images succeed with {processed} processed, {skipped} skipped and {failed} failed',
+	'image_pipeline_statistics': 'Processed {images_per_second} images per second with reader {reader}%, inference {inference}% and writer {writer}% utilization',
 	'processing_video_succeed': 'Processing to video succeed',
 	'processing_video_failed': 'Processing to video failed',
+	'building_timeline_failed': 'Building the timeline of {video_path} failed: {error}',
+	'job_already_running': 'Another job is running in this process',
+	'pre_load_failed': 'Loading the models failed: {error}',
 	'select_image_source': 'Select an image for source path',
-	'select_image_or_video_target': 'Select an image or video for target path',
+	'select_image_or_video_target': 'Select an image, video or image directory for target path',
 	'select_file_or_directory_output': 'Select an file or directory for output path',
 	'no_source_face_detected': 'No source face detected',
 	'frame_processor_not_loaded': 'Frame processor {frame_processor} could not be loaded',
@@ -58,21 +92,28 @@ WORDING =\
 	'start_button_label': 'START',
 	'stop_button_label': 'STOP',
 	'clear_button_label': 'CLEAR',
+	'cancel_button_label': 'CANCEL',
+	'restart_button_label': 'RESTART',
 	'benchmark_runs_checkbox_group_label': 'BENCHMARK RUNS',
 	'benchmark_results_dataframe_label': 'BENCHMARK RESULTS',
+	'benchmark_metrics_dataframe_label': 'BENCHMARK STAGES',
 	'benchmark_cycles_slider_label': 'BENCHMARK CYCLES',
+	'engine_health_textbox_label': 'ENGINE HEALTH',
 	'execution_providers_checkbox_group_label': 'EXECUTION PROVIDERS',
 	'execution_thread_count_slider_label': 'EXECUTION THREAD COUNT',
 	'execution_queue_count_slider_label': 'EXECUTION QUEUE COUNT',
 	'face_analyser_direction_dropdown_label': 'FACE ANALYSER DIRECTION',
 	'face_analyser_age_dropdown_label': 'FACE ANALYSER AGE',
 	'face_analyser_gender_dropdown_label': 'FACE ANALYSER GENDER',
+	'reference_frame_suggestions_gallery_label': 'REFERENCE FRAME SUGGESTIONS',
 	'reference_face_gallery_label': 'REFERENCE FACE',
 	'face_recognition_dropdown_label': 'FACE RECOGNITION',
 	'reference_face_distance_slider_label': 'REFERENCE FACE DISTANCE',
 	'max_memory_slider_label': 'MAX MEMORY',
+	'model_memory_limit_slider_label': 'MODEL MEMORY LIMIT',
 	'output_image_or_video_label': 'OUTPUT',
 	'output_path_textbox_label': 'OUTPUT PATH',
+	'output_progress_textbox_label': 'OUTPUT PROGRESS',
 	'output_image_quality_slider_label': 'OUTPUT IMAGE QUALITY',
 	'output_video_encoder_dropdown_label': 'OUTPUT VIDEO ENCODER',
 	'output_video_quality_slider_label': 'OUTPUT VIDEO QUALITY',
@@ -90,6 +131,23 @@ WORDING =\
 	'target_file_label': 'TARGET',
 	'webcam_image_label': 'WEBCAM',
 	'webcam_mode_radio_label': 'WEBCAM MODE',
+	'webcam_latency_target_slider_label': 'WEBCAM LATENCY TARGET',
+	'webcam_statistics_textbox_label': 'WEBCAM STATISTICS',
+	'stream_quality': 'Stream quality level {level} with scale {scale}, detection interval {detection_interval} and optional processors {optional_processors} at {fps} FPS',
+	'metrics_summary': 'Stage {stage} took {p50} ms p50, {p95} ms p95 and {p99} ms p99 over {count} calls',
+	'writing_trace_succeed': 'Trace written to {trace_path}',
+	'writing_trace_failed': 'Writing trace to {trace_path} failed',
+	'engine_health': 'Engine {status} with pid {pid}, {pending} pending requests, {latency} ms last request and {restarts} restarts',
+	'output_job_queued': 'Output waits for the previous one',
+	'output_job_progress': '{stage} {progress_count}/{progress_total} frames at {fps} fps, {eta} seconds left',
+	'output_job_completed': 'Output completed in {process_time} seconds',
+	'output_job_cancelled': 'Output cancelled',
+	'output_job_failed': 'Output failed',
+	'output_job_failed_error': 'Output failed: {error}',
+	'stream_metrics': '{stage} {p50}/{p95} ms',
+	'stream_writer_statistics': 'Stream writer {written} written and {dropped} dropped frames',
+	'multistream_step': 'Multi stream with {stream_total} streams processed {fps} FPS at {latency_p50}ms p50 and {latency_p95}ms p95 latency with {expired} expired frames',
+	'stream_statistics': 'Stream latency {latency}ms (target {latency_target}ms), {processed} processed, {dropped} dropped and {late} late frames',
 	'point': '.',
 	'comma': ',',
 	'colon': ':',
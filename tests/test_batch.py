@@ -0,0 +1,39 @@
+from pathlib import Path
+import numpy
+import pytest
+
+import faceswap.globals
+from faceswap import model_manager
+from faceswap.batch import create_batch_job_args, run_batch_job
+from faceswap.processors.frame.modules import face_swapper
+from faceswap.vision import write_image
+
+
+@pytest.fixture(scope = 'function', autouse = True)
+def before_each(monkeypatch : pytest.MonkeyPatch) -> None:
+	# the batch jobs apply their args to the globals, monkeypatch restores them afterwards
+	for global_name, global_value in list(vars(faceswap.globals).items()):
+		if not global_name.startswith('_'):
+			monkeypatch.setattr(faceswap.globals, global_name, global_value)
+	monkeypatch.setattr(face_swapper, 'pre_check', lambda: True)
+	monkeypatch.setattr(face_swapper, 'pre_process', lambda mode: True)
+	monkeypatch.setattr(face_swapper, 'get_frame_processor', lambda: model_manager.get_model(face_swapper.NAME, 'invalid', lambda: 'model'))
+	monkeypatch.setattr(face_swapper, 'process_image', lambda source_path, target_frame: face_swapper.get_frame_processor() and target_frame)
+	model_manager.clear_models()
+
+
+def test_create_batch_job_args() -> None:
+	assert create_batch_job_args({ 'source': 'my source.jpg', 'frame_processors': [ 'face_swapper', 'face_enhancer' ], 'keep_fps': 'true', 'skip_audio': False }) == [ '--source', 'my source.jpg', '--frame-processors', 'face_swapper', 'face_enhancer', '--keep-fps' ]
+
+
+def test_run_batch_job_keeps_models(tmp_path : Path) -> None:
+	for index in range(2):
+		write_image(str(tmp_path / ('target-' + str(index) + '.jpg')), numpy.zeros((64, 64, 3), dtype = numpy.uint8))
+	base_args = [ '--headless', '--frame-processors', 'face_swapper' ]
+	statistics = model_manager.get_model_statistics()
+	batch_job_reports = [ run_batch_job(base_args, { 'target': str(tmp_path / ('target-' + str(index) + '.jpg')), 'output': str(tmp_path / ('output-' + str(index) + '.jpg')) }, index + 1) for index in range(2) ]
+
+	assert [ batch_job_report['status'] for batch_job_report in batch_job_reports ] == [ 'completed', 'completed' ]
+	assert [ batch_job_report['index'] for batch_job_report in batch_job_reports ] == [ 1, 2 ]
+	assert model_manager.get_model_statistics()['loads'] == statistics['loads'] + 1
+	assert model_manager.get_model_statistics()['hits'] >= statistics['hits'] + 1
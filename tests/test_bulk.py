@@ -0,0 +1,45 @@
+from pathlib import Path
+from typing import Any
+import numpy
+import pytest
+
+import faceswap.globals
+from faceswap.bulk import process_image_directory
+from faceswap.vision import write_image
+
+
+@pytest.fixture(scope = 'module', autouse = True)
+def before_all() -> Any:
+	global_names = [ 'frame_processors', 'face_recognition', 'execution_thread_count', 'output_image_quality' ]
+	global_values = { global_name: getattr(faceswap.globals, global_name) for global_name in global_names }
+	faceswap.globals.frame_processors = []
+	faceswap.globals.face_recognition = 'reference'
+	faceswap.globals.execution_thread_count = 2
+	faceswap.globals.output_image_quality = 80
+	yield
+	for global_name, global_value in global_values.items():
+		setattr(faceswap.globals, global_name, global_value)
+
+
+def test_process_image_directory(tmp_path : Path) -> None:
+	target_directory_path = tmp_path / 'target'
+	output_directory_path = tmp_path / 'output'
+	target_directory_path.mkdir()
+	output_directory_path.mkdir()
+	for index in range(10):
+		write_image(str(target_directory_path / ('image-' + str(index) + '.jpg')), numpy.full((240, 320, 3), index * 20, dtype = numpy.uint8))
+	(target_directory_path / 'broken.jpg').write_bytes(b'broken')
+	(target_directory_path / 'notes.txt').write_text('notes')
+	image_pipeline_statistics = process_image_directory(None, str(target_directory_path), str(output_directory_path))
+
+	assert image_pipeline_statistics['processed'] == 10
+	assert image_pipeline_statistics['failed'] == 1
+	assert image_pipeline_statistics['skipped'] == 0
+	assert image_pipeline_statistics['images_per_second'] > 0
+	assert set(image_pipeline_statistics['utilization'].keys()) == { 'reader', 'inference', 'writer' }
+	assert len(list(output_directory_path.glob('image-*.jpg'))) == 10
+
+	image_pipeline_statistics = process_image_directory(None, str(target_directory_path), str(output_directory_path))
+
+	assert image_pipeline_statistics['processed'] == 0
+	assert image_pipeline_statistics['skipped'] == 10
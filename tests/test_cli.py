@@ -1,3 +1,4 @@
+import json
 import subprocess
 import sys
 import pytest
@@ -30,3 +31,29 @@ def test_image_to_video() -> None:
 
 	assert run.returncode == 0
 	assert wording.get('processing_video_succeed') in run.stdout.decode()
+
+
+def test_startup_import_time() -> None:
+	commands = [ sys.executable, '-X', 'importtime', 'run.py', '--version' ]
+	run = subprocess.run(commands, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+	import_times = [ line.split('|') for line in run.stderr.decode().splitlines() if line.startswith('import time:') and not line.endswith('package') ]
+	import_names = [ import_name.strip() for _, _, import_name in import_times ]
+
+	assert run.returncode == 0
+	assert not set(import_names) & { 'tensorflow', 'torch', 'gradio', 'onnxruntime', 'insightface', 'basicsr', 'gfpgan', 'realesrgan' }
+	assert sum(int(self_time.split(':')[1]) for self_time, _, _ in import_times) < 1000000
+
+
+def test_batch_manifest() -> None:
+	with open('.assets/examples/manifest.jsonl', 'w') as manifest_file:
+		manifest_file.write(json.dumps({ 'source': '.assets/examples/source.jpg', 'target': '.assets/examples/target-1080p.jpg', 'output': '.assets/examples/batch-image.jpg' }) + '\n')
+		manifest_file.write(json.dumps({ 'source': '.assets/examples/source.jpg', 'target': '.assets/examples/invalid.jpg', 'output': '.assets/examples/batch-invalid.jpg' }) + '\n')
+		manifest_file.write(json.dumps({ 'source': '.assets/examples/source.jpg', 'target': '.assets/examples/target-1080p.mp4', 'output': '.assets/examples/batch-video.mp4', 'trim_frame_end': 10 }) + '\n')
+	commands = [ sys.executable, 'run.py', '--batch-manifest', '.assets/examples/manifest.jsonl', '--batch-report', '.assets/examples/report.jsonl', '--headless' ]
+	run = subprocess.run(commands, stdout = subprocess.PIPE)
+
+	assert run.returncode == 0
+	assert wording.get('batch_completed').format(completed = 2, failed = 1) in run.stdout.decode()
+	with open('.assets/examples/report.jsonl') as report_file:
+		batch_job_reports = [ json.loads(line) for line in report_file ]
+	assert [ batch_job_report['status'] for batch_job_report in batch_job_reports ] == [ 'completed', 'failed', 'completed' ]
@@ -0,0 +1,49 @@
+import numpy
+import pytest
+
+from faceswap.frame_cache import FRAME_CACHE, get_cached_video_frame, can_read_forward, clear_frame_cache
+from faceswap.utilities import conditional_download
+from faceswap.vision import get_video_frame
+
+
+@pytest.fixture(scope = 'module', autouse = True)
+def before_all() -> None:
+	conditional_download('.assets/examples',
+	[
+		'https://github.com/faceswap/faceswap-assets/releases/download/examples/target-240p.mp4'
+	])
+
+
+@pytest.fixture(scope = 'function', autouse = True)
+def before_each() -> None:
+	clear_frame_cache()
+
+
+def test_get_cached_video_frame() -> None:
+	for frame_number in [ 0, 10, 11, 50, 5, 200, 10 ]:
+		assert numpy.array_equal(get_cached_video_frame('.assets/examples/target-240p.mp4', frame_number), get_video_frame('.assets/examples/target-240p.mp4', frame_number))
+	assert get_cached_video_frame('invalid', 10) is None
+
+
+def test_get_cached_video_frame_resized() -> None:
+	cached_frame = get_cached_video_frame('.assets/examples/target-240p.mp4', 10, 120)
+	cached_frame[:] = 0
+
+	assert cached_frame.shape[0] == 120
+	assert get_cached_video_frame('.assets/examples/target-240p.mp4', 10, 120).any()
+	assert len(FRAME_CACHE) == 1
+
+
+def test_can_read_forward() -> None:
+	video_decoder =\
+	{
+		'position': 10,
+		'keyframes': None
+	}
+
+	assert can_read_forward(video_decoder, 20) is True
+	assert can_read_forward(video_decoder, 100) is False
+	assert can_read_forward(video_decoder, 5) is False
+	video_decoder['keyframes'] = [ 0, 250 ]
+	assert can_read_forward(video_decoder, 200) is True
+	assert can_read_forward(video_decoder, 260) is False
@@ -0,0 +1,46 @@
+from pathlib import Path
+from queue import Queue
+from typing import Any
+import threading
+import numpy
+import pytest
+
+import faceswap.globals
+import faceswap.processors.frame.core as frame_processors
+from faceswap import core, model_manager
+from faceswap.processors.frame.modules import face_swapper
+from faceswap.uis import jobs
+from faceswap.vision import write_image
+
+
+def test_run_worker_keeps_models(monkeypatch : pytest.MonkeyPatch, tmp_path : Path) -> None:
+	# the worker runs in this process to count its model loads
+	for global_name, global_value in list(vars(faceswap.globals).items()):
+		if not global_name.startswith('_'):
+			monkeypatch.setattr(faceswap.globals, global_name, global_value)
+	monkeypatch.setattr(core, 'STATUS_LISTENERS', [])
+	monkeypatch.setattr(frame_processors, 'PROGRESS_LISTENERS', [])
+	monkeypatch.setattr(face_swapper, 'pre_check', lambda: True)
+	monkeypatch.setattr(face_swapper, 'pre_process', lambda mode: True)
+	monkeypatch.setattr(face_swapper, 'get_frame_processor', lambda: model_manager.get_model(face_swapper.NAME, 'invalid', lambda: 'model'))
+	monkeypatch.setattr(face_swapper, 'process_image', lambda source_path, target_frame: face_swapper.get_frame_processor() and target_frame)
+	core.apply_args(core.create_program().parse_args([ '--headless', '--frame-processors', 'face_swapper' ]))
+	model_manager.clear_models()
+	task_queue : Queue[Any] = Queue()
+	event_queue : Queue[Any] = Queue()
+	for index in range(2):
+		write_image(str(tmp_path / ('target-' + str(index) + '.jpg')), numpy.zeros((64, 64, 3), dtype = numpy.uint8))
+		globals_snapshot = jobs.create_globals_snapshot()
+		globals_snapshot['target_path'] = str(tmp_path / ('target-' + str(index) + '.jpg'))
+		globals_snapshot['output_path'] = str(tmp_path / ('output-' + str(index) + '.jpg'))
+		task_queue.put(('job-' + str(index), globals_snapshot))
+	task_queue.put(None)
+	statistics = model_manager.get_model_statistics()
+	worker_thread = threading.Thread(target = jobs.run_worker, args = (task_queue, event_queue))
+	worker_thread.start()
+	worker_thread.join(timeout = 60)
+	finished_events = [ event_value for event_name, _, event_value in list(event_queue.queue) if event_name == 'finished' ]
+
+	assert [ job_status for job_status, _ in finished_events ] == [ 'completed', 'completed' ]
+	assert model_manager.get_model_statistics()['loads'] == statistics['loads'] + 1
+	assert model_manager.get_model_statistics()['hits'] >= statistics['hits'] + 1
@@ -0,0 +1,51 @@
+import json
+import tempfile
+import time
+import pytest
+
+import faceswap.globals
+from faceswap.metrics import measure, record_metric, get_metric_percentiles, get_metrics_summary, clear_metrics, write_trace
+
+
+@pytest.fixture(scope = 'function', autouse = True)
+def before_each() -> None:
+	faceswap.globals.trace_path = None
+	clear_metrics()
+
+
+def test_get_metric_percentiles() -> None:
+	for duration in range(1, 1001):
+		record_metric('swap', duration * 1000)
+	metric_percentiles = get_metric_percentiles('swap')
+
+	assert metric_percentiles['count'] == 1000
+	assert metric_percentiles['p50'] == pytest.approx(500, rel = 0.02)
+	assert metric_percentiles['p95'] == pytest.approx(950, rel = 0.02)
+	assert metric_percentiles['p99'] == pytest.approx(990, rel = 0.02)
+	assert get_metric_percentiles('detection')['count'] == 0
+
+
+def test_get_metrics_summary() -> None:
+	with measure('decode'):
+		time.sleep(0.01)
+	with measure('encode'):
+		pass
+	metrics_summary = get_metrics_summary()
+
+	assert [ metric_summary[0] for metric_summary in metrics_summary ] == [ 'decode', 'encode' ]
+	assert metrics_summary[0][2] >= 10
+
+
+def test_write_trace() -> None:
+	trace_path = tempfile.mktemp(suffix = '.json')
+	with measure('swap'):
+		pass
+	faceswap.globals.trace_path = trace_path
+	with measure('enhance'):
+		pass
+
+	assert write_trace(trace_path) is True
+	with open(trace_path) as trace_file:
+		trace_events = json.load(trace_file)['traceEvents']
+	assert [ trace_event['name'] for trace_event in trace_events ] == [ 'enhance' ]
+	assert trace_events[0]['ph'] == 'X'
@@ -0,0 +1,59 @@
+from pathlib import Path
+import numpy
+import pytest
+
+import faceswap.globals
+from faceswap import core, model_manager
+from faceswap.processors.frame.modules import face_swapper
+from faceswap.vision import write_image
+
+
+@pytest.fixture(scope = 'function', autouse = True)
+def before_each() -> None:
+	faceswap.globals.model_memory_limit = None
+	model_manager.clear_models()
+
+
+def test_get_model() -> None:
+	statistics = model_manager.get_model_statistics()
+
+	assert model_manager.get_model('test', 'invalid', lambda: 'model') == 'model'
+	assert model_manager.get_model('test', 'invalid', lambda: 'other') == 'model'
+	assert model_manager.get_model_statistics()['loads'] == statistics['loads'] + 1
+	assert model_manager.get_model_statistics()['hits'] == statistics['hits'] + 1
+
+
+def test_evict_models(tmp_path : Path) -> None:
+	model_path = tmp_path / 'model.bin'
+	with open(model_path, 'wb') as model_file:
+		model_file.truncate(512 * 1024 ** 2)
+	faceswap.globals.model_memory_limit = 1
+	statistics = model_manager.get_model_statistics()
+	model_manager.get_model('first', str(model_path), lambda: 'first')
+	model_manager.get_model('second', str(model_path), lambda: 'second')
+	model_manager.get_model('first', str(model_path), lambda: 'first')
+	model_manager.get_model('third', str(model_path), lambda: 'third')
+
+	assert model_manager.has_model('first') is True
+	assert model_manager.has_model('second') is False
+	assert model_manager.has_model('third') is True
+	assert model_manager.get_model_statistics()['evictions'] == statistics['evictions'] + 1
+
+
+def test_conditional_process_keeps_models(monkeypatch : pytest.MonkeyPatch, tmp_path : Path) -> None:
+	target_path = str(tmp_path / 'target.jpg')
+	write_image(target_path, numpy.zeros((64, 64, 3), dtype = numpy.uint8))
+	monkeypatch.setattr(faceswap.globals, 'frame_processors', [ 'face_swapper' ])
+	monkeypatch.setattr(faceswap.globals, 'target_path', target_path)
+	monkeypatch.setattr(faceswap.globals, 'output_path', str(tmp_path / 'output.jpg'))
+	monkeypatch.setattr(faceswap.globals, 'output_image_quality', 80)
+	monkeypatch.setattr(face_swapper, 'pre_process', lambda mode: True)
+	monkeypatch.setattr(face_swapper, 'get_frame_processor', lambda: model_manager.get_model(face_swapper.NAME, 'invalid', lambda: 'model'))
+	monkeypatch.setattr(face_swapper, 'process_image', lambda source_path, target_frame: face_swapper.get_frame_processor() and target_frame)
+	statistics = model_manager.get_model_statistics()
+	core.conditional_process()
+	core.conditional_process()
+
+	assert model_manager.get_model_statistics()['loads'] == statistics['loads'] + 1
+	assert model_manager.get_model_statistics()['hits'] >= statistics['hits'] + 1
+	assert model_manager.has_model(face_swapper.NAME) is True
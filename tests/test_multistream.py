@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import time
+import numpy
+import pytest
+
+import faceswap.globals
+import faceswap.face_analyser
+from faceswap.face_analyser import get_batch_faces
+from faceswap.multistream import start_multistream, stop_multistream, add_stream, remove_stream, select_sessions, get_multistream_steps
+from faceswap.stream import FakeCapture, read_stream_pipeline, get_stream_statistics
+from faceswap.utilities import conditional_download
+
+
+@pytest.fixture(scope = 'module', autouse = True)
+def before_all() -> None:
+	faceswap.globals.stream_latency_target = 150
+	faceswap.globals.stream_frame_budget = 40
+	conditional_download('.assets/examples',
+	[
+		'https://github.com/faceswap/faceswap-assets/releases/download/examples/target-240p.mp4'
+	])
+
+
+def test_fake_capture() -> None:
+	capture = FakeCapture('.assets/examples/target-240p.mp4', 50)
+	start_time = time.perf_counter()
+	for _ in range(10):
+		has_frame, temp_frame = capture.read()
+		assert has_frame
+	capture.release()
+
+	assert 0.15 < time.perf_counter() - start_time < 1
+	assert temp_frame.shape[0] == 240
+
+
+def test_multistream() -> None:
+	frame_processors_modules =\
+	[
+		SimpleNamespace(CAPABILITIES = { 'needs_faces': False, 'needs_source_face': True, 'optional': False }, process_frame = lambda source_face, reference_face, temp_frame: time.sleep(0.005) or temp_frame + 1)
+	]
+	multistream = start_multistream()
+	stream_sessions = []
+	for _ in range(3):
+		stream_sessions.append(add_stream(multistream, FakeCapture('.assets/examples/target-240p.mp4', 30), frame_processors_modules, None))
+		time.sleep(1)
+	for stream_session in stream_sessions:
+		frame_number, temp_frame = read_stream_pipeline(stream_session, 0)
+		assert frame_number > 0
+		assert temp_frame.shape[0] == 240
+	stop_multistream(multistream)
+	multistream_steps = get_multistream_steps(multistream)
+
+	assert [ multistream_step['stream_total'] for multistream_step in multistream_steps ] == [ 1, 2, 3 ]
+	assert multistream_steps[2]['fps'] > multistream_steps[0]['fps']
+	assert all(0 < multistream_step['latency_p50'] <= multistream_step['latency_p95'] < 1000 for multistream_step in multistream_steps)
+	assert all(get_stream_statistics(stream_session)['processed'] > 0 for stream_session in stream_sessions)
+	assert remove_stream(multistream, stream_sessions[0]) is None
+
+
+def test_select_sessions() -> None:
+	multistream =\
+	{
+		'sessions':
+		{
+			'light': { 'capture_slot': { 'frame_number': 1 }, 'frame_number': 0, 'deficit': 0.0 },
+			'heavy': { 'capture_slot': { 'frame_number': 1 }, 'frame_number': 0, 'deficit': 0.0 },
+			'idle': { 'capture_slot': { 'frame_number': 0 }, 'frame_number': 0, 'deficit': 0.0 }
+		},
+		'rotation': 0
+	}
+	served = { 'light': 0, 'heavy': 0 }
+	for _ in range(30):
+		for stream_session in select_sessions(multistream):
+			stream_id = 'light' if stream_session is multistream['sessions']['light'] else 'heavy'
+			served[stream_id] += 1
+			# the heavy stream takes three times the share of a round
+			stream_session['deficit'] -= 75 * 3 if stream_id == 'heavy' else 10
+
+	assert served['light'] == 30
+	assert 8 <= served['heavy'] <= 12
+
+
+def test_get_batch_faces(monkeypatch : pytest.MonkeyPatch) -> None:
+	# one face in the center of every mosaic cell
+	monkeypatch.setattr(faceswap.face_analyser, 'get_face_analyser', lambda: SimpleNamespace(models = {}))
+	monkeypatch.setattr(faceswap.face_analyser, 'detect_faces', lambda frame, detector_size: (numpy.array([ [ 120, 40, 200, 120, 0.9 ], [ 440, 40, 520, 120, 0.8 ], [ 120, 360, 200, 440, 0.7 ] ]), None))
+	frames = [ numpy.zeros((240, 640, 3), dtype = numpy.uint8) for _ in range(4) ]
+	previous_faces = [ [ { 'bbox': numpy.array([ 0, 0, 80, 80 ]) } ] ] * 3 + [ [ { 'bbox': numpy.array([ 0, 0, 40, 40 ]) } ] ]
+	batch_faces = get_batch_faces(frames, previous_faces)
+
+	# the small faces of the last frame are detected at full size, apart from the mosaic
+	assert [ len(faces) for faces in batch_faces ] == [ 1, 1, 1, 3 ]
+	assert batch_faces[1][0]['bbox'].tolist() == [ 240, 80, 400, 240 ]
+	assert batch_faces[2][0]['det_score'] == 0.7
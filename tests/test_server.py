@@ -0,0 +1,107 @@
+from pathlib import Path
+from queue import Queue
+from typing import Any, Optional, Tuple
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy
+import pytest
+
+import faceswap.globals
+import faceswap.processors.frame.core as frame_processors
+from faceswap import core, model_manager, server
+from faceswap.processors.frame.modules import face_swapper
+from faceswap.vision import write_image
+
+
+@pytest.fixture(scope = 'module', autouse = True)
+def before_all() -> Any:
+	server.start('127.0.0.1', 0, 1, [ '--headless' ])
+	yield
+	server.stop()
+
+
+def request(method : str, path : str, body : Optional[Any] = None) -> Tuple[int, Any]:
+	host, port = server.HTTP_SERVER.server_address[:2]
+	data = json.dumps(body).encode() if body is not None else None
+	try:
+		with urllib.request.urlopen(urllib.request.Request('http://' + host + ':' + str(port) + path, data = data, method = method)) as response:
+			return response.status, json.loads(response.read())
+	except urllib.error.HTTPError as exception:
+		return exception.code, json.loads(exception.read())
+
+
+def wait_for_job(job_id : str) -> Any:
+	for _ in range(600):
+		_, server_job = request('GET', '/jobs/' + job_id)
+		if server_job['status'] not in [ 'queued', 'running' ]:
+			return server_job
+		time.sleep(0.1)
+	return server_job
+
+
+def test_health() -> None:
+	status_code, health = request('GET', '/health')
+
+	assert status_code == 200
+	assert health['workers'] == 1
+
+
+def test_submit_and_cancel_job() -> None:
+	_, first_job = request('POST', '/jobs', { 'source': '.assets/examples/source.jpg', 'target': '.assets/examples/invalid.jpg' })
+	_, second_job = request('POST', '/jobs', { 'source': '.assets/examples/source.jpg', 'target': '.assets/examples/invalid.jpg' })
+
+	assert first_job['status'] == 'running'
+	assert second_job['status'] == 'queued'
+	assert request('DELETE', '/jobs/' + second_job['job_id'])[1]['status'] == 'cancelled'
+	assert wait_for_job(first_job['job_id'])['status'] == 'failed'
+	assert request('DELETE', '/jobs/' + first_job['job_id'])[0] == 409
+	assert request('GET', '/jobs/' + second_job['job_id'])[1]['status'] == 'cancelled'
+
+
+def test_invalid_request() -> None:
+	assert request('GET', '/jobs/invalid')[0] == 404
+	assert request('POST', '/jobs', [ 'invalid' ])[0] == 400
+	assert request('DELETE', '/jobs/invalid')[0] == 404
+
+
+def test_prune_jobs(monkeypatch : pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(server, 'SERVER_JOB_LIMIT', 2)
+	monkeypatch.setattr(server, 'SERVER_JOBS', {})
+	for job_id, job_status in [ ('first', 'completed'), ('second', 'running'), ('third', 'failed'), ('fourth', 'completed') ]:
+		server.SERVER_JOBS[job_id] = { 'job_id': job_id, 'status': job_status } # type: ignore[typeddict-item]
+	server.prune_jobs()
+
+	assert list(server.SERVER_JOBS) == [ 'second', 'fourth' ]
+
+
+def test_run_worker_keeps_models(monkeypatch : pytest.MonkeyPatch, tmp_path : Path) -> None:
+	# the worker runs in this process to count its model loads
+	for global_name, global_value in list(vars(faceswap.globals).items()):
+		if not global_name.startswith('_'):
+			monkeypatch.setattr(faceswap.globals, global_name, global_value)
+	monkeypatch.setattr(core, 'STATUS_LISTENERS', [])
+	monkeypatch.setattr(frame_processors, 'PROGRESS_LISTENERS', [])
+	monkeypatch.setattr(core, 'pre_load_face_analyser', lambda: None)
+	monkeypatch.setattr(face_swapper, 'pre_check', lambda: True)
+	monkeypatch.setattr(face_swapper, 'pre_process', lambda mode: True)
+	monkeypatch.setattr(face_swapper, 'get_frame_processor', lambda: model_manager.get_model(face_swapper.NAME, 'invalid', lambda: 'model'))
+	monkeypatch.setattr(face_swapper, 'process_image', lambda source_path, target_frame: face_swapper.get_frame_processor() and target_frame)
+	model_manager.clear_models()
+	task_queue : Queue[Any] = Queue()
+	event_queue : Queue[Any] = Queue()
+	for index in range(2):
+		write_image(str(tmp_path / ('target-' + str(index) + '.jpg')), numpy.zeros((64, 64, 3), dtype = numpy.uint8))
+		task_queue.put(('job-' + str(index), { 'target': str(tmp_path / ('target-' + str(index) + '.jpg')), 'output': str(tmp_path / ('output-' + str(index) + '.jpg')) }))
+	task_queue.put(None)
+	statistics = model_manager.get_model_statistics()
+	worker_thread = threading.Thread(target = server.run_worker, args = ([ '--headless', '--frame-processors', 'face_swapper' ], task_queue, event_queue))
+	worker_thread.start()
+	worker_thread.join(timeout = 60)
+	batch_job_reports = [ event_value for event_name, _, event_value in list(event_queue.queue) if event_name == 'report' ]
+
+	assert [ batch_job_report['status'] for batch_job_report in batch_job_reports ] == [ 'completed', 'completed' ]
+	assert model_manager.get_model_statistics()['loads'] == statistics['loads'] + 1
+	assert model_manager.get_model_statistics()['hits'] >= statistics['hits'] + 2
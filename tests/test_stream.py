@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+import subprocess
+import sys
+import time
+import cv2
+import numpy
+import pytest
+
+import faceswap.globals
+from faceswap.stream import STREAM_QUALITY_LEVELS, create_quality_controller, update_quality_controller, process_quality_frame, get_stream_quality, start_stream_writer, write_stream_frame, close_stream_writer, get_stream_writer_statistics, create_frame_slot, put_frame_slot, get_frame_slot, close_frame_slot, start_stream_pipeline, read_stream_pipeline, stop_stream_pipeline, get_stream_statistics
+from faceswap.utilities import conditional_download
+
+
+@pytest.fixture(scope = 'module', autouse = True)
+def before_all() -> None:
+	faceswap.globals.stream_latency_target = 150
+	faceswap.globals.stream_frame_budget = 40
+	conditional_download('.assets/examples',
+	[
+		'https://github.com/faceswap/faceswap-assets/releases/download/examples/target-240p.mp4'
+	])
+
+
+def test_frame_slot() -> None:
+	frame_slot = create_frame_slot()
+	put_frame_slot(frame_slot, 'first', 1.0)
+	put_frame_slot(frame_slot, 'second', 2.0)
+
+	assert get_frame_slot(frame_slot, 0) == (2, 2.0, 'second')
+	assert get_frame_slot(frame_slot, 2, 0.01) is None
+	close_frame_slot(frame_slot)
+	assert get_frame_slot(frame_slot, 2) is None
+
+
+def test_stream_pipeline_drops_stale_frames() -> None:
+	capture = cv2.VideoCapture('.assets/examples/target-240p.mp4')
+	stream_pipeline = start_stream_pipeline(capture, lambda temp_frame: time.sleep(0.05) or temp_frame)
+	frame_number = 0
+	output_frame_numbers = []
+	while True:
+		stream_pipeline_value = read_stream_pipeline(stream_pipeline, frame_number)
+		if stream_pipeline_value is None:
+			break
+		frame_number, _ = stream_pipeline_value
+		output_frame_numbers.append(frame_number)
+	stop_stream_pipeline(stream_pipeline)
+	stream_statistics = get_stream_statistics(stream_pipeline)
+
+	assert output_frame_numbers == sorted(set(output_frame_numbers))
+	assert stream_statistics['dropped'] > 0
+	assert stream_statistics['processed'] + stream_statistics['dropped'] <= stream_statistics['captured']
+	assert 0 < stream_statistics['latency'] < 1000
+
+
+def test_update_quality_controller() -> None:
+	stream_quality_controller = create_quality_controller()
+	for _ in range(100):
+		update_quality_controller(stream_quality_controller, 80)
+
+	assert stream_quality_controller['level'] == len(STREAM_QUALITY_LEVELS) - 1
+	for _ in range(1000):
+		update_quality_controller(stream_quality_controller, 10)
+
+	assert stream_quality_controller['level'] == 0
+
+
+def test_process_quality_frame() -> None:
+	frame_processors_modules =\
+	[
+		SimpleNamespace(CAPABILITIES = { 'needs_faces': False, 'needs_source_face': True, 'optional': False }, process_frame = lambda source_face, reference_face, temp_frame: time.sleep(0.01) or temp_frame + 1),
+		SimpleNamespace(CAPABILITIES = { 'needs_faces': False, 'needs_source_face': False, 'optional': True }, process_frame = lambda source_face, reference_face, temp_frame: temp_frame + 10)
+	]
+	stream_quality_controller = create_quality_controller()
+	temp_frame = numpy.zeros((240, 320, 3), dtype = numpy.uint8)
+
+	assert process_quality_frame(stream_quality_controller, frame_processors_modules, None, temp_frame)[0][0][0] == 11
+	stream_quality_controller['level'] = len(STREAM_QUALITY_LEVELS) - 1
+	result_frame = process_quality_frame(stream_quality_controller, frame_processors_modules, None, temp_frame)
+	assert result_frame.shape == temp_frame.shape
+	assert result_frame[0][0][0] == 1
+	assert get_stream_quality(stream_quality_controller)['optional_processors'] is False
+
+
+def test_process_quality_frame_skips_optional_in_any_order() -> None:
+	frame_processors_modules =\
+	[
+		SimpleNamespace(CAPABILITIES = { 'needs_faces': False, 'needs_source_face': False, 'optional': True }, process_frame = lambda source_face, reference_face, temp_frame: temp_frame + 10),
+		SimpleNamespace(CAPABILITIES = { 'needs_faces': False, 'needs_source_face': True, 'optional': False }, process_frame = lambda source_face, reference_face, temp_frame: temp_frame + 1)
+	]
+	temp_frame = numpy.zeros((240, 320, 3), dtype = numpy.uint8)
+
+	for frame_processors_order in [ frame_processors_modules, list(reversed(frame_processors_modules)) ]:
+		stream_quality_controller = create_quality_controller()
+		assert process_quality_frame(stream_quality_controller, frame_processors_order, None, temp_frame)[0][0][0] == 11
+		stream_quality_controller['level'] = len(STREAM_QUALITY_LEVELS) - 1
+		assert process_quality_frame(stream_quality_controller, frame_processors_order, None, temp_frame)[0][0][0] == 1
+
+def test_stream_writer() -> None:
+	process = subprocess.Popen([ sys.executable, '-c', 'import sys; print(len(sys.stdin.buffer.read()))' ], stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+	stream_writer = start_stream_writer(process, (320, 240))
+	for _ in range(10):
+		write_stream_frame(stream_writer, numpy.zeros((240, 320, 3), dtype = numpy.uint8))
+		time.sleep(0.01)
+	write_stream_frame(stream_writer, numpy.zeros((480, 640, 3), dtype = numpy.uint8))
+	close_stream_writer(stream_writer)
+	stream_writer_statistics = get_stream_writer_statistics(stream_writer)
+
+	assert stream_writer_statistics['written'] + stream_writer_statistics['dropped'] == 11
+	assert int(process.stdout.read()) == stream_writer_statistics['written'] * 320 * 240 * 3
+
+
+def test_stream_writer_with_backpressure() -> None:
+	process = subprocess.Popen([ sys.executable, '-c', 'import time; time.sleep(1)' ], stdin = subprocess.PIPE)
+	stream_writer = start_stream_writer(process, (1920, 1080))
+	start_time = time.perf_counter()
+	for _ in range(100):
+		write_stream_frame(stream_writer, numpy.zeros((1080, 1920, 3), dtype = numpy.uint8))
+
+	assert time.perf_counter() - start_time < 1
+	close_stream_writer(stream_writer)
+	assert get_stream_writer_statistics(stream_writer)['dropped'] > 0
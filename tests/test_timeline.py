@@ -0,0 +1,72 @@
+import threading
+import numpy
+import pytest
+
+from faceswap import timeline
+from faceswap.timeline import VIDEO_TIMELINES, VIDEO_TIMELINE_LIMIT, start_video_timeline, extract_thumbnail_frames, create_timeline_entry, suggest_reference_frames, get_thumbnail_frame
+from faceswap.uis.engine import ENGINE_PRIORITY_BACKGROUND, get_engine_priority
+from faceswap.utilities import conditional_download
+
+
+@pytest.fixture(scope = 'module', autouse = True)
+def before_all() -> None:
+	conditional_download('.assets/examples',
+	[
+		'https://github.com/faceswap/faceswap-assets/releases/download/examples/target-240p.mp4'
+	])
+
+
+def test_extract_thumbnail_frames() -> None:
+	thumbnail_frames = list(extract_thumbnail_frames('.assets/examples/target-240p.mp4', 1))
+
+	assert thumbnail_frames[0][0] == 1
+	assert [ frame_number for frame_number, _ in thumbnail_frames ] == sorted(frame_number for frame_number, _ in thumbnail_frames)
+	assert all(thumbnail_frame.shape[0] == 160 for _, thumbnail_frame in thumbnail_frames)
+	assert list(extract_thumbnail_frames('invalid', 1)) == []
+
+
+def test_create_timeline_entry(monkeypatch : pytest.MonkeyPatch) -> None:
+	engine_priorities = []
+	monkeypatch.setattr(timeline, 'analyse_engine_frame', lambda frame: engine_priorities.append(get_engine_priority()) or [ { 'bbox': [ 0, 0, 40, 80 ], 'det_score': 0.5 }, { 'bbox': [ 0, 0, 20, 20 ], 'det_score': 0.9 } ])
+	video_timeline = { 'thumbnails': {}, 'entries': [], 'frame_interval': 1, 'done': threading.Event() }
+	monkeypatch.setattr(timeline, 'extract_thumbnail_frames', lambda video_path, frame_interval: iter([ (1, numpy.zeros((160, 240, 3), dtype = numpy.uint8)) ]))
+	threading.Thread(target = timeline.build_video_timeline, args = ('timeline.mp4', video_timeline)).start()
+
+	assert video_timeline['done'].wait(5) is True
+	assert video_timeline['entries'] == [ { 'frame_number': 1, 'face_total': 2, 'face_score': 0.5 } ]
+	assert engine_priorities == [ ENGINE_PRIORITY_BACKGROUND ]
+	monkeypatch.setattr(timeline, 'analyse_engine_frame', lambda frame: [])
+	assert create_timeline_entry(2, numpy.zeros((160, 240, 3), dtype = numpy.uint8))['face_score'] == 0
+
+def test_suggest_reference_frames() -> None:
+	VIDEO_TIMELINES['timeline.mp4'] =\
+	{
+		'thumbnails':
+		{
+			1: 'first',
+			50: 'second'
+		},
+		'entries':
+		[
+			{ 'frame_number': 1, 'face_total': 1, 'face_score': 0.5 },
+			{ 'frame_number': 4, 'face_total': 1, 'face_score': 0.9 },
+			{ 'frame_number': 50, 'face_total': 2, 'face_score': 0.7 },
+			{ 'frame_number': 100, 'face_total': 0, 'face_score': 0.0 }
+		],
+		'frame_interval': 1,
+		'done': threading.Event()
+	}
+
+	assert suggest_reference_frames('timeline.mp4') == [ 4, 50 ]
+	assert suggest_reference_frames('invalid') == []
+	assert get_thumbnail_frame('timeline.mp4', 40) == 'second'
+
+
+def test_start_video_timeline() -> None:
+	for index in range(VIDEO_TIMELINE_LIMIT + 2):
+		video_timeline = start_video_timeline('invalid-' + str(index) + '.mp4')
+
+	assert video_timeline['done'].wait(5) is True
+	assert video_timeline['entries'] == []
+	assert len(VIDEO_TIMELINES) == VIDEO_TIMELINE_LIMIT
+	assert 'invalid-0.mp4' not in VIDEO_TIMELINES
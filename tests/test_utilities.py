@@ -1,10 +1,58 @@
 import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, List, Tuple
 import platform
 import subprocess
 import pytest
 
 import faceswap.globals
-from faceswap.utilities import conditional_download, extract_frames, create_temp, get_temp_directory_path, clear_temp, normalize_output_path, is_file, is_directory, is_image, is_video, encode_execution_providers, decode_execution_providers
+from faceswap.utilities import DOWNLOAD_MANIFEST_NAME, conditional_download, extract_frames, create_temp, get_temp_directory_path, get_temp_disk_directory_path, create_job_id, get_temp_frame_paths, read_temp_frame, write_temp_frame, clear_temp, normalize_output_path, is_file, is_directory, is_image, is_video, encode_execution_providers, decode_execution_providers
+
+
+DOWNLOAD_REQUESTS : List[str] = []
+
+
+class DownloadRequestHandler(SimpleHTTPRequestHandler):
+
+	def do_GET(self) -> None:
+		DOWNLOAD_REQUESTS.append(self.headers.get('Range', ''))
+		file_path = self.translate_path(self.path)
+		with open(file_path, 'rb') as file:
+			content = file.read()
+		start = int(self.headers.get('Range', 'bytes=0-')[6:-1])
+		if start >= len(content) > 0:
+			self.send_response(416)
+			self.send_header('Content-Range', 'bytes */' + str(len(content)))
+			self.end_headers()
+			return
+		self.send_response(206 if start else 200)
+		self.send_header('Content-Length', str(len(content) - start))
+		self.end_headers()
+		self.wfile.write(content[start:])
+
+	def log_message(self, format : str, *args : Any) -> None:
+		pass
+
+
+@pytest.fixture(scope = 'function')
+def download_server(tmp_path : Path) -> Any:
+	remote_directory_path = tmp_path / 'remote'
+	remote_directory_path.mkdir()
+	for index in range(3):
+		(remote_directory_path / ('model-' + str(index) + '.bin')).write_bytes(os.urandom(512 * 1024 + index))
+	http_server = ThreadingHTTPServer(('127.0.0.1', 0), lambda *args: DownloadRequestHandler(*args, directory = str(remote_directory_path)))
+	threading.Thread(target = http_server.serve_forever, daemon = True).start()
+	DOWNLOAD_REQUESTS.clear()
+	yield 'http://127.0.0.1:' + str(http_server.server_address[1]), remote_directory_path
+	http_server.shutdown()
+	http_server.server_close()
 
 
 @pytest.fixture(scope = 'module', autouse = True)
@@ -21,6 +69,9 @@ def before_all() -> None:
 	subprocess.run([ 'ffmpeg', '-i', '.assets/examples/target-240p.mp4', '-vf', 'fps=25', '.assets/examples/target-240p-25fps.mp4' ])
 	subprocess.run([ 'ffmpeg', '-i', '.assets/examples/target-240p.mp4', '-vf', 'fps=30', '.assets/examples/target-240p-30fps.mp4' ])
 	subprocess.run([ 'ffmpeg', '-i', '.assets/examples/target-240p.mp4', '-vf', 'fps=60', '.assets/examples/target-240p-60fps.mp4' ])
+	for index in range(4):
+		os.makedirs('.assets/examples/concurrent-' + str(index), exist_ok = True)
+		shutil.copy('.assets/examples/target-240p-30fps.mp4', '.assets/examples/concurrent-' + str(index) + '/target.mp4')
 
 
 @pytest.fixture(scope = 'function', autouse = True)
@@ -29,6 +80,7 @@ def before_each() -> None:
 	faceswap.globals.trim_frame_end = None
 	faceswap.globals.temp_frame_quality = 90
 	faceswap.globals.temp_frame_format = 'jpg'
+	faceswap.globals.temp_frame_memory_limit = None
 
 
 def test_extract_frames() -> None:
@@ -103,6 +155,101 @@ def test_extract_frames_with_trim_end() -> None:
 		clear_temp(target_path)
 
 
+def test_extract_frames_with_temp_frame_memory_limit() -> None:
+	if platform.system().lower() == 'linux':
+		faceswap.globals.temp_frame_memory_limit = 1
+		target_path = '.assets/examples/target-240p-30fps.mp4'
+		create_temp(target_path)
+
+		assert extract_frames(target_path, 30.0) is True
+		assert get_temp_directory_path(target_path).startswith('/dev/shm')
+		assert len(get_temp_frame_paths(target_path)) == 324
+		assert len(glob.glob1(get_temp_disk_directory_path(target_path), '*.jpg')) > 0
+
+		temp_frame_path = sorted(get_temp_frame_paths(target_path))[0]
+		temp_frame = read_temp_frame(temp_frame_path)
+
+		assert write_temp_frame(temp_frame_path, temp_frame) is True
+		assert os.path.isfile(temp_frame_path) is True
+
+		clear_temp(target_path)
+
+		assert os.path.exists(get_temp_directory_path(target_path)) is False
+		assert os.path.exists(get_temp_disk_directory_path(target_path)) is False
+
+
+def run_concurrent_job(target_path : str, trim_frame_end : int) -> Tuple[str, int, bool]:
+	faceswap.globals.job_id = create_job_id()
+	faceswap.globals.trim_frame_end = trim_frame_end
+	temp_directory_path = get_temp_directory_path(target_path)
+	create_temp(target_path)
+	extract_frames(target_path, 30.0)
+	frame_total = len(glob.glob1(temp_directory_path, '*.jpg'))
+	clear_temp(target_path)
+	return temp_directory_path, frame_total, os.path.exists(temp_directory_path)
+
+
+def test_extract_frames_with_concurrent_jobs() -> None:
+	data_provider =\
+	[
+		('.assets/examples/concurrent-0/target.mp4', 50),
+		('.assets/examples/concurrent-1/target.mp4', 100),
+		('.assets/examples/concurrent-2/target.mp4', 150),
+		('.assets/examples/concurrent-3/target.mp4', 200)
+	]
+	with ProcessPoolExecutor(max_workers = len(data_provider)) as executor:
+		futures = [ executor.submit(run_concurrent_job, target_path, trim_frame_end) for target_path, trim_frame_end in data_provider ]
+		results = [ future.result() for future in futures ]
+	temp_directory_paths = [ temp_directory_path for temp_directory_path, _, _ in results ]
+
+	assert len(set(temp_directory_paths)) == len(data_provider)
+	for (_, trim_frame_end), (_, frame_total, is_temp_remaining) in zip(data_provider, results):
+		assert frame_total == trim_frame_end
+		assert is_temp_remaining is False
+
+
+def test_conditional_download(download_server : Tuple[str, Path], tmp_path : Path) -> None:
+	download_url, remote_directory_path = download_server
+	download_directory_path = tmp_path / 'download'
+	conditional_download(str(download_directory_path), [ download_url + '/model-' + str(index) + '.bin' for index in range(3) ])
+
+	with open(download_directory_path / DOWNLOAD_MANIFEST_NAME) as download_manifest_file:
+		download_manifest = json.load(download_manifest_file)
+	for index in range(3):
+		file_name = 'model-' + str(index) + '.bin'
+		assert (download_directory_path / file_name).read_bytes() == (remote_directory_path / file_name).read_bytes()
+		assert download_manifest[file_name]['sha256'] == hashlib.sha256((remote_directory_path / file_name).read_bytes()).hexdigest()
+	assert not list(download_directory_path.glob('*.part'))
+
+
+def test_conditional_download_resume(download_server : Tuple[str, Path], tmp_path : Path) -> None:
+	download_url, remote_directory_path = download_server
+	download_directory_path = tmp_path / 'download'
+	download_directory_path.mkdir()
+	(download_directory_path / 'model-0.bin.part').write_bytes((remote_directory_path / 'model-0.bin').read_bytes()[:1000])
+	(download_directory_path / 'model-1.bin').write_bytes((remote_directory_path / 'model-1.bin').read_bytes()[:2000])
+	(download_directory_path / 'model-2.bin.part').write_bytes(os.urandom(600 * 1024))
+	conditional_download(str(download_directory_path), [ download_url + '/model-0.bin', download_url + '/model-1.bin', download_url + '/model-2.bin' ])
+
+	assert (download_directory_path / 'model-0.bin').read_bytes() == (remote_directory_path / 'model-0.bin').read_bytes()
+	assert (download_directory_path / 'model-1.bin').read_bytes() == (remote_directory_path / 'model-1.bin').read_bytes()
+	assert (download_directory_path / 'model-2.bin').read_bytes() == (remote_directory_path / 'model-2.bin').read_bytes()
+	assert sorted(DOWNLOAD_REQUESTS) == [ '', 'bytes=1000-', 'bytes=2000-', 'bytes=614400-' ]
+
+
+def test_conditional_download_verification(download_server : Tuple[str, Path], tmp_path : Path) -> None:
+	download_url, _ = download_server
+	download_directory_path = tmp_path / 'download'
+	download_directory_path.mkdir()
+	with open(download_directory_path / DOWNLOAD_MANIFEST_NAME, 'w') as download_manifest_file:
+		json.dump({ 'model-0.bin': { 'size': 512 * 1024, 'sha256': 'invalid' } }, download_manifest_file)
+
+	with pytest.raises(ValueError):
+		conditional_download(str(download_directory_path), [ download_url + '/model-0.bin' ])
+	assert not (download_directory_path / 'model-0.bin').exists()
+	assert not (download_directory_path / 'model-0.bin.part').exists()
+
+
 def test_normalize_output_path() -> None:
 	if platform.system().lower() != 'windows':
 		assert normalize_output_path('.assets/examples/source.jpg', None, '.assets/examples/target-240p.mp4') == '.assets/examples/target-240p.mp4'
@@ -1,9 +1,12 @@
+from pathlib import Path
+import os
 import subprocess
+import numpy
 import pytest
 
 import faceswap.globals
 from faceswap.utilities import conditional_download
-from faceswap.vision import detect_fps
+from faceswap.vision import detect_fps, read_image, write_image
 
 
 @pytest.fixture(scope = 'module', autouse = True)
@@ -34,3 +37,13 @@ def test_detect_fps() -> None:
 	assert detect_fps('.assets/examples/target-240p-25fps.mp4') == 25.0
 	assert detect_fps('.assets/examples/target-240p-30fps.mp4') == 30.0
 	assert detect_fps('.assets/examples/target-240p-60fps.mp4') == 60.0
+
+
+def test_write_image(tmp_path : Path) -> None:
+	frame = numpy.random.randint(0, 255, (240, 320, 3), dtype = numpy.uint8)
+
+	assert write_image(str(tmp_path / 'high.jpg'), frame, 100) is True
+	assert write_image(str(tmp_path / 'low.jpg'), frame, 10) is True
+	assert os.path.getsize(tmp_path / 'low.jpg') < os.path.getsize(tmp_path / 'high.jpg')
+	assert write_image(str(tmp_path / 'lossless.png'), frame, 0) is True
+	assert numpy.array_equal(read_image(str(tmp_path / 'lossless.png')), frame)